@@ -0,0 +1,129 @@
+"""Partition SensorData and SensorHealth tables by day
+
+Revision ID: 3f7a2c91d6e4
+Revises: 8d49eccb85d5
+Create Date: 2024-08-12 09:03:17.552184
+
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a2c91d6e4'
+down_revision = '8d49eccb85d5'
+branch_labels = None
+depends_on = None
+
+# Days of empty partitions created ahead of today; the app's partition
+# maintenance keeps extending this window afterwards
+PREMAKE_DAYS = 7
+
+COLUMNS = {
+    'sensordata': 'id, sensor_id, class_type, approach, time',
+    'sensorhealth': 'id, sensor_id, time, dcp, online, fault',
+}
+
+
+def create_daily_partitions(table):
+    bind = op.get_bind()
+    days = set(
+        bind.execute(
+            sa.text(f'SELECT DISTINCT time::date FROM {table}_legacy')
+        ).scalars()
+    )
+    today = date.today()
+    days.update(today + timedelta(days=i) for i in range(-1, PREMAKE_DAYS + 1))
+    for day in sorted(days):
+        op.execute(
+            f"CREATE TABLE {table}_p{day:%Y%m%d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def upgrade():
+    # Move the existing heap tables out of the way
+    for table in COLUMNS:
+        op.rename_table(table, f'{table}_legacy')
+        op.execute(f'ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey')
+        op.execute(f'ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_sensor_id_fkey TO {table}_legacy_sensor_id_fkey')
+        op.execute(f'ALTER INDEX ix_{table}_sensor_id_time RENAME TO ix_{table}_legacy_sensor_id_time')
+        op.execute(f'ALTER INDEX ix_{table}_time_brin RENAME TO ix_{table}_legacy_time_brin')
+
+    # Primary keys on partitioned tables must include the partition key
+    op.execute("""
+        CREATE TABLE sensordata (
+            id UUID NOT NULL,
+            sensor_id UUID NOT NULL,
+            class_type sensorclass NOT NULL,
+            approach approach NOT NULL,
+            time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT sensordata_pkey PRIMARY KEY (id, time),
+            CONSTRAINT sensordata_sensor_id_fkey FOREIGN KEY (sensor_id) REFERENCES sensor (id)
+        ) PARTITION BY RANGE (time)
+    """)
+    op.execute("""
+        CREATE TABLE sensorhealth (
+            id UUID NOT NULL,
+            sensor_id UUID NOT NULL,
+            time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            dcp INTEGER NOT NULL,
+            online BOOLEAN NOT NULL,
+            fault BOOLEAN NOT NULL,
+            CONSTRAINT sensorhealth_pkey PRIMARY KEY (id, time),
+            CONSTRAINT sensorhealth_sensor_id_fkey FOREIGN KEY (sensor_id) REFERENCES sensor (id)
+        ) PARTITION BY RANGE (time)
+    """)
+
+    for table, columns in COLUMNS.items():
+        create_daily_partitions(table)
+        op.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_legacy')
+        op.drop_table(f'{table}_legacy')
+
+    # Indexes on the parent cascade to every partition, current and future
+    op.execute('CREATE INDEX ix_sensordata_sensor_id_time ON sensordata (sensor_id, time) INCLUDE (approach, class_type)')
+    op.execute('CREATE INDEX ix_sensordata_time_brin ON sensordata USING brin (time)')
+    op.execute('CREATE INDEX ix_sensorhealth_sensor_id_time ON sensorhealth (sensor_id, time)')
+    op.execute('CREATE INDEX ix_sensorhealth_time_brin ON sensorhealth USING brin (time)')
+
+
+def downgrade():
+    for table in COLUMNS:
+        op.rename_table(table, f'{table}_partitioned')
+
+    op.create_table('sensordata',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('sensor_id', sa.Uuid(), nullable=False),
+    sa.Column('class_type', postgresql.ENUM('car', 'motorcycle', 'pedestrian', 'bicycle', name='sensorclass', create_type=False), nullable=False),
+    sa.Column('approach', postgresql.ENUM('NB', 'SB', 'WB', 'EB', name='approach', create_type=False), nullable=False),
+    sa.Column('time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensor.id'], name='sensordata_plain_sensor_id_fkey'),
+    sa.PrimaryKeyConstraint('id', name='sensordata_plain_pkey')
+    )
+    op.create_table('sensorhealth',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('sensor_id', sa.Uuid(), nullable=False),
+    sa.Column('time', sa.DateTime(), nullable=False),
+    sa.Column('dcp', sa.Integer(), nullable=False),
+    sa.Column('online', sa.Boolean(), nullable=False),
+    sa.Column('fault', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensor.id'], name='sensorhealth_plain_sensor_id_fkey'),
+    sa.PrimaryKeyConstraint('id', name='sensorhealth_plain_pkey')
+    )
+
+    for table, columns in COLUMNS.items():
+        op.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_partitioned')
+        # Dropping the parent drops every attached partition with it
+        op.drop_table(f'{table}_partitioned')
+        op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {table}_plain_pkey TO {table}_pkey')
+        op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {table}_plain_sensor_id_fkey TO {table}_sensor_id_fkey')
+
+    op.execute('CREATE INDEX ix_sensordata_sensor_id_time ON sensordata (sensor_id, time) INCLUDE (approach, class_type)')
+    op.execute('CREATE INDEX ix_sensordata_time_brin ON sensordata USING brin (time)')
+    op.execute('CREATE INDEX ix_sensorhealth_sensor_id_time ON sensorhealth (sensor_id, time)')
+    op.execute('CREATE INDEX ix_sensorhealth_time_brin ON sensorhealth USING brin (time)')
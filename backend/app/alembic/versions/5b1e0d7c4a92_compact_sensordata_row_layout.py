@@ -0,0 +1,154 @@
+"""Compact SensorData row layout with bigint ids and smallint codes
+
+Revision ID: 5b1e0d7c4a92
+Revises: 3f7a2c91d6e4
+Create Date: 2024-08-19 15:27:40.118352
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e0d7c4a92'
+down_revision = '3f7a2c91d6e4'
+branch_labels = None
+depends_on = None
+
+# Must match SENSOR_CLASS_CODES and APPROACH_CODES in app/models/sensor_data_models.py
+SENSOR_CLASS_CODES = [(1, 'car'), (2, 'motorcycle'), (3, 'pedestrian'), (4, 'bicycle'), (5, 'mobility_aid')]
+APPROACH_CODES = [(1, 'NB'), (2, 'SB'), (3, 'WB'), (4, 'EB')]
+
+
+def list_partitions(table):
+    return op.get_bind().execute(sa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {'table': table}).scalars().all()
+
+
+def rename_partitioned_table(old, new):
+    """Renames a partitioned table, its partitions and its named constraints and indexes."""
+    for partition in list_partitions(old):
+        op.rename_table(partition, new + partition[len(old):])
+    op.rename_table(old, new)
+    op.execute(f'ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey')
+
+
+def create_partitions_like(source, table):
+    """Creates the same daily partitions (and default partition) on table as source has."""
+    for partition in list_partitions(source):
+        suffix = partition[len(source):]
+        if suffix == '_default':
+            op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+            continue
+        day = datetime.strptime(suffix[2:], '%Y%m%d').date()
+        op.execute(
+            f"CREATE TABLE {table}{suffix} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+
+
+def upgrade():
+    # Sequential internal key for sensors, referenced by the event table instead of the UUID
+    op.execute('ALTER TABLE sensor ADD COLUMN key INTEGER GENERATED BY DEFAULT AS IDENTITY')
+    op.create_unique_constraint('sensor_key_key', 'sensor', ['key'])
+
+    # Lookup tables documenting the smallint codes
+    sensorclass_lookup = op.create_table('sensorclass_lookup',
+    sa.Column('code', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.PrimaryKeyConstraint('code'),
+    sa.UniqueConstraint('name')
+    )
+    approach_lookup = op.create_table('approach_lookup',
+    sa.Column('code', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.PrimaryKeyConstraint('code'),
+    sa.UniqueConstraint('name')
+    )
+    op.bulk_insert(sensorclass_lookup, [{'code': c, 'name': n} for c, n in SENSOR_CLASS_CODES])
+    op.bulk_insert(approach_lookup, [{'code': c, 'name': n} for c, n in APPROACH_CODES])
+
+    rename_partitioned_table('sensordata', 'sensordata_legacy')
+    op.execute('ALTER TABLE sensordata_legacy RENAME CONSTRAINT sensordata_sensor_id_fkey TO sensordata_legacy_sensor_id_fkey')
+    op.execute('ALTER INDEX ix_sensordata_sensor_id_time RENAME TO ix_sensordata_legacy_sensor_id_time')
+    op.execute('ALTER INDEX ix_sensordata_time_brin RENAME TO ix_sensordata_legacy_time_brin')
+
+    # Columns ordered widest first so the row has no alignment padding
+    op.execute("""
+        CREATE TABLE sensordata (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+            time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            sensor_key INTEGER NOT NULL,
+            class_type SMALLINT NOT NULL,
+            approach SMALLINT NOT NULL,
+            CONSTRAINT sensordata_pkey PRIMARY KEY (id, time),
+            CONSTRAINT sensordata_sensor_key_fkey FOREIGN KEY (sensor_key) REFERENCES sensor (key)
+        ) PARTITION BY RANGE (time)
+    """)
+    create_partitions_like('sensordata_legacy', 'sensordata')
+
+    # Ordered by time so the new ids follow the append order of live ingest
+    op.execute("""
+        INSERT INTO sensordata (time, sensor_key, class_type, approach)
+        SELECT legacy.time, sensor.key, sensorclass_lookup.code, approach_lookup.code
+        FROM sensordata_legacy legacy
+        JOIN sensor ON sensor.id = legacy.sensor_id
+        JOIN sensorclass_lookup ON sensorclass_lookup.name = legacy.class_type::text
+        JOIN approach_lookup ON approach_lookup.name = legacy.approach::text
+        ORDER BY legacy.time
+    """)
+    op.drop_table('sensordata_legacy')
+    op.execute('DROP TYPE sensorclass')
+    op.execute('DROP TYPE approach')
+
+    op.execute('CREATE INDEX ix_sensordata_sensor_key_time ON sensordata (sensor_key, time) INCLUDE (approach, class_type)')
+    op.execute('CREATE INDEX ix_sensordata_time_brin ON sensordata USING brin (time)')
+
+
+def downgrade():
+    op.execute("CREATE TYPE sensorclass AS ENUM ('car', 'motorcycle', 'pedestrian', 'bicycle', 'mobility_aid')")
+    op.execute("CREATE TYPE approach AS ENUM ('NB', 'SB', 'WB', 'EB')")
+
+    rename_partitioned_table('sensordata', 'sensordata_compact')
+    op.execute('ALTER TABLE sensordata_compact RENAME CONSTRAINT sensordata_sensor_key_fkey TO sensordata_compact_sensor_key_fkey')
+    op.execute('ALTER INDEX ix_sensordata_sensor_key_time RENAME TO ix_sensordata_compact_sensor_key_time')
+    op.execute('ALTER INDEX ix_sensordata_time_brin RENAME TO ix_sensordata_compact_time_brin')
+
+    op.execute("""
+        CREATE TABLE sensordata (
+            id UUID NOT NULL,
+            sensor_id UUID NOT NULL,
+            class_type sensorclass NOT NULL,
+            approach approach NOT NULL,
+            time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT sensordata_pkey PRIMARY KEY (id, time),
+            CONSTRAINT sensordata_sensor_id_fkey FOREIGN KEY (sensor_id) REFERENCES sensor (id)
+        ) PARTITION BY RANGE (time)
+    """)
+    create_partitions_like('sensordata_compact', 'sensordata')
+
+    op.execute("""
+        INSERT INTO sensordata (id, sensor_id, class_type, approach, time)
+        SELECT uuid_generate_v4(), sensor.id, sensorclass_lookup.name::sensorclass,
+               approach_lookup.name::approach, compact.time
+        FROM sensordata_compact compact
+        JOIN sensor ON sensor.key = compact.sensor_key
+        JOIN sensorclass_lookup ON sensorclass_lookup.code = compact.class_type
+        JOIN approach_lookup ON approach_lookup.code = compact.approach
+    """)
+    op.drop_table('sensordata_compact')
+
+    op.execute('CREATE INDEX ix_sensordata_sensor_id_time ON sensordata (sensor_id, time) INCLUDE (approach, class_type)')
+    op.execute('CREATE INDEX ix_sensordata_time_brin ON sensordata USING brin (time)')
+
+    op.drop_table('approach_lookup')
+    op.drop_table('sensorclass_lookup')
+    op.drop_constraint('sensor_key_key', 'sensor', type_='unique')
+    op.drop_column('sensor', 'key')
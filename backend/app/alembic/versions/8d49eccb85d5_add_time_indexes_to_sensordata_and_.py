@@ -0,0 +1,49 @@
+"""Add time indexes to SensorData and SensorHealth tables
+
+Revision ID: 8d49eccb85d5
+Revises: b8bcde3250f1
+Create Date: 2024-08-05 10:12:31.418207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '8d49eccb85d5'
+down_revision = 'b8bcde3250f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        # Per-sensor range scans; approach and class_type are carried in the
+        # index so the count aggregations can run as index-only scans
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sensordata_sensor_id_time '
+            'ON sensordata (sensor_id, time) INCLUDE (approach, class_type)'
+        )
+        # Rows are appended in time order, so a BRIN index covers fleet-wide ranges
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sensordata_time_brin '
+            'ON sensordata USING brin (time)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sensorhealth_sensor_id_time '
+            'ON sensorhealth (sensor_id, time)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sensorhealth_time_brin '
+            'ON sensorhealth USING brin (time)'
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_sensorhealth_time_brin')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_sensorhealth_sensor_id_time')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_sensordata_time_brin')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_sensordata_sensor_id_time')
@@ -0,0 +1,49 @@
+"""Add SensorData minute and hour rollup tables
+
+Revision ID: a6c4f8e2b5d1
+Revises: 5b1e0d7c4a92
+Create Date: 2024-08-26 11:48:09.730615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4f8e2b5d1'
+down_revision = '5b1e0d7c4a92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('sensordata_minute', 'sensordata_hour'):
+        op.create_table(table,
+        sa.Column('sensor_key', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('approach', sa.SmallInteger(), nullable=False),
+        sa.Column('class_type', sa.SmallInteger(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['sensor_key'], ['sensor.key'], ),
+        sa.PrimaryKeyConstraint('sensor_key', 'bucket', 'approach', 'class_type')
+        )
+        op.create_index(f'ix_{table}_bucket', table, ['bucket'], unique=False)
+
+    # Build the rollups from the events already stored
+    op.execute("""
+        INSERT INTO sensordata_minute (sensor_key, bucket, approach, class_type, count)
+        SELECT sensor_key, date_trunc('minute', time), approach, class_type, count(*)
+        FROM sensordata GROUP BY 1, 2, 3, 4
+    """)
+    op.execute("""
+        INSERT INTO sensordata_hour (sensor_key, bucket, approach, class_type, count)
+        SELECT sensor_key, date_trunc('hour', bucket), approach, class_type, sum(count)
+        FROM sensordata_minute GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade():
+    for table in ('sensordata_hour', 'sensordata_minute'):
+        op.drop_index(f'ix_{table}_bucket', table_name=table)
+        op.drop_table(table)
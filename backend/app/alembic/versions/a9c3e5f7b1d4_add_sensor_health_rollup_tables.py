@@ -0,0 +1,80 @@
+"""Add hourly and daily sensor health rollup tables
+
+Revision ID: a9c3e5f7b1d4
+Revises: f3b8d2a6c1e9
+Create Date: 2024-09-09 14:02:51.418307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e5f7b1d4'
+down_revision = 'f3b8d2a6c1e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('sensor_health_hour', 'sensor_health_day'):
+        op.create_table(table,
+        sa.Column('sensor_id', sa.Uuid(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('dcp_sum', sa.BigInteger(), nullable=False),
+        sa.Column('dcp_min', sa.Integer(), nullable=True),
+        sa.Column('online_seconds', sa.Float(), nullable=False),
+        sa.Column('fault_seconds', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['sensor_id'], ['sensor.id'], ),
+        sa.PrimaryKeyConstraint('sensor_id', 'bucket')
+        )
+        op.create_index(f'ix_{table}_bucket', table, ['bucket'], unique=False)
+
+    # Fill from the reports already stored, counting the time up to a sensor's next
+    # report when it comes within the default 120 second gap
+    op.execute("""
+        INSERT INTO sensor_health_hour (sensor_id, bucket, samples, dcp_sum, dcp_min, online_seconds, fault_seconds)
+        WITH reports AS (
+            SELECT sensor_id, time, dcp, online, fault,
+                lead(time) OVER (PARTITION BY sensor_id ORDER BY time) AS next_time
+            FROM sensorhealth
+        ), spans AS (
+            SELECT sensor_id, online, fault, time AS span_start, next_time AS span_end
+            FROM reports
+            WHERE next_time > time AND next_time - time <= interval '120 seconds' AND (online OR fault)
+        ), pieces AS (
+            SELECT sensor_id, online, fault, date_trunc('hour', span_start) AS bucket,
+                extract(epoch FROM least(span_end, date_trunc('hour', span_start) + interval '1 hour') - span_start) AS seconds
+            FROM spans
+            UNION ALL
+            SELECT sensor_id, online, fault, date_trunc('hour', span_end),
+                extract(epoch FROM span_end - date_trunc('hour', span_end))
+            FROM spans WHERE date_trunc('hour', span_end) > date_trunc('hour', span_start)
+        )
+        SELECT sensor_id, bucket, sum(samples), sum(dcp_sum), min(dcp_min), sum(online_seconds), sum(fault_seconds)
+        FROM (
+            SELECT sensor_id, date_trunc('hour', time) AS bucket, 1 AS samples, dcp AS dcp_sum,
+                dcp AS dcp_min, 0 AS online_seconds, 0 AS fault_seconds
+            FROM reports
+            UNION ALL
+            SELECT sensor_id, bucket, 0, 0, NULL,
+                CASE WHEN online THEN seconds ELSE 0 END, CASE WHEN fault THEN seconds ELSE 0 END
+            FROM pieces
+        ) totals
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO sensor_health_day (sensor_id, bucket, samples, dcp_sum, dcp_min, online_seconds, fault_seconds)
+        SELECT sensor_id, date_trunc('day', bucket), sum(samples), sum(dcp_sum), min(dcp_min),
+            sum(online_seconds), sum(fault_seconds)
+        FROM sensor_health_hour
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade():
+    for table in ('sensor_health_day', 'sensor_health_hour'):
+        op.drop_index(f'ix_{table}_bucket', table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,26 @@
+"""Add (time, id) index to SensorData for keyset pagination
+
+Revision ID: c2d9e7f1a3b8
+Revises: a6c4f8e2b5d1
+Create Date: 2024-08-30 10:21:52.406913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d9e7f1a3b8'
+down_revision = 'a6c4f8e2b5d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Created on the parent so it cascades to every partition
+    op.create_index('ix_sensordata_time_id', 'sensordata', ['time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sensordata_time_id', table_name='sensordata')
@@ -0,0 +1,61 @@
+"""Add sensor_health_interval table of compacted health states
+
+Revision ID: e7a1c4d9b2f6
+Revises: c2d9e7f1a3b8
+Create Date: 2024-09-03 14:12:37.581204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a1c4d9b2f6'
+down_revision = 'c2d9e7f1a3b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sensor_health_interval',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('sensor_id', sa.Uuid(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('dcp', sa.Integer(), nullable=False),
+    sa.Column('online', sa.Boolean(), nullable=False),
+    sa.Column('fault', sa.Boolean(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensor.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sensor_health_interval_sensor_id_start_time', 'sensor_health_interval', ['sensor_id', 'start_time'], unique=False)
+    op.create_index('ix_sensor_health_interval_sensor_id_end_time', 'sensor_health_interval', ['sensor_id', 'end_time'], unique=False)
+    op.create_index('ix_sensor_health_interval_start_time', 'sensor_health_interval', ['start_time'], unique=False)
+
+    # Compact the reports already stored, splitting runs at the default 120 second gap
+    op.execute("""
+        INSERT INTO sensor_health_interval (sensor_id, start_time, end_time, dcp, online, fault, samples)
+        SELECT sensor_id, min(time), max(time), dcp, online, fault, count(*)
+        FROM (
+            SELECT *, sum(opens_run) OVER (PARTITION BY sensor_id ORDER BY time) AS run
+            FROM (
+                SELECT sensor_id, time, dcp, online, fault,
+                    CASE WHEN lag(time) OVER w IS NULL
+                        OR time - lag(time) OVER w > interval '120 seconds'
+                        OR (dcp, online, fault) IS DISTINCT FROM (lag(dcp) OVER w, lag(online) OVER w, lag(fault) OVER w)
+                    THEN 1 ELSE 0 END AS opens_run
+                FROM sensorhealth
+                WINDOW w AS (PARTITION BY sensor_id ORDER BY time)
+            ) reports
+        ) runs
+        GROUP BY sensor_id, run, dcp, online, fault
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_sensor_health_interval_start_time', table_name='sensor_health_interval')
+    op.drop_index('ix_sensor_health_interval_sensor_id_end_time', table_name='sensor_health_interval')
+    op.drop_index('ix_sensor_health_interval_sensor_id_start_time', table_name='sensor_health_interval')
+    op.drop_table('sensor_health_interval')
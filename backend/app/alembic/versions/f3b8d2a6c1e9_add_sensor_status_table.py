@@ -0,0 +1,48 @@
+"""Add sensor_status table of the latest state per sensor
+
+Revision ID: f3b8d2a6c1e9
+Revises: e7a1c4d9b2f6
+Create Date: 2024-09-05 09:37:14.226851
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d2a6c1e9'
+down_revision = 'e7a1c4d9b2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sensor_status',
+    sa.Column('sensor_id', sa.Uuid(), nullable=False),
+    sa.Column('last_event_time', sa.DateTime(), nullable=True),
+    sa.Column('last_health_time', sa.DateTime(), nullable=True),
+    sa.Column('online', sa.Boolean(), nullable=True),
+    sa.Column('fault', sa.Boolean(), nullable=True),
+    sa.Column('dcp', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensor.id'], ),
+    sa.PrimaryKeyConstraint('sensor_id')
+    )
+
+    # Seed from the stored events and reports, one index lookup per sensor and partition
+    op.execute("""
+        INSERT INTO sensor_status (sensor_id, last_event_time, last_health_time, online, fault, dcp)
+        SELECT sensor.id,
+            (SELECT max(time) FROM sensordata WHERE sensordata.sensor_key = sensor.key),
+            health.time, health.online, health.fault, health.dcp
+        FROM sensor
+        LEFT JOIN LATERAL (
+            SELECT time, online, fault, dcp FROM sensorhealth
+            WHERE sensorhealth.sensor_id = sensor.id
+            ORDER BY time DESC LIMIT 1
+        ) health ON true
+    """)
+
+
+def downgrade():
+    op.drop_table('sensor_status')
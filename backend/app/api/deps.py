@@ -1,18 +1,23 @@
-from collections.abc import Generator
-from typing import Annotated
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextvars import ContextVar
+from functools import partial
+from typing import Annotated, Any, TypeVar
 
-from app.models.user_models import User
-from app.schema.common_schemas import TokenPayload
 import jwt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy.util import await_only
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine, ingest_engine
+from app.models.user_models import User
+from app.schema.common_schemas import TokenPayload
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -24,22 +29,81 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+def get_ingest_db() -> Generator[Session, None, None]:
+    with Session(ingest_engine) as session:
+        yield session
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+IngestSessionDep = Annotated[Session, Depends(get_ingest_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+
+T = TypeVar("T")
+
+# Set while run_read runs a read function on the event loop
+_in_run_read: ContextVar[bool] = ContextVar("_in_run_read", default=False)
+
+
+async def run_read(session: AsyncSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs the sync read work of an async route on session.run_sync, which gives fn a sync
+    Session whose database calls await the async connection.
+
+    fn itself runs on the event loop between those calls, so it hands building and
+    encoding the response to off_loop. The connection goes back to the pool as soon as
+    fn returns. The dependency would only close the session once the response is sent,
+    and under load a connection held that long starves the requests queued behind it.
+    """
+    token = _in_run_read.set(True)
+    try:
+        return await session.run_sync(fn, *args, **kwargs)
+    finally:
+        _in_run_read.reset(token)
+        await session.close()
+
+
+def off_loop(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Runs CPU-bound work of a run_read function, such as building and encoding a response
+    from the fetched rows, in the threadpool and waits for it without blocking the event
+    loop. Anywhere else, e.g. in a sync route or a batch query worker, it calls fn.
+    """
+    if not _in_run_read.get():
+        return fn(*args)
+    # fn runs inside run_sync's greenlet, so await_only hands control back to the event
+    # loop until the threadpool is done
+    result: T = await_only(run_in_threadpool(partial(_run_off_loop, fn, *args)))
+    return result
+
+
+def _run_off_loop(fn: Callable[..., T], *args: Any) -> T:
+    # The threadpool runs fn in a copy of the context, which is not in run_read
+    _in_run_read.set(False)
+    return fn(*args)
+
+
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def token_payload(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+
+
+def check_user(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -47,6 +111,16 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    token_data = token_payload(token)
+    return check_user(session.get(User, token_data.sub))
+
+
+async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+    token_data = token_payload(token)
+    return check_user(await session.get(User, token_data.sub))
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
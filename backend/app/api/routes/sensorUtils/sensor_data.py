@@ -1,24 +1,62 @@
-from itertools import groupby, product
 import uuid
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional
+from collections.abc import Callable
 from datetime import datetime, timedelta
-from pydantic import BaseModel
 
-from app.models.sensor_data_models import Approach, SensorClass, SensorData, SensorDataPublic
-from app.schema.sensor_data_schemas import ApproachData, HourlyApproachCount, HourlyData, MinuteApproachCount, SensorDataCreate, SensorDataPublicList
-from fastapi import APIRouter, HTTPException, Query # type: ignore
-from sqlmodel import func, select # type: ignore
-
-from app.api.deps import CurrentUser, SessionDep
+from app.models.sensor_data_models import APPROACH_CODES, SENSOR_CLASS_CODES, Approach, SensorClass, SensorData
+from app.schema.sensor_data_schemas import ApproachDataList, ColumnarCounts, HourlyApproachCount, MinuteApproachCount, SensorDataCreate, SensorDataIngestReceipt, SensorDataPublicList
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import col, select, tuple_
+
+from app import crud
+from app.api.deps import (
+    AsyncSessionDep,
+    IngestSessionDep,
+    SessionDep,
+    get_current_user_async,
+    off_loop,
+    run_read,
+)
+from app.core.admission import IngestOverloaded, IngestRoute, ingest_admission
+from app.core.arrow import arrow_available, count_table, negotiate_tabular, table_bytes
+from app.core.aggregation import BUCKET_WIDTHS, AggregationError, BucketWidth, CountSeries, bucket_range, bucket_starts, bucketed_counts, bucketed_series, columnar_series, detailed_counts_json, detailed_rows, floor_to_bucket
+from app.core.config import settings
+from app.core.count_cache import count_cache
+from app.core.export import EXPORT_MEDIA_TYPES, ExportFilter, ExportFormat, export_sensor_data
+from app.core.ingest import IngestError, check_sensor_data, copy_sensor_data
+from app.core.ingest_queue import IngestQueueFull, IngestQueueUnavailable, ingest_queue
+from app.core.json_response import FastJSONResponse, dump_json
+from app.core.live_counters import live_counters
+from app.core.live_stream import StreamFilter, live_stream
+from app.core.rollups import to_utc_naive
+from app.core.pagination import InvalidCursor, count_rows, decode_cursor, encode_cursor
+from app.core.sensor_registry import sensor_registry
+from app.core.sensor_status import sensor_status
 
 router = APIRouter()
+# Ingest endpoints, behind admission control
+ingest_router = APIRouter(route_class=IngestRoute)
 
-@router.get("/", response_model=SensorDataPublicList)
-def getSensorData(
-    session: SessionDep,
-    current_user: CurrentUser,
+def tabular_media_type(request: Request) -> str | None:
+    """
+    Picks Arrow or Parquet output from the Accept header, or None for JSON. Answers 406
+    when tabular output is asked for but pyarrow is not installed.
+    """
+    media_type = negotiate_tabular(request.headers.get("accept"))
+    if media_type and not arrow_available():
+        raise HTTPException(status_code=406, detail="Arrow and Parquet output need pyarrow, which is not installed")
+    return media_type
+
+
+@router.get("/", dependencies=[Depends(get_current_user_async)], response_model=SensorDataPublicList)
+async def getSensorData(
+    request: Request,
+    session: AsyncSessionDep,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(default=100, ge=1, le=settings.SENSOR_DATA_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    count: Literal["exact", "estimate", "none"] = "exact",
     class_type: Optional[str] = None,
     approach: Optional[str] = None,
     sensor_id: Optional[uuid.UUID] = None,
@@ -27,8 +65,38 @@ def getSensorData(
 ) -> Any:
     """
     Retrieve SensorData with optional filtering based on class_type, approach, sensor_id, and time range.
+
+    Rows are ordered by (time, id). Pass the returned next_cursor as cursor to fetch the
+    following page; skip is only applied when no cursor is given. count=estimate returns
+    the planner's row estimate and count=none skips counting.
+
+    With Accept: application/vnd.apache.arrow.stream or application/x-parquet the page
+    comes back as a table, with the count and next cursor in the X-Total-Count and
+    X-Next-Cursor headers.
     """
+    media_type = tabular_media_type(request)
+    return await run_read(
+        session, sensor_data_page, media_type, skip, limit, cursor, count, class_type, approach,
+        sensor_id, start_time, end_time
+    )
+
 
+def sensor_data_page(
+    session: SessionDep,
+    media_type: str | None,
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    count: Literal["exact", "estimate", "none"],
+    class_type: str | None,
+    approach: str | None,
+    sensor_id: uuid.UUID | None,
+    start_time: datetime | None,
+    end_time: datetime | None
+) -> Response:
+    """
+    One page of GET /sensors/data/, as JSON or as an Arrow or Parquet table.
+    """
     query = select(SensorData)
     
     # Apply filters
@@ -47,7 +115,7 @@ def getSensorData(
             raise HTTPException(status_code=400, detail="Invalid approach value")
 
     if sensor_id:
-        query = query.where(SensorData.sensor_id == sensor_id)
+        query = query.where(SensorData.sensor_key == crud.sensor_key_subquery(sensor_id))
     
     if start_time:
         query = query.where(SensorData.time >= start_time)
@@ -55,384 +123,934 @@ def getSensorData(
     if end_time:
         query = query.where(SensorData.time <= end_time)
 
-    # Count query
-    count_statement = select(func.count()).select_from(query.subquery())
-    count = session.execute(count_statement).scalar()
-
-    # Paginated query
-    statement = query.offset(skip).limit(limit)
-    sensor_data_records = session.execute(statement).all()
-
-    # Convert to public model
-    sensor_data_list = [
-        SensorDataPublic(
-            id=record.id,
-            sensor_id=record.sensor_id,
-            class_type=record.class_type,
-            approach=record.approach,
-            time=record.time,
-            sensor_name=record.sensor.name
+    # Count query, over the filters only
+    total = count_rows(session, query, count)
+
+    # Paginated query, one extra row tells whether there is a next page
+    statement = query.order_by(col(SensorData.time), col(SensorData.id))
+    if cursor:
+        try:
+            cursor_time, cursor_id = decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        statement = statement.where(tuple_(SensorData.time, SensorData.id) > (cursor_time, cursor_id))
+    elif skip:
+        statement = statement.offset(skip)
+    # Plain rows rather than ORM instances, the response is built from the tuples
+    rows = session.connection().execute(
+        statement.with_only_columns(
+            col(SensorData.time),
+            col(SensorData.id),
+            col(SensorData.sensor_key),
+            col(SensorData.class_type),
+            col(SensorData.approach),
+        ).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+
+    # Sensor metadata comes from the registry, looked up once per sensor; like the export,
+    # a sensor missing from the registry gets empty fields
+    sensor_fields: dict[int, tuple[str, str]] = {}
+    for key in {row[2] for row in rows}:
+        sensor = sensor_registry.by_key(session, key)
+        sensor_fields[key] = (str(sensor.id) if sensor else "", sensor.name if sensor else "")
+
+    return off_loop(data_page_response, rows, sensor_fields, media_type, total, next_cursor)
+
+
+def data_page_response(
+    rows: list[Any],
+    sensor_fields: dict[int, tuple[str, str]],
+    media_type: str | None,
+    total: int | None,
+    next_cursor: str | None
+) -> Response:
+    """
+    Builds and encodes a data page from its rows, as JSON or as an Arrow or Parquet table.
+    """
+    if media_type:
+        headers = {}
+        if total is not None:
+            headers["X-Total-Count"] = str(total)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return Response(
+            content=table_bytes(
+                [
+                    ("sensor_id", "string", [sensor_fields[row[2]][0] for row in rows]),
+                    ("sensor_name", "string", [sensor_fields[row[2]][1] for row in rows]),
+                    ("class_type", "category", [row[3].value for row in rows]),
+                    ("approach", "category", [row[4].value for row in rows]),
+                    ("time", "timestamp", [row[0] for row in rows]),
+                ],
+                media_type,
+            ),
+            media_type=media_type,
+            headers=headers,
         )
-        for record in sensor_data_records
-    ]
 
-    return SensorDataPublicList(data=sensor_data_list, count=count)
+    # Plain dicts in the shape of SensorDataPublic, encoded without revalidation
+    sensor_data_list = []
+    for time, _, sensor_key, class_type, approach in rows:
+        fields = sensor_fields[sensor_key]
+        sensor_data_list.append({
+            "sensor_id": fields[0],
+            "sensor_name": fields[1],
+            "class_type": class_type,
+            "approach": approach,
+            "time": time,
+        })
+
+    return FastJSONResponse({"data": sensor_data_list, "count": total, "next_cursor": next_cursor})
+
+@router.get("/export", dependencies=[Depends(get_current_user_async)])
+async def export_sensor_data_route(
+    request: Request,
+    session: AsyncSessionDep,
+    format: ExportFormat = "csv",
+    class_type: str | None = None,
+    approach: str | None = None,
+    sensor_id: uuid.UUID | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None
+) -> StreamingResponse:
+    """
+    Streams every SensorData row matching the filters of GET /sensors/data/ as CSV or
+    NDJSON, ordered by time, from a server-side cursor in constant memory. The body is
+    gzip-compressed on the fly when the client sends Accept-Encoding: gzip.
+    """
+
+    class_code = None
+    if class_type:
+        try:
+            class_code = SENSOR_CLASS_CODES[SensorClass[class_type]]
+        except KeyError:
+            raise HTTPException(status_code=400, detail="Invalid class_type value")
+
+    approach_code = None
+    if approach:
+        try:
+            approach_code = APPROACH_CODES[Approach[approach]]
+        except KeyError:
+            raise HTTPException(status_code=400, detail="Invalid approach value")
+
+    sensor_key = None
+    if sensor_id:
+        # Unknown sensors match no rows
+        sensor_key = (await run_read(session, sensor_registry.keys, {sensor_id})).get(sensor_id, 0)
+
+    export_filter = ExportFilter(
+        sensor_key=sensor_key,
+        class_code=class_code,
+        approach_code=approach_code,
+        start_time=to_utc_naive(start_time) if start_time else None,
+        end_time=to_utc_naive(end_time) if end_time else None,
+    )
+    compress = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="sensor_data.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        export_sensor_data(export_filter, format, compress),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
 
 def downtime(session: SessionDep, sensor_id: uuid.UUID) -> int:
     """
     Checks if the sensor is up. Returns 0 if the sensor is up, otherwise returns -1.
+    Answered from the in-process sensor status, without reading the event tables.
     """
-   ## As I said in ReadMe if there was more time  Iwould complete this part :)
-    return 0
-   
+    return 0 if sensor_status.get(session, sensor_id).is_up(datetime.utcnow()) else -1
 
-@router.get("/counts", response_model=List[ApproachData])
-def get_hourly_counts(
-    session: SessionDep,
-    start_date: datetime,
-    end_date: datetime,
-    sensor_id: Optional[uuid.UUID] = None,
-    approach: Optional[str] = None,
-    sensorclass: Optional[str] = None
-) -> Any:
+
+# Filters of the count endpoints, each taking one or more values
+SensorIdFilter = list[uuid.UUID] | None
+ValueFilter = list[str] | None
+
+
+def sensors_down(session: SessionDep, sensor_ids: list[uuid.UUID]) -> bool:
     """
-    Returns detailed hourly counts for a specific date range, sensor, approach, and class.
+    Whether every one of the sensors is down.
     """
+    return all(downtime(session, sensor_id) == -1 for sensor_id in set(sensor_ids))
 
-    # Define the hour truncation
-    hour_trunc = func.date_trunc("hour", SensorData.time)
 
-    # Base query
-    query = select(
-        hour_trunc.label("hour"),
-        SensorData.approach,
-        func.count(SensorData.id).label("count")
-    ).select_from(SensorData).where(
-        SensorData.time >= start_date,
-        SensorData.time <= end_date
-    )
+def count_groups(by_sensor: bool, *columns: str) -> list[str]:
+    """
+    The group_by columns of a count request, led by sensor_key for group_by=sensor.
+    """
+    return ["sensor_key", *columns] if by_sensor else list(columns)
 
-    # Apply filters
+
+def result_sensor_ids(session: SessionDep, results: Any, group_by: list[str]) -> dict[int, uuid.UUID] | None:
+    """
+    Maps the sensor keys of counts grouped by sensor to their ids, None when the counts
+    are not grouped by sensor.
+    """
+    if "sensor_key" not in group_by:
+        return None
+    return sensor_registry.ids(session, {row[1] for row in results if row[1] is not None})
+
+
+def count_filters(
+    session: SessionDep,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter
+) -> dict[str, Any]:
+    """
+    Validates the sensor, approach and class filters of the count endpoints, and resolves
+    the sensors to their keys.
+    """
+    filters: dict[str, Any] = {}
     if sensor_id:
-        query = query.where(SensorData.sensor_id == sensor_id)
+        # Unknown sensors match no counts
+        filters["sensor_keys"] = sorted(sensor_registry.keys(session, set(sensor_id)).values())
 
     if approach:
         try:
-            approach_enum = Approach[approach]
-            query = query.where(SensorData.approach == approach_enum)
+            filters["approaches"] = [Approach[value] for value in approach]
         except KeyError:
             raise HTTPException(status_code=400, detail="Invalid approach value")
 
     if sensorclass:
         try:
-            sensorclass_enum = SensorClass[sensorclass]
-            query = query.where(SensorData.class_type == sensorclass_enum)
+            filters["class_types"] = [SensorClass[value] for value in sensorclass]
         except KeyError:
             raise HTTPException(status_code=400, detail="Invalid sensorclass value")
+    return filters
 
-    # Group by hour, approach.
-    query = query.group_by(hour_trunc, SensorData.approach)
-    query = query.order_by(hour_trunc)
 
-    # Execute the query and fetch results
-    results = session.execute(query).all()
+def fetch_counts(
+    session: SessionDep,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    group_by: list[str],
+    live: bool = False
+) -> Any:
+    """
+    Validates the common count filters and returns the bucketed counts, read from the
+    live counters when live is set and they cover the range, otherwise from the rollups.
+    """
+    filters = count_filters(session, sensor_id, approach, sensorclass)
+
+    if live and live_counters.covers(width, start_time):
+        if not live_counters.loaded:
+            live_counters.reload(session)
+        return live_counters.bucketed_counts(
+            width=width,
+            start_time=start_time,
+            end_time=end_time,
+            group_by=group_by,
+            **filters
+        )
 
-    # Check if there are no results
-    if not results:
-        if sensor_id:
-            status = downtime(session, sensor_id)
-            if status == 0:
-                return []  # Sensor is up but no data
-            else:
-                return [-1]  # Sensor is down
-        else:
-            return []  # No sensor_id provided, so we can't check downtime
+    try:
+        return bucketed_counts(
+            session,
+            width=width,
+            start_time=start_time,
+            end_time=end_time,
+            group_by=group_by,
+            **filters
+        )
+    except AggregationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Generate a list of all hours within the date range
-    all_hours = [start_date + timedelta(hours=i) for i in range((end_date - start_date).days * 23 + (end_date - start_date).seconds // 3600 + 1)]
 
-    # Structure the response
-    approach_dict = {}
-    for result in results:
-        hour, approach, count = result
-        if approach not in approach_dict:
-            approach_dict[approach] = {h: 0 for h in all_hours}
-        approach_dict[approach][hour] = count
 
-    approach_list = []
-    for approach, hour_counts in approach_dict.items():
-        hours = [HourlyData(time=hour, count=count) for hour, count in hour_counts.items()]
-        approach_list.append(ApproachData(approach=approach, hours=hours))
+def fetch_series(
+    session: SessionDep,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    group_by: list[str],
+    live: bool = False
+) -> tuple[CountSeries, list[datetime]]:
+    """
+    Like fetch_counts, but returns one zero-filled count series per group with data,
+    along with the start of every bucket of the range.
+    """
+    filters = count_filters(session, sensor_id, approach, sensorclass)
 
-    return approach_list
+    try:
+        buckets = bucket_starts(width, *bucket_range(width, start_time, end_time))
+        if live and live_counters.covers(width, start_time):
+            if not live_counters.loaded:
+                live_counters.reload(session)
+            series = live_counters.bucketed_series(
+                width=width,
+                start_time=start_time,
+                end_time=end_time,
+                group_by=group_by,
+                **filters
+            )
+        else:
+            series = bucketed_series(
+                session,
+                width=width,
+                start_time=start_time,
+                end_time=end_time,
+                group_by=group_by,
+                **filters
+            )
+    except AggregationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return series, buckets
+
+
+def series_sensor_ids(session: SessionDep, series: CountSeries, group_by: list[str]) -> dict[int, uuid.UUID] | None:
+    """
+    Like result_sensor_ids, for count series.
+    """
+    if "sensor_key" not in group_by:
+        return None
+    return sensor_registry.ids(session, {group[0] for group, _ in series})
 
 
-@router.get("/live", response_model=List[ApproachData])
-def get_latest_hour_counts(
+def approach_series(
     session: SessionDep,
-    sensor_id: Optional[uuid.UUID] = None,
-    approach: Optional[str] = None,
-    sensorclass: Optional[str] = None
-) -> Any:
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    by_sensor: bool = False,
+    live: bool = False
+) -> bytes:
     """
-    Returns detailed counts for the latest 1 hour, sensor, approach, and class.
+    Builds one zero-filled count series per approach that has data in the range, or per
+    sensor and approach with by_sensor, encoded as JSON in the shape of ApproachDataList.
     """
-
-    # Define the current time and the start time for the latest 1 hour
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(hours=1)
-
-    # Define the minute truncation
-    minute_trunc = func.date_trunc("minute", SensorData.time)
-
-    # Base query
-    query = select(
-        minute_trunc.label("minute"),
-        SensorData.approach,
-        func.count(SensorData.id).label("count")
-    ).select_from(SensorData).where(
-        SensorData.time >= start_time,
-        SensorData.time <= end_time
+    series, buckets = fetch_series(
+        session, width, start_time, end_time, sensor_id, approach, sensorclass,
+        group_by=count_groups(by_sensor, "approach"), live=live
     )
 
-    # Apply filters
-    if sensor_id:
-        query = query.where(SensorData.sensor_id == sensor_id)
+    # Check if there are no results; whether the sensors are down only matters for ranges
+    # reaching the present, and closed ranges may be cached
+    recent = datetime.utcnow() - timedelta(seconds=settings.SENSOR_DOWN_AFTER_SECONDS)
+    if not series:
+        if sensor_id and to_utc_naive(end_time) >= recent:
+            if not sensors_down(session, sensor_id):
+                return dump_json([])  # Sensors are up but no data
+            else:
+                return dump_json([-1])  # Sensors are down
+        else:
+            return dump_json([])  # No sensor_id provided, so we can't check downtime
 
-    if approach:
-        try:
-            approach_enum = Approach[approach]
-            query = query.where(SensorData.approach == approach_enum)
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid approach value")
+    sensor_ids = series_sensor_ids(session, series, ["sensor_key"]) if by_sensor else None
+    return off_loop(approach_json, series, buckets, sensor_ids)
 
-    if sensorclass:
-        try:
-            sensorclass_enum = SensorClass[sensorclass]
-            query = query.where(SensorData.class_type == sensorclass_enum)
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid sensorclass value")
 
-    # Group by minute, approach.
-    query = query.group_by(minute_trunc, SensorData.approach)
-    query = query.order_by(minute_trunc)
+def approach_json(
+    series: CountSeries,
+    buckets: list[datetime],
+    sensor_ids: dict[int, uuid.UUID] | None
+) -> bytes:
+    """
+    Encodes count series grouped by approach, or by sensor_key and approach when
+    sensor_ids names the sensors.
+    """
+    # Plain dicts in the shape of ApproachData
+    if sensor_ids is not None:
+        return dump_json([
+            {
+                "sensor_id": sensor_ids[sensor_key],
+                "approach": approach,
+                "hours": [
+                    {"time": bucket, "count": count} for bucket, count in zip(buckets, counts, strict=True)
+                ],
+            }
+            for (sensor_key, approach), counts in series
+        ])
+    return dump_json([
+        {
+            "approach": approach,
+            "hours": [{"time": bucket, "count": count} for bucket, count in zip(buckets, counts, strict=True)],
+        }
+        for (approach,), counts in series
+    ])
+
+def detailed_series(
+    session: SessionDep,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    time_key: str,
+    by_sensor: bool = False,
+    live: bool = False
+) -> bytes:
+    """
+    Builds one entry per bucket, or per bucket and sensor with by_sensor, with the counts
+    of every approach and class combination, encoded as JSON.
+    """
+    group_by = count_groups(by_sensor, "approach", "class_type")
+    results = fetch_counts(
+        session, width, start_time, end_time, sensor_id, approach, sensorclass,
+        group_by=group_by, live=live
+    )
 
-    # Execute the query and fetch results
-    results = session.execute(query).all()
+    sensor_ids = result_sensor_ids(session, results, group_by)
+    return off_loop(lambda: dump_json(detailed_rows(results, time_key, sensor_ids)))
 
-    # Check if there are no results
-    if not results:
-        if sensor_id:
-            status = downtime(session, sensor_id)
-            if status == 0:
-                return []  # Sensor is up but no data
-            else:
-                return [-1]  # Sensor is down
-        else:
-            return []  # No sensor_id provided, so we can't check downtime
 
-    # Generate a list of all minutes within the latest 1 hour
-    all_minutes = [start_time + timedelta(minutes=i) for i in range(60)]
+def columnar_counts(
+    session: SessionDep,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    group_by: list[str],
+    live: bool = False
+) -> bytes:
+    """
+    Builds the counts as parallel arrays, one per group with data in the range, encoded
+    as JSON in the shape of ColumnarCounts.
+    """
+    series, _ = fetch_series(
+        session, width, start_time, end_time, sensor_id, approach, sensorclass,
+        group_by=group_by, live=live
+    )
+    sensor_ids = series_sensor_ids(session, series, group_by)
 
-    # Structure the response
-    approach_dict = {}
-    for result in results:
-        minute, approach, count = result
-        if approach not in approach_dict:
-            approach_dict[approach] = {m: 0 for m in all_minutes}
-        approach_dict[approach][minute] = count
+    # Like the other count responses, an empty range only says the sensors are down
+    # when it reaches the present
+    recent = datetime.utcnow() - timedelta(seconds=settings.SENSOR_DOWN_AFTER_SECONDS)
+    sensor_down = None
+    if not series and sensor_id and to_utc_naive(end_time) >= recent:
+        sensor_down = sensors_down(session, sensor_id)
 
-    approach_list = []
-    for approach, minute_counts in approach_dict.items():
-        minutes = [HourlyData(time=minute, count=count) for minute, count in minute_counts.items()]
-        approach_list.append(ApproachData(approach=approach, hours=minutes))
+    def encode() -> bytes:
+        columns = columnar_series(series, width, start_time, end_time, sensor_ids)
+        if sensor_down is not None:
+            columns["sensorDown"] = sensor_down
+        return dump_json(columns)
 
-    return approach_list
+    return off_loop(encode)
 
-@router.post("/", response_model=SensorDataPublicList)
-def create_sensor_data(
-    sensor_data: List[SensorDataCreate],
-    session: SessionDep
-) -> SensorDataPublicList:
+
+def counts_table(
+    session: SessionDep,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    group_by: list[str],
+    media_type: str,
+    live: bool = False
+) -> bytes:
     """
-    Receive sensor data and store it into the database.
+    Builds the counts as an Arrow or Parquet long table with every bucket of each group
+    that has data.
     """
+    series, buckets = fetch_series(
+        session, width, start_time, end_time, sensor_id, approach, sensorclass,
+        group_by=group_by, live=live
+    )
+    sensor_ids = series_sensor_ids(session, series, group_by)
+    return off_loop(count_table, series, buckets, group_by, media_type, sensor_ids)
 
-    # Convert Pydantic models to SQLAlchemy models
-    sensor_data_objects = [
-        SensorData(
-            sensor_id=data.sensor_id,
-            class_type=SensorClass[data.class_type],
-            approach=Approach[data.approach],
-            time=data.time
-        )
-        for data in sensor_data
-    ]
 
+def detailed_json(
+    session: SessionDep,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    time_key: str
+) -> bytes:
+    """
+    Renders the detailed series as JSON in Postgres, straight from the rollups.
+    """
+    filters = count_filters(session, sensor_id, approach, sensorclass)
     try:
-        session.add_all(sensor_data_objects)
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
-
-    # Convert stored objects to Pydantic models
-    stored_data = [
-        SensorDataPublic(
-            sensor_id=obj.sensor_id,
-            class_type=obj.class_type.value,
-            approach=obj.approach.value,
-            time=obj.time
+        return detailed_counts_json(
+            session, width=width, start_time=start_time, end_time=end_time, time_key=time_key, **filters
         )
-        for obj in sensor_data_objects
-    ]
+    except AggregationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def filter_key(values: list[Any] | None) -> tuple[Any, ...] | None:
+    return tuple(sorted(set(values))) if values else None
+
+
+def cached_counts(
+    endpoint: str,
+    width: BucketWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    by_sensor: bool,
+    compute: Callable[[], bytes],
+    media_type: str = "application/json"
+) -> Response:
+    """
+    Serves a count response from the count cache, keyed on the bucket-aligned range, the
+    filter values in any order, the grouping and the media type.
+    """
+    first_bucket = floor_to_bucket(to_utc_naive(start_time), width)
+    last_bucket = floor_to_bucket(to_utc_naive(end_time), width)
+    key = (
+        endpoint, media_type, width, first_bucket, last_bucket, by_sensor,
+        filter_key(sensor_id), filter_key(approach), filter_key(sensorclass),
+    )
+    body = count_cache.get_or_compute(
+        key,
+        frozenset(sensor_id) if sensor_id else None,
+        first_bucket,
+        last_bucket + BUCKET_WIDTHS[width],
+        compute,
+    )
+    return Response(content=body, media_type=media_type)
+
+
+@router.get("/counts", response_model=ApproachDataList | ColumnarCounts)
+async def get_hourly_counts(
+    request: Request,
+    session: AsyncSessionDep,
+    start_date: datetime,
+    end_date: datetime,
+    sensor_id: SensorIdFilter = Query(default=None),
+    approach: ValueFilter = Query(default=None),
+    sensorclass: ValueFilter = Query(default=None),
+    bucket: BucketWidth = "1h",
+    format: Literal["json", "columnar"] = "json",
+    group_by: Literal["sensor"] | None = None
+) -> Any:
+    """
+    Returns counts per approach for a specific date range, sensor, approach, and class,
+    with one entry per bucket (hourly by default). Closed windows are served from the
+    count cache.
+
+    sensor_id, approach and sensorclass may be repeated to match any of their values.
+    group_by=sensor returns one series per sensor and approach, each with its sensor_id,
+    from a single query however many sensors are asked for.
+
+    format=columnar returns the start, the bucket width and one count array per approach
+    instead of an object per bucket.
+
+    Arrow or Parquet output, chosen through Accept, is a table of (time, approach, count).
+    """
+    by_sensor = group_by == "sensor"
+    media_type = tabular_media_type(request)
+    if media_type:
+        return await run_read(
+            session, counts_table_response, "counts", start_date, end_date, sensor_id, approach, sensorclass,
+            bucket, count_groups(by_sensor, "approach"), media_type
+        )
+
+    return await run_read(
+        session, counts_response, start_date, end_date, sensor_id, approach, sensorclass, bucket, format, by_sensor
+    )
 
-    return SensorDataPublicList(data=stored_data, count=len(stored_data))
 
-@router.get("/detailed_counts", response_model=List[HourlyApproachCount])
-def get_detailed_hourly_counts(
+def counts_table_response(
     session: SessionDep,
-    current_user: CurrentUser,
+    endpoint: str,
     start_date: datetime,
     end_date: datetime,
-    sensor_id: Optional[uuid.UUID] = None,
-    approach: Optional[str] = None,
-    sensorclass: Optional[str] = None
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    bucket: BucketWidth,
+    group_by: list[str],
+    media_type: str
+) -> Response:
+    """
+    The Arrow or Parquet response of /counts or /detailed_counts, through the count cache.
+    """
+    return cached_counts(
+        endpoint, bucket, start_date, end_date, sensor_id, approach, sensorclass, "sensor_key" in group_by,
+        lambda: counts_table(
+            session, bucket, start_date, end_date, sensor_id, approach, sensorclass, group_by, media_type
+        ),
+        media_type,
+    )
+
+
+def counts_response(
+    session: SessionDep,
+    start_date: datetime,
+    end_date: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    bucket: BucketWidth,
+    format: Literal["json", "columnar"],
+    by_sensor: bool
+) -> Response:
+    """
+    The JSON response of /counts, shared with the batch query endpoint.
+    """
+    if format == "columnar":
+        return cached_counts(
+            "counts:columnar", bucket, start_date, end_date, sensor_id, approach, sensorclass, by_sensor,
+            lambda: columnar_counts(
+                session, bucket, start_date, end_date, sensor_id, approach, sensorclass,
+                count_groups(by_sensor, "approach")
+            )
+        )
+
+    return cached_counts(
+        "counts", bucket, start_date, end_date, sensor_id, approach, sensorclass, by_sensor,
+        lambda: approach_series(
+            session, bucket, start_date, end_date, sensor_id, approach, sensorclass, by_sensor
+        )
+    )
+
+
+@router.get("/live", response_model=ApproachDataList | ColumnarCounts)
+async def get_latest_hour_counts(
+    request: Request,
+    session: AsyncSessionDep,
+    sensor_id: SensorIdFilter = Query(default=None),
+    approach: ValueFilter = Query(default=None),
+    sensorclass: ValueFilter = Query(default=None),
+    bucket: BucketWidth = "1m",
+    format: Literal["json", "columnar"] = "json",
+    group_by: Literal["sensor"] | None = None
 ) -> Any:
     """
-    Returns detailed hourly counts for a specific date range, sensor, approach, and class.
+    Returns counts per approach for the latest 1 hour, sensor, approach, and class,
+    with one entry per bucket (per minute by default). Served from the live counters.
+    Filters and group_by=sensor work as for /counts.
+    format=columnar returns one count array per approach instead of an object per bucket.
+    Arrow or Parquet output, chosen through Accept, is a table of (time, approach, count).
     """
+    by_sensor = group_by == "sensor"
+    media_type = tabular_media_type(request)
+    if media_type:
+        start_time, end_time = live_window(bucket, timedelta(hours=1))
+        return Response(
+            content=await run_read(
+                session, counts_table, bucket, start_time, end_time, sensor_id, approach, sensorclass,
+                count_groups(by_sensor, "approach"), media_type, live=True
+            ),
+            media_type=media_type,
+        )
+
+    return await run_read(
+        session, live_response, sensor_id, approach, sensorclass, bucket, format, by_sensor
+    )
 
-    # Define the hour truncation
-    hour_trunc = func.date_trunc("hour", SensorData.time)
 
-    # Base query
-    query = select(
-        hour_trunc.label("hour"),
-        SensorData.approach,
-        SensorData.class_type,
-        func.count(SensorData.id).label("count")
-    ).select_from(SensorData).where(
-        SensorData.time >= start_date,
-        SensorData.time <= end_date
+def live_window(bucket: BucketWidth, window: timedelta) -> tuple[datetime, datetime]:
+    """
+    The buckets of the latest window, ending with the current one, in UTC like the
+    stored times.
+    """
+    end_time = datetime.utcnow()
+    return end_time - window + BUCKET_WIDTHS[bucket], end_time
+
+
+def live_response(
+    session: SessionDep,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    bucket: BucketWidth,
+    format: Literal["json", "columnar"],
+    by_sensor: bool
+) -> Response:
+    """
+    The JSON response of /live, shared with the batch query endpoint.
+    """
+    start_time, end_time = live_window(bucket, timedelta(hours=1))
+    if format == "columnar":
+        return Response(
+            content=columnar_counts(
+                session, bucket, start_time, end_time, sensor_id, approach, sensorclass,
+                count_groups(by_sensor, "approach"), live=True
+            ),
+            media_type="application/json",
+        )
+
+    return Response(
+        content=approach_series(
+            session, bucket, start_time, end_time, sensor_id, approach, sensorclass, by_sensor, live=True
+        ),
+        media_type="application/json",
     )
 
-    # Apply filters
-    if sensor_id:
-        query = query.where(SensorData.sensor_id == sensor_id)
 
-    if approach:
-        try:
-            approach_enum = Approach[approach]
-            query = query.where(SensorData.approach == approach_enum)
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid approach value")
+@ingest_router.post("/", response_model=SensorDataIngestReceipt)
+def create_sensor_data(
+    sensor_data: List[SensorDataCreate],
+    session: IngestSessionDep,
+    response: Response,
+    write_behind: bool = False
+) -> SensorDataIngestReceipt:
+    """
+    Receive sensor data and bulk load it into the database.
+    Returns a receipt with the number of stored events and their time range, or 429
+    with Retry-After while too much ingest is already in flight.
 
-    if sensorclass:
+    With write_behind the validated batch is queued and stored by a background flush,
+    and the receipt comes back with 202 before the events are in the database.
+    """
+
+    if write_behind:
         try:
-            sensorclass_enum = SensorClass[sensorclass]
-            query = query.where(SensorData.class_type == sensorclass_enum)
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid sensorclass value")
+            check_sensor_data(session, sensor_data)
+            receipt = ingest_queue.submit_sensor_data(sensor_data)
+        except IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except IngestQueueFull as e:
+            raise IngestOverloaded(str(e))
+        except IngestQueueUnavailable as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_SECONDS)},
+            )
+        response.status_code = 202
+        return receipt
+
+    with ingest_admission.rows(len(sensor_data)):
+        try:
+            receipt = copy_sensor_data(session, sensor_data)
+            session.commit()
+        except IngestError as e:
+            session.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+    return receipt
+
+@router.get(
+    "/detailed_counts",
+    dependencies=[Depends(get_current_user_async)],
+    response_model=list[HourlyApproachCount] | ColumnarCounts,
+)
+async def get_detailed_hourly_counts(
+    request: Request,
+    session: AsyncSessionDep,
+    start_date: datetime,
+    end_date: datetime,
+    sensor_id: SensorIdFilter = Query(default=None),
+    approach: ValueFilter = Query(default=None),
+    sensorclass: ValueFilter = Query(default=None),
+    bucket: BucketWidth = "1h",
+    render: Literal["app", "postgres"] = "app",
+    format: Literal["json", "columnar"] = "json",
+    group_by: Literal["sensor"] | None = None
+) -> Any:
+    """
+    Returns detailed counts for a specific date range, sensor, approach, and class,
+    with one entry per bucket (hourly by default). Closed windows are served from the
+    count cache.
 
-    # Group by hour, approach, and class_type
-    query = query.group_by(hour_trunc, SensorData.approach, SensorData.class_type)
-    query = query.order_by(hour_trunc)
-
-    # Execute the query and fetch results
-    results = session.execute(query).all()
-
-    # All possible approach and class_type combinations
-    all_combinations = {f"{a}_{c}": 0 for a, c in product(Approach, SensorClass)}
-
-    # Structure the response
-    hourly_counts = []
-    for hour, hour_group in groupby(results, key=lambda x: x.hour):
-        results_dict = all_combinations.copy()
-        for result in hour_group:
-            key = f"{result.approach}_{result.class_type}"
-            results_dict[key] = result.count
-
-        total_count = sum(results_dict.values())
-        hourly_counts.append({
-            "hour": hour,
-            "totalCount": total_count,
-            "results": results_dict
-        })
+    sensor_id, approach and sensorclass may be repeated to match any of their values.
+    group_by=sensor returns an entry per bucket and sensor, with its sensor_id, for every
+    sensor that has data in the range.
 
-    return hourly_counts
-    
+    render=postgres has Postgres build the JSON document, which is passed through as is.
+    format=columnar instead returns the start, the bucket width and one count array per
+    "<approach>_<class>" combination.
 
-@router.get("/live/detailed_counts", response_model=List[MinuteApproachCount])
-def get_detailed_minute_counts(
+    Arrow or Parquet output, chosen through Accept, is a long table of
+    (time, approach, class_type, count) with every bucket of each combination that has data.
+    """
+    by_sensor = group_by == "sensor"
+    media_type = tabular_media_type(request)
+    if media_type:
+        return await run_read(
+            session, counts_table_response, "detailed_counts", start_date, end_date, sensor_id, approach, sensorclass,
+            bucket, count_groups(by_sensor, "approach", "class_type"), media_type
+        )
+
+    return await run_read(
+        session, detailed_counts_response, start_date, end_date, sensor_id, approach, sensorclass, bucket,
+        render, format, by_sensor
+    )
+
+
+def detailed_counts_response(
     session: SessionDep,
-    sensor_id: Optional[uuid.UUID] = None,
-    approach: Optional[str] = None,
-    sensorclass: Optional[str] = None
-) -> Any:
+    start_date: datetime,
+    end_date: datetime,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    bucket: BucketWidth,
+    render: Literal["app", "postgres"],
+    format: Literal["json", "columnar"],
+    by_sensor: bool
+) -> Response:
     """
-    Returns detailed minute counts for the last 30 minutes, filtered by sensor, approach, and class.
+    The JSON response of /detailed_counts, shared with the batch query endpoint.
     """
+    if format == "columnar":
+        return cached_counts(
+            "detailed_counts:columnar", bucket, start_date, end_date, sensor_id, approach, sensorclass, by_sensor,
+            lambda: columnar_counts(
+                session, bucket, start_date, end_date, sensor_id, approach, sensorclass,
+                count_groups(by_sensor, "approach", "class_type")
+            )
+        )
 
-    # Get the current time and calculate the start time (30 minutes ago)
-    end_date = datetime.now()
-    start_date = end_date - timedelta(minutes=30)
+    if render == "postgres":
+        if by_sensor:
+            raise HTTPException(status_code=400, detail="render=postgres does not support group_by=sensor")
+        return cached_counts(
+            "detailed_counts:postgres", bucket, start_date, end_date, sensor_id, approach, sensorclass, by_sensor,
+            lambda: detailed_json(session, bucket, start_date, end_date, sensor_id, approach, sensorclass, "hour")
+        )
 
-    # Define the minute truncation
-    minute_trunc = func.date_trunc("minute", SensorData.time)
+    return cached_counts(
+        "detailed_counts", bucket, start_date, end_date, sensor_id, approach, sensorclass, by_sensor,
+        lambda: detailed_series(
+            session, bucket, start_date, end_date, sensor_id, approach, sensorclass, "hour", by_sensor
+        )
+    )
 
-    # Base query
-    query = select(
-        minute_trunc.label("minute"),
-        SensorData.approach,
-        SensorData.class_type,
-        func.count(SensorData.id).label("count")
-    ).select_from(SensorData).where(
-        SensorData.time >= start_date,
-        SensorData.time <= end_date
+
+@router.get("/live/detailed_counts", response_model=list[MinuteApproachCount] | ColumnarCounts)
+async def get_detailed_minute_counts(
+    request: Request,
+    session: AsyncSessionDep,
+    sensor_id: SensorIdFilter = Query(default=None),
+    approach: ValueFilter = Query(default=None),
+    sensorclass: ValueFilter = Query(default=None),
+    bucket: BucketWidth = "1m",
+    render: Literal["app", "postgres"] = "app",
+    format: Literal["json", "columnar"] = "json",
+    group_by: Literal["sensor"] | None = None
+) -> Any:
+    """
+    Returns detailed counts for the last 30 minutes, filtered by sensor, approach, and class,
+    with one entry per bucket (per minute by default). Served from the live counters.
+    Filters and group_by=sensor work as for /detailed_counts.
+    render=postgres instead has Postgres build the JSON document from the minute rollup,
+    which is passed through as is. format=columnar returns one count array per combination.
+    Arrow or Parquet output, chosen through Accept, is a long table of
+    (time, approach, class_type, count).
+    """
+    by_sensor = group_by == "sensor"
+    media_type = tabular_media_type(request)
+    if media_type:
+        start_date, end_date = live_window(bucket, timedelta(minutes=30))
+        return Response(
+            content=await run_read(
+                session, counts_table, bucket, start_date, end_date, sensor_id, approach, sensorclass,
+                count_groups(by_sensor, "approach", "class_type"), media_type, live=True
+            ),
+            media_type=media_type,
+        )
+
+    return await run_read(
+        session, live_detailed_counts_response, sensor_id, approach, sensorclass, bucket, render, format, by_sensor
     )
 
-    # Apply filters
-    if sensor_id:
-        query = query.where(SensorData.sensor_id == sensor_id)
 
-    if approach:
-        try:
-            approach_enum = Approach[approach]
-            query = query.where(SensorData.approach == approach_enum)
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid approach value")
+def live_detailed_counts_response(
+    session: SessionDep,
+    sensor_id: SensorIdFilter,
+    approach: ValueFilter,
+    sensorclass: ValueFilter,
+    bucket: BucketWidth,
+    render: Literal["app", "postgres"],
+    format: Literal["json", "columnar"],
+    by_sensor: bool
+) -> Response:
+    """
+    The JSON response of /live/detailed_counts, shared with the batch query endpoint.
+    """
+    start_date, end_date = live_window(bucket, timedelta(minutes=30))
+    if format == "columnar":
+        return Response(
+            content=columnar_counts(
+                session, bucket, start_date, end_date, sensor_id, approach, sensorclass,
+                count_groups(by_sensor, "approach", "class_type"), live=True
+            ),
+            media_type="application/json",
+        )
 
-    if sensorclass:
-        try:
-            sensorclass_enum = SensorClass[sensorclass]
-            query = query.where(SensorData.class_type == sensorclass_enum)
-        except KeyError:
-            raise HTTPException(status_code=400, detail="Invalid sensorclass value")
+    if render == "postgres":
+        if by_sensor:
+            raise HTTPException(status_code=400, detail="render=postgres does not support group_by=sensor")
+        return Response(
+            content=detailed_json(session, bucket, start_date, end_date, sensor_id, approach, sensorclass, "minute"),
+            media_type="application/json",
+        )
 
-    # Group by minute, approach, and class_type
-    query = query.group_by(minute_trunc, SensorData.approach, SensorData.class_type)
-    query = query.order_by(minute_trunc)
-
-    # Execute the query and fetch results
-    results = session.execute(query).all()
-
-    # All possible approach and class_type combinations
-    all_combinations = {f"{a}_{c}": 0 for a, c in product(Approach, SensorClass)}
-
-    # Structure the response
-    minute_counts = []
-    for minute, minute_group in groupby(results, key=lambda x: x.minute):
-        results_dict = all_combinations.copy()
-        for result in minute_group:
-            key = f"{result.approach}_{result.class_type}"
-            results_dict[key] = result.count
-
-        total_count = sum(results_dict.values())
-        minute_counts.append({
-            "minute": minute,
-            "totalCount": total_count,
-            "results": results_dict
-        })
+    return Response(
+        content=detailed_series(
+            session, bucket, start_date, end_date, sensor_id, approach, sensorclass, "minute", by_sensor, live=True
+        ),
+        media_type="application/json",
+    )
+
+
+@router.get("/live/stream")
+async def stream_live_counts(
+    request: Request,
+    session: AsyncSessionDep,
+    sensor_id: SensorIdFilter = Query(default=None),
+    approach: ValueFilter = Query(default=None),
+    sensorclass: ValueFilter = Query(default=None)
+) -> StreamingResponse:
+    """
+    Streams live minute counts as Server-Sent Events, filtered by sensor, approach, and class,
+    each of which may be repeated to match any of its values.
 
-    return minute_counts
\ No newline at end of file
+    The first "snapshot" event holds every minute of the live window, in the shape of
+    /live/detailed_counts. Each following "counts" event holds only the minutes whose
+    counts changed since the last event.
+    """
+
+    def resolve_filter(session: SessionDep) -> StreamFilter:
+        if not live_counters.loaded:
+            live_counters.reload(session)
+        filters = count_filters(session, sensor_id, approach, sensorclass)
+        return StreamFilter(*(
+            frozenset(filters[name]) if name in filters else None
+            for name in StreamFilter._fields
+        ))
+
+    # run_read hands the connection back now, not when the stream ends
+    stream_filter = await run_read(session, resolve_filter)
+
+    async def events() -> Any:
+        async for message in live_stream.subscribe(stream_filter):
+            if await request.is_disconnected():
+                break
+            yield message
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,16 +1,27 @@
 import uuid
-from typing import Any, List, Optional
+from typing import Any, List
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from app.models.sensor_health_models import SensorHealth
-from app.schema.sensor_health_schemas import GapDetails, SensorHealthCreate
-from fastapi import APIRouter, HTTPException
-from sqlmodel import select
+from app.schema.sensor_health_schemas import GapDetails, HealthSummary, SensorHealthCreate
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
 
-from app.api.deps import SessionDep
+from app.api.deps import AsyncSessionDep, IngestSessionDep, off_loop, run_read
+from app.core.admission import IngestOverloaded, IngestRoute, ingest_admission
+from app.core.config import settings
+from app.core.aggregation import BUCKET_WIDTHS
+from app.core.health_gaps import health_gaps
+from app.core.health_rollups import SummaryWidth, health_summary
+from app.core.ingest import IngestError, check_sensor_health, insert_sensor_health
+from app.core.ingest_queue import IngestQueueFull, IngestQueueUnavailable, ingest_queue
+from app.core.json_response import FastJSONResponse
+from app.core.rollups import to_utc_naive
 
 router = APIRouter()
+# Ingest endpoints, behind admission control
+ingest_router = APIRouter(route_class=IngestRoute)
 
 def format_duration(duration: timedelta) -> str:
     seconds = int(duration.total_seconds())
@@ -29,74 +40,178 @@ def format_duration(duration: timedelta) -> str:
     return ', '.join(parts)
 
 @router.get("/gaps", response_model=List[GapDetails])
-def get_sensor_health_gaps(
-    session: SessionDep,
-    sensor_id: Optional[uuid.UUID] = None
+async def get_sensor_health_gaps(
+    session: AsyncSessionDep,
+    sensor_id: uuid.UUID | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    min_gap_seconds: int = Query(default=300, ge=settings.HEALTH_INTERVAL_MAX_GAP_SECONDS),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000)
 ) -> Any:
     """
-    Returns gaps longer than 5 minutes between consecutive SensorHealth rows.
-    Optionally filter by sensor_id.
+    Returns gaps longer than min_gap_seconds between consecutive health reports of the
+    same sensor, for gaps ending between start_time and end_time. Read from the state
+    intervals, so min_gap_seconds is at least HEALTH_INTERVAL_MAX_GAP_SECONDS.
+    Defaults to the last HEALTH_GAPS_DEFAULT_WINDOW_DAYS days; optionally filter by sensor_id.
     """
-    # Fetch SensorHealth records ordered by time and optionally filter by sensor_id
-    query = session.query(SensorHealth).order_by(SensorHealth.time)
-    if sensor_id:
-        query = query.filter(SensorHealth.sensor_id == sensor_id)
-    sensor_health_records = query.all()
-
-    gaps = []
-    for i in range(1, len(sensor_health_records)):
-        prev_record = sensor_health_records[i - 1]
-        current_record = sensor_health_records[i]
-
-        gap_duration = current_record.time - prev_record.time
-        if gap_duration > timedelta(minutes=5):
-            formatted_duration = format_duration(gap_duration)
-            gaps.append(GapDetails(
-                startTime=prev_record.time,
-                endTime=current_record.time,
-                duration=formatted_duration
-            ))
-
-    return gaps
-
-@router.post("/", response_model=List[SensorHealthCreate])
+    gaps = await run_read(
+        session, gap_details, sensor_id, start_time, end_time, min_gap_seconds, skip, limit
+    )
+    return await run_in_threadpool(FastJSONResponse, gaps)
+
+
+def gap_details(
+    session: Session,
+    sensor_id: uuid.UUID | None,
+    start_time: datetime | None,
+    end_time: datetime | None,
+    min_gap_seconds: int,
+    skip: int,
+    limit: int
+) -> list[GapDetails]:
+    end_time = to_utc_naive(end_time) if end_time else datetime.utcnow()
+    start_time = (
+        to_utc_naive(start_time) if start_time
+        else end_time - timedelta(days=settings.HEALTH_GAPS_DEFAULT_WINDOW_DAYS)
+    )
+    if end_time < start_time:
+        raise HTTPException(status_code=400, detail="end_time must not be before start_time")
+    if end_time - start_time > timedelta(days=settings.HEALTH_GAPS_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window must not exceed {settings.HEALTH_GAPS_MAX_WINDOW_DAYS} days"
+        )
+
+    results = health_gaps(
+        session,
+        start_time=start_time,
+        end_time=end_time,
+        min_gap=timedelta(seconds=min_gap_seconds),
+        sensor_id=sensor_id,
+        skip=skip,
+        limit=limit,
+    )
+
+    return off_loop(lambda: [
+        GapDetails(
+            sensor_id=result.sensor_id,
+            startTime=result.start,
+            endTime=result.end,
+            duration=format_duration(result.end - result.start),
+            durationSeconds=result.seconds
+        )
+        for result in results
+    ])
+
+@router.get("/summary", response_model=list[HealthSummary])
+async def get_sensor_health_summary(
+    session: AsyncSessionDep,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: uuid.UUID | None = None,
+    bucket: SummaryWidth = "1d",
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=settings.SENSOR_DATA_MAX_PAGE_SIZE)
+) -> Any:
+    """
+    Returns availability, fault time and data capture rate per sensor, read from the
+    hourly and daily health rollups. With bucket "1h" or "1d" there is an entry per
+    sensor and bucket between start_time and end_time; with "all" one entry per sensor
+    covering the whole window, including sensors that sent no reports. Optionally
+    filter by sensor_id.
+    """
+    summaries = await run_read(
+        session, health_summaries, start_time, end_time, sensor_id, bucket, skip, limit
+    )
+    return await run_in_threadpool(FastJSONResponse, summaries)
+
+
+def health_summaries(
+    session: Session,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: uuid.UUID | None,
+    bucket: SummaryWidth,
+    skip: int,
+    limit: int
+) -> list[HealthSummary]:
+    start_time = to_utc_naive(start_time)
+    end_time = to_utc_naive(end_time)
+    if end_time < start_time:
+        raise HTTPException(status_code=400, detail="end_time must not be before start_time")
+    if bucket != "all" and (end_time - start_time) / BUCKET_WIDTHS[bucket] > settings.AGGREGATION_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window must not exceed {settings.AGGREGATION_MAX_BUCKETS} buckets"
+        )
+
+    results = health_summary(
+        session,
+        width=bucket,
+        start_time=start_time,
+        end_time=end_time,
+        sensor_id=sensor_id,
+        skip=skip,
+        limit=limit,
+    )
+
+    return off_loop(lambda: [
+        HealthSummary(
+            sensor_id=result.sensor_id,
+            bucket=result.bucket,
+            samples=result.samples,
+            online_seconds=result.online_seconds,
+            fault_seconds=result.fault_seconds,
+            availability=min(result.online_seconds / result.seconds, 1.0) if result.seconds else None,
+            dcp_min=result.dcp_min,
+            dcp_avg=result.dcp_sum / result.samples if result.samples else None,
+        )
+        for result in results
+    ])
+
+@ingest_router.post("/", response_model=list[SensorHealthCreate])
 def create_sensor_health(
     sensor_health_data: List[SensorHealthCreate],
-    session: SessionDep
+    session: IngestSessionDep,
+    response: Response,
+    write_behind: bool = False
 ) -> List[SensorHealthCreate]:
     """
-    Receive sensor health data and store it into the database.
+    Receive sensor health data and store it into the database, or answer 429 with
+    Retry-After while too much ingest is already in flight.
+
+    With write_behind the validated reports are queued and stored by a background flush,
+    answering 202 before they are in the database.
     """
 
-    # Convert Pydantic models to SQLAlchemy models
-    sensor_health_objects = [
-        SensorHealth(
-            sensor_id=data.sensor_id,
-            time=data.time,
-            dcp=data.dcp,
-            online=data.online,
-            fault=data.fault
-        )
-        for data in sensor_health_data
-    ]
+    if write_behind:
+        try:
+            check_sensor_health(session, sensor_health_data)
+            ingest_queue.submit_sensor_health(sensor_health_data)
+        except IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except IngestQueueFull as e:
+            raise IngestOverloaded(str(e))
+        except IngestQueueUnavailable as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_SECONDS)},
+            )
+        response.status_code = 202
+        return sensor_health_data
 
-    try:
-        session.add_all(sensor_health_objects)
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
-
-    # Convert stored objects to Pydantic models
-    stored_data = [
-        SensorHealthCreate(
-            sensor_id=obj.sensor_id,
-            time=obj.time,
-            dcp=obj.dcp,
-            online=obj.online,
-            fault=obj.fault
-        )
-        for obj in sensor_health_objects
-    ]
+    with ingest_admission.rows(len(sensor_health_data)):
+        try:
+            check_sensor_health(session, sensor_health_data)
+            insert_sensor_health(session, sensor_health_data)
+            session.commit()
+        except IngestError as e:
+            session.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            session.rollback()
+            raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
-    return stored_data
+    return sensor_health_data
@@ -1,18 +1,62 @@
 import uuid
-from typing import List
+from datetime import datetime
+from typing import Any
 
-from app.models.sensor_models import Sensor
+from app.models.sensor_models import SensorPublic
 from fastapi import APIRouter
-from sqlmodel import select
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
 
-from app.api.deps import SessionDep
+from app.api.deps import AsyncSessionDep, off_loop, run_read
+from app.core.json_response import FastJSONResponse
+from app.core.sensor_registry import sensor_registry
+from app.core.sensor_status import SensorState, sensor_status
+from app.schema.sensor_schemas import SensorStatusPublic
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Sensor])
-def get_sensors(session: SessionDep) -> List[Sensor]:
+@router.get("/", response_model=list[SensorPublic])
+async def get_sensors(session: AsyncSessionDep) -> Any:
     """
-    Retrieve a list of sensors from the database.
+    Retrieve a list of sensors from the sensor registry.
     """
-    sensors = session.query(Sensor).all()
-    return sensors
\ No newline at end of file
+    sensors = await run_read(session, sensor_registry.all)
+    return await run_in_threadpool(FastJSONResponse, sensors)
+
+
+def fleet_status(session: Session) -> list[SensorStatusPublic]:
+    """
+    Whether each sensor is up, with its last event and health report times and latest
+    health state, from the in-process sensor status.
+    """
+    now = datetime.utcnow()
+    states = sensor_status.states(session)
+    sensors = sensor_registry.all(session)
+
+    def build() -> list[SensorStatusPublic]:
+        fleet = []
+        for sensor in sensors:
+            state = states.get(sensor.id, SensorState())
+            fleet.append(SensorStatusPublic(
+                sensor_id=sensor.id,
+                name=sensor.name,
+                up=state.is_up(now),
+                last_event_time=state.last_event_time,
+                last_health_time=state.last_health_time,
+                online=state.online,
+                fault=state.fault,
+                dcp=state.dcp
+            ))
+        return fleet
+
+    return off_loop(build)
+
+
+@router.get("/status", response_model=list[SensorStatusPublic])
+async def get_fleet_status(session: AsyncSessionDep) -> Any:
+    """
+    Returns whether each sensor is up, with its last event and health report times and
+    latest health state, from the in-process sensor status.
+    """
+    fleet = await run_read(session, fleet_status)
+    return await run_in_threadpool(FastJSONResponse, fleet)
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from collections import deque
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from app.api.deps import get_current_user_async
+from app.api.routes.sensorUtils.sensor_data import (
+    counts_response,
+    detailed_counts_response,
+    live_detailed_counts_response,
+    live_response,
+)
+from app.api.routes.sensorUtils.sensor_health import gap_details
+from app.api.routes.sensorUtils.sensor_info import fleet_status
+from app.core.config import settings
+from app.core.db import engine
+from app.core.json_response import dump_json
+from app.core.sensor_registry import sensor_registry
+from app.schema.sensor_query_schemas import (
+    BatchQuery,
+    BatchQueryResults,
+    CountsQuery,
+    GapsQuery,
+    LiveQuery,
+    SensorQuery,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def query_body(session: Session, query: SensorQuery) -> bytes:
+    """
+    Answers one query of a batch with the JSON body its own endpoint would return.
+    """
+    if isinstance(query, CountsQuery):
+        filters = (query.sensor_id, query.approach, query.sensorclass)
+        by_sensor = query.group_by == "sensor"
+        if query.op == "counts":
+            return counts_response(
+                session, query.start_date, query.end_date, *filters, query.bucket, query.format, by_sensor
+            ).body
+        return detailed_counts_response(
+            session, query.start_date, query.end_date, *filters, query.bucket, query.render,
+            query.format, by_sensor
+        ).body
+    if isinstance(query, LiveQuery):
+        filters = (query.sensor_id, query.approach, query.sensorclass)
+        by_sensor = query.group_by == "sensor"
+        if query.op == "live":
+            return live_response(session, *filters, query.bucket, query.format, by_sensor).body
+        return live_detailed_counts_response(
+            session, *filters, query.bucket, query.render, query.format, by_sensor
+        ).body
+    if isinstance(query, GapsQuery):
+        return dump_json(gap_details(
+            session,
+            query.sensor_id,
+            query.start_time,
+            query.end_time,
+            query.min_gap_seconds,
+            query.skip,
+            query.limit,
+        ))
+    if query.op == "sensors":
+        return dump_json(sensor_registry.all(session))
+    return dump_json(fleet_status(session))
+
+
+def query_result(session: Session, query: SensorQuery) -> bytes:
+    """
+    The entry of one query in the batch response, in the shape of QueryResult. The body
+    is spliced in as is, so cached and Postgres-rendered bodies are not decoded.
+
+    A query that fails gets the error status in its entry, a 500 for an unexpected error,
+    and the session is rolled back for the queries after it.
+    """
+    try:
+        body = query_body(session, query)
+    except HTTPException as e:
+        return dump_json({"id": query.id, "op": query.op, "status": e.status_code, "detail": e.detail})
+    except Exception:
+        logger.exception("Batch query %s failed", query.op)
+        session.rollback()
+        return dump_json(
+            {"id": query.id, "op": query.op, "status": 500, "detail": "Internal Server Error"}
+        )
+    head = dump_json({"id": query.id, "op": query.op, "status": 200})
+    return head[:-1] + b',"data":' + body + b"}"
+
+
+@router.post(
+    "/batch", dependencies=[Depends(get_current_user_async)], response_model=BatchQueryResults
+)
+async def query_batch(batch: BatchQuery) -> Response:
+    """
+    Runs several count, live, health gap and sensor info queries in one request, which is
+    authenticated once, and returns their results in the order of the queries.
+
+    Each query takes the parameters of its GET endpoint and gets back the status and body
+    that endpoint would answer with, so one failing query does not fail the batch. The
+    body is validated as a whole though: a query with unknown or invalid parameters
+    answers the batch with 422.
+
+    Queries are independent reads and run up to BATCH_QUERY_WORKERS at a time in the
+    threadpool. A session cannot be shared across threads, so each worker opens its own;
+    with BATCH_QUERY_WORKERS=1 the whole batch runs on one session. A session only takes
+    a connection once it reads the database; queries answered from the count cache, the
+    live counters or the registry never do.
+    """
+    pending = deque(enumerate(batch.queries))
+    results: list[bytes] = [b""] * len(batch.queries)
+
+    def drain(worker_session: Session) -> None:
+        # deque.popleft is atomic, so workers take queries off the same queue
+        while pending:
+            try:
+                position, query = pending.popleft()
+            except IndexError:
+                return
+            results[position] = query_result(worker_session, query)
+
+    def work() -> None:
+        with Session(engine) as worker_session:
+            drain(worker_session)
+
+    workers = min(settings.BATCH_QUERY_WORKERS, len(batch.queries))
+    await asyncio.gather(*(run_in_threadpool(work) for _ in range(workers)))
+    return Response(
+        content=b'{"results":[' + b",".join(results) + b"]}",
+        media_type="application/json",
+    )
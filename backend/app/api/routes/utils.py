@@ -3,8 +3,12 @@ from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.admission import ingest_admission
+from app.core.count_cache import count_cache
+from app.core.ingest_queue import ingest_queue
 from app.utils import generate_test_email, send_email
 from app.schema.common_schemas import Message
+from app.schema.sensor_data_schemas import CountCacheStats, IngestAdmissionStats, IngestQueueStats
 
 router = APIRouter()
 
@@ -25,3 +29,36 @@ def test_email(email_to: EmailStr) -> Message:
         html_content=email_data.html_content,
     )
     return Message(message="Test email sent")
+
+
+@router.get(
+    "/count-cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def count_cache_stats() -> CountCacheStats:
+    """
+    Hit, miss and eviction counters of the count response cache.
+    """
+    return count_cache.stats()
+
+
+@router.get(
+    "/ingest-queue-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def ingest_queue_stats() -> IngestQueueStats:
+    """
+    Depth and flush latency of the write-behind ingest queue.
+    """
+    return ingest_queue.stats()
+
+
+@router.get(
+    "/ingest-admission-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def ingest_admission_stats() -> IngestAdmissionStats:
+    """
+    In-flight ingest and admission counters.
+    """
+    return ingest_admission.stats()
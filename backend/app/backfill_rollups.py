@@ -0,0 +1,30 @@
+import argparse
+import logging
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.rollups import backfill_rollups
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the sensordata minute and hour rollups from the raw events."
+    )
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None, help="Defaults to the oldest event")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None, help="Defaults to the newest event")
+    args = parser.parse_args()
+
+    logger.info("Backfilling sensordata rollups")
+    with Session(engine) as session:
+        backfill_rollups(session, args.start, args.end)
+        session.commit()
+    logger.info("Rollup backfill finished")
+
+
+if __name__ == "__main__":
+    main()
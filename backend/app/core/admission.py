@@ -0,0 +1,135 @@
+import threading
+from collections.abc import Callable, Coroutine, Iterator
+from contextlib import contextmanager
+from typing import Any, cast
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.db import ingest_engine
+from app.schema.sensor_data_schemas import IngestAdmissionStats
+
+
+class IngestOverloaded(Exception):
+    """
+    Raised when an ingest request is turned away; IngestRoute answers it with 429.
+    """
+
+
+class IngestAdmission:
+    """
+    Decides whether an ingest request may run now.
+
+    Ingest runs on ingest_engine, whose pool is separate from the one read routes use, so
+    a burst of batches cannot take the connections dashboards need. A request is let in
+    while fewer than INGEST_POOL_SIZE are running and the ingest pool has a free
+    connection, and its rows only while the rows in flight stay under
+    INGEST_MAX_IN_FLIGHT_ROWS. Everything else is rejected at once instead of waiting for
+    a connection, which would also hold one of the worker threads read routes run on.
+
+    The pool is checked next to the request slots because not every ingest connection
+    is held by a request in a slot: the write-behind flush stores its batches on the
+    ingest pool too, outside any request.
+    """
+
+    def __init__(self, max_requests: int, max_rows: int) -> None:
+        self.max_requests = max_requests
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._rows = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _pool_busy(self) -> bool:
+        pool = cast(QueuePool, ingest_engine.pool)
+        # The ingest pool has no overflow, so its size is the most it hands out
+        return pool.checkedout() >= pool.size()
+
+    def reject(self) -> None:
+        """
+        Counts a request answered with 429, whichever step turned it away.
+        """
+        with self._lock:
+            self.rejected += 1
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """
+        Holds one of the INGEST_POOL_SIZE request slots, or raises IngestOverloaded.
+        """
+        with self._lock:
+            if self._requests >= self.max_requests or self._pool_busy():
+                raise IngestOverloaded("Too many ingest requests in flight")
+            self._requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._requests -= 1
+
+    @contextmanager
+    def rows(self, rows: int) -> Iterator[None]:
+        """
+        Counts rows as in flight while they are stored, or raises IngestOverloaded.
+
+        A batch larger than INGEST_MAX_IN_FLIGHT_ROWS is still let in when nothing else is
+        in flight, so it is slowed down rather than rejected forever.
+        """
+        with self._lock:
+            if self._rows and self._rows + rows > self.max_rows:
+                raise IngestOverloaded("Too many ingest rows in flight")
+            self._rows += rows
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._rows -= rows
+
+    def stats(self) -> IngestAdmissionStats:
+        pool = ingest_engine.pool
+        with self._lock:
+            return IngestAdmissionStats(
+                requests_in_flight=self._requests,
+                rows_in_flight=self._rows,
+                max_requests=self.max_requests,
+                max_rows=self.max_rows,
+                pool_checked_out=pool.checkedout(),  # type: ignore[attr-defined]
+                admitted=self.admitted,
+                rejected=self.rejected,
+            )
+
+
+ingest_admission = IngestAdmission(settings.INGEST_POOL_SIZE, settings.INGEST_MAX_IN_FLIGHT_ROWS)
+
+
+class IngestRoute(APIRoute):
+    """
+    Route class for ingest endpoints.
+
+    The request slot is taken before the body is read and validated, so a rejected batch
+    costs next to nothing. Endpoints take their rows with ingest_admission.rows(), and
+    IngestOverloaded from either step, or from a full write-behind queue, becomes 429
+    with Retry-After. Every such answer is counted here.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def admitted_handler(request: Request) -> Response:
+            try:
+                with ingest_admission.request():
+                    return await handler(request)
+            except IngestOverloaded as e:
+                ingest_admission.reject()
+                return JSONResponse(
+                    {"detail": str(e)},
+                    status_code=429,
+                    headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_SECONDS)},
+                )
+
+        return admitted_handler
@@ -0,0 +1,145 @@
+import io
+import uuid
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from enum import Enum
+from typing import Any, Literal
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/x-parquet"
+
+# Media types a client may list in Accept, mapped to the one served
+TABULAR_MEDIA_TYPES = {
+    ARROW_STREAM_MEDIA_TYPE: ARROW_STREAM_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE: PARQUET_MEDIA_TYPE,
+    "application/vnd.apache.parquet": PARQUET_MEDIA_TYPE,
+}
+JSON_MEDIA_TYPES = {"application/json", "application/*", "*/*"}
+
+# Column types, mapped to pyarrow types once it is imported; "category" is a
+# dictionary-encoded string, read back by pandas as a categorical
+ColumnType = Literal["string", "category", "timestamp", "int64"]
+
+
+class ArrowUnavailable(Exception):
+    """
+    Raised when Arrow or Parquet output is requested but pyarrow is not installed.
+    """
+
+
+def negotiate_tabular(accept: str | None) -> str | None:
+    """
+    Returns the Arrow or Parquet media type when the Accept header prefers it over JSON,
+    None when JSON should be served.
+    """
+    if not accept:
+        return None
+    choices = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            choices.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(choices):
+        if media_type in TABULAR_MEDIA_TYPES:
+            return TABULAR_MEDIA_TYPES[media_type]
+        if media_type in JSON_MEDIA_TYPES:
+            return None
+    return None
+
+
+def _pyarrow() -> Any:
+    # pyarrow is heavy, so it is only imported by the first tabular request
+    try:
+        import pyarrow  # type: ignore[import-untyped]
+        import pyarrow.parquet  # type: ignore[import-untyped]  # noqa: F401
+    except ImportError as e:
+        raise ArrowUnavailable("Arrow and Parquet output need pyarrow installed") from e
+    return pyarrow
+
+
+def arrow_available() -> bool:
+    try:
+        _pyarrow()
+    except ArrowUnavailable:
+        return False
+    return True
+
+
+def table_bytes(
+    columns: Sequence[tuple[str, ColumnType, list[Any]]], media_type: str
+) -> bytes:
+    """
+    Serializes columns of plain values as one Arrow IPC stream or Parquet file.
+    """
+    pa = _pyarrow()
+    types = {
+        "string": pa.string(),
+        "category": pa.dictionary(pa.int8(), pa.string()),
+        "timestamp": pa.timestamp("us"),
+        "int64": pa.int64(),
+    }
+    # Categories with more values than int8 indices can hold, e.g. many sensor ids
+    wide_category = pa.dictionary(pa.int32(), pa.string())
+
+    def column_type_for(column_type: ColumnType, values: list[Any]) -> Any:
+        if column_type == "category" and len(set(values)) > 127:
+            return wide_category
+        return types[column_type]
+
+    table = pa.table({
+        name: pa.array(values, type=column_type_for(column_type, values))
+        for name, column_type, values in columns
+    })
+
+    sink = io.BytesIO()
+    if media_type == PARQUET_MEDIA_TYPE:
+        pa.parquet.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def _value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def count_table(
+    series: Sequence[tuple[tuple[Any, ...], list[int]]],
+    buckets: Sequence[datetime],
+    group_by: Sequence[str],
+    media_type: str,
+    sensor_ids: Mapping[int, uuid.UUID] | None = None,
+) -> bytes:
+    """
+    Serializes bucketed count series as a long table with one row per bucket and group:
+    time, the group_by columns and count. A sensor_key group becomes a sensor_id
+    column, mapped with sensor_ids.
+    """
+    times: list[datetime] = []
+    groups: list[list[Any]] = [[] for _ in group_by]
+    counts: list[int] = []
+    labels = {key: str(sensor_id) for key, sensor_id in (sensor_ids or {}).items()}
+    for group, group_counts in series:
+        times.extend(buckets)
+        counts.extend(group_counts)
+        for position, (name, value) in enumerate(zip(group_by, group, strict=True)):
+            label = labels[value] if name == "sensor_key" and sensor_ids is not None else _value(value)
+            groups[position].extend([label] * len(buckets))
+
+    columns: list[tuple[str, ColumnType, list[Any]]] = [("time", "timestamp", times)]
+    for name, values in zip(group_by, groups, strict=True):
+        if name == "sensor_key" and sensor_ids is not None:
+            name = "sensor_id"
+        columns.append((name, "category", values))
+    columns.append(("count", "int64", counts))
+    return table_bytes(columns, media_type)
@@ -66,6 +66,66 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # sensordata and sensorhealth are partitioned by day; None keeps partitions forever
+    SENSOR_DATA_RETENTION_DAYS: int | None = None
+    SENSOR_HEALTH_RETENTION_DAYS: int | None = None
+    PARTITION_RETENTION_ACTION: Literal["detach", "drop"] = "detach"
+    PARTITION_PREMAKE_DAYS: int = 7
+    PARTITION_MAINTENANCE_INTERVAL_MINUTES: int = 60
+
+    # Largest page GET /sensors/data/ will return
+    SENSOR_DATA_MAX_PAGE_SIZE: int = 1000
+    # Upper bound on how stale the in-process sensor registry can be across workers
+    SENSOR_REGISTRY_TTL_SECONDS: int = 300
+    # Largest number of buckets a single count request may return
+    AGGREGATION_MAX_BUCKETS: int = 100_000
+    # In-memory cache of /counts and /detailed_counts responses for closed windows
+    COUNT_CACHE_MAX_ENTRIES: int = 512
+    COUNT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Upper bound on how stale a cached count response can be across workers, should a
+    # worker miss the NOTIFY of another one's ingest
+    COUNT_CACHE_TTL_SECONDS: int = 300
+    COUNT_CACHE_LISTEN_RETRY_SECONDS: int = 5
+    # Per-minute counters kept in memory for the /live endpoints
+    LIVE_WINDOW_MINUTES: int = 60
+    LIVE_COUNTERS_RESYNC_SECONDS: int = 15
+    # Server-Sent Events push of the live counters
+    LIVE_STREAM_INTERVAL_SECONDS: float = 1.0
+    LIVE_STREAM_KEEPALIVE_SECONDS: int = 20
+    LIVE_STREAM_QUEUE_SIZE: int = 64
+    # Opt-in write-behind ingest: rows queued in memory and flushed on size or age
+    INGEST_QUEUE_MAX_ROWS: int = 200_000
+    INGEST_FLUSH_ROWS: int = 20_000
+    INGEST_FLUSH_INTERVAL_MS: int = 500
+    INGEST_FLUSH_MAX_BACKOFF_SECONDS: float = 30.0
+    # Health reports are compacted into state intervals; reports further apart than this
+    # start a new interval, so it is also the shortest gap the intervals can show
+    HEALTH_INTERVAL_MAX_GAP_SECONDS: int = 120
+    # Whether every raw health report is kept in sensorhealth next to the intervals
+    SENSOR_HEALTH_STORE_RAW: bool = True
+    # A sensor with no events or health reports for this long, or reporting offline, is down
+    SENSOR_DOWN_AFTER_SECONDS: int = 300
+    # Upper bound on how stale the in-process sensor status can be across workers
+    SENSOR_STATUS_TTL_SECONDS: int = 5
+    # Window searched by GET /sensors/health/gaps when none is given, and the largest allowed
+    HEALTH_GAPS_DEFAULT_WINDOW_DAYS: int = 7
+    HEALTH_GAPS_MAX_WINDOW_DAYS: int = 31
+    # Ingest admission control; requests over these limits get 429 with Retry-After
+    INGEST_POOL_SIZE: int = 4
+    INGEST_MAX_IN_FLIGHT_ROWS: int = 100_000
+    INGEST_RETRY_AFTER_SECONDS: int = 1
+    # Connection pool of the async engine behind the sensor read routes
+    ASYNC_POOL_SIZE: int = 10
+    ASYNC_POOL_MAX_OVERFLOW: int = 10
+    # Streaming export of raw events: rows fetched per server-side cursor round trip,
+    # and the gzip level used when the client accepts it
+    EXPORT_CHUNK_ROWS: int = 10_000
+    EXPORT_GZIP_LEVEL: int = 1
+    # POST /sensors/query/batch: most queries per batch, and how many run at once, each
+    # worker past the first taking its own pooled connection when it reads the database
+    BATCH_QUERY_MAX_QUERIES: int = 20
+    BATCH_QUERY_WORKERS: int = 4
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+import psycopg
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.schema.sensor_data_schemas import CountCacheStats
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel ingests announce their (sensor_id, hour) pairs on, for other workers
+NOTIFY_CHANNEL = "count_cache"
+# NOTIFY payloads must stay below 8000 bytes; larger ingests clear the whole cache
+NOTIFY_MAX_PAYLOAD = 7900
+
+
+@dataclass(frozen=True)
+class CachedCounts:
+    body: bytes
+    # The sensors the response is filtered to, None for all of them
+    sensor_ids: frozenset[uuid.UUID] | None
+    # [start, end) of the rollup buckets the response was computed from
+    start: datetime
+    end: datetime
+    # time.monotonic() after which the entry is no longer served
+    expires: float
+
+    def affected_by(self, hours: dict[uuid.UUID | None, list[datetime]]) -> bool:
+        """
+        hours maps every ingested sensor to the sorted hours written for it, and None to
+        the sorted hours written for any sensor.
+        """
+        if self.sensor_ids is None:
+            return self._covers(hours[None])
+        return any(self._covers(hours[sensor_id]) for sensor_id in self.sensor_ids if sensor_id in hours)
+
+    def _covers(self, hours: list[datetime]) -> bool:
+        # hours is sorted, so the first hour at or after start decides
+        i = bisect_left(hours, self.start.replace(minute=0, second=0, microsecond=0))
+        return i < len(hours) and hours[i] < self.end
+
+
+class CountCache:
+    """
+    LRU cache of serialized count responses for closed historical windows.
+
+    Entries are evicted least recently used first once either COUNT_CACHE_MAX_ENTRIES
+    or COUNT_CACHE_MAX_BYTES is exceeded. Committed ingests drop only the entries whose
+    sensors and window contain one of the ingested hours, in this worker right away and
+    in the others through NOTIFY; entries older than COUNT_CACHE_TTL_SECONDS are
+    recomputed in any case, which bounds how stale a worker can be if it misses one.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, CachedCounts] = OrderedDict()
+        self._bytes = 0
+        # Bumped on every invalidation, so results computed before it are not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        sensor_ids: frozenset[uuid.UUID] | None,
+        start: datetime,
+        end: datetime,
+        compute: Callable[[], bytes],
+    ) -> bytes:
+        """
+        Returns the cached body for key, computing and storing it on a miss.
+
+        Windows that are not closed yet are computed every time and never stored.
+        """
+        if end > datetime.utcnow():
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.body
+            if entry is not None:
+                self._bytes -= len(self._entries.pop(key).body)
+                self.evictions += 1
+            self.misses += 1
+            generation = self._generation
+
+        body = compute()
+        if len(body) > self.max_bytes:
+            return body
+
+        with self._lock:
+            if generation == self._generation and key not in self._entries:
+                self._entries[key] = CachedCounts(
+                    body, sensor_ids, start, end, time.monotonic() + self.ttl_seconds
+                )
+                self._bytes += len(body)
+                self._evict()
+        return body
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= len(entry.body)
+            self.evictions += 1
+
+    def invalidate(self, touched: Iterable[tuple[uuid.UUID, datetime]]) -> None:
+        """
+        Drops the entries covering any of the (sensor_id, hour) pairs written by an ingest.
+        """
+        touched = set(touched)
+        if not touched:
+            return
+        by_sensor: dict[uuid.UUID | None, set[datetime]] = {None: set()}
+        for sensor_id, hour in touched:
+            by_sensor.setdefault(sensor_id, set()).add(hour)
+            by_sensor[None].add(hour)
+        hours = {sensor_id: sorted(sensor_hours) for sensor_id, sensor_hours in by_sensor.items()}
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items() if entry.affected_by(hours)]
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key).body)
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        """
+        Drops every entry, for when this worker may have missed invalidations.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CountCacheStats:
+        with self._lock:
+            return CountCacheStats(
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                invalidations=self.invalidations,
+            )
+
+
+count_cache = CountCache(
+    settings.COUNT_CACHE_MAX_ENTRIES, settings.COUNT_CACHE_MAX_BYTES, settings.COUNT_CACHE_TTL_SECONDS
+)
+
+
+def record_ingested_hours(session: Session, touched: Iterable[tuple[uuid.UUID, datetime]]) -> None:
+    """
+    Remembers the (sensor_id, hour) pairs written in the session's transaction, so the
+    matching cache entries are dropped once it commits.
+    """
+    session.info.setdefault("ingested_hours", set()).update(touched)
+
+
+def notify_payload(touched: set[tuple[uuid.UUID, datetime]]) -> str:
+    """
+    The NOTIFY payload announcing an ingest's (sensor_id, hour) pairs, or an empty one,
+    which clears the whole cache, when they do not fit.
+    """
+    payload = json.dumps([[str(sensor_id), hour.isoformat()] for sensor_id, hour in touched])
+    return payload if len(payload) <= NOTIFY_MAX_PAYLOAD else ""
+
+
+def apply_notify(payload: str) -> None:
+    if not payload:
+        count_cache.clear()
+        return
+    count_cache.invalidate(
+        (uuid.UUID(sensor_id), datetime.fromisoformat(hour)) for sensor_id, hour in json.loads(payload)
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_ingested_hours(session: Session) -> None:
+    # Sent in the ingest's transaction, so other workers only hear of it once it commits
+    touched = session.info.get("ingested_hours")
+    if touched:
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": notify_payload(touched)},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_count_cache(session: Session) -> None:
+    touched = session.info.pop("ingested_hours", None)
+    if touched:
+        count_cache.invalidate(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_ingested_hours(session: Session) -> None:
+    session.info.pop("ingested_hours", None)
+
+
+async def count_cache_listen_loop() -> None:
+    """
+    Drops the entries covering ingests committed by other workers, as they announce them
+    on NOTIFY_CHANNEL. The cache is cleared whenever the listening connection is
+    (re)established, since ingests committed while it was down were not heard.
+    """
+    conninfo = str(settings.SQLALCHEMY_DATABASE_URI).replace("postgresql+psycopg", "postgresql", 1)
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                count_cache.clear()
+                async for notify in conn.notifies():
+                    apply_notify(notify.payload)
+        except Exception as e:
+            logger.error(f"An error occurred while listening for count cache invalidations: {e}")
+        await asyncio.sleep(settings.COUNT_CACHE_LISTEN_RETRY_SECONDS)
@@ -5,8 +5,13 @@ from app.models.sensor_health_models import SensorHealth
 from app.models.sensor_models import Sensor
 from app.models.user_models import User, UserCreate
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, select
 from app.core.config import settings
+from app.core.health_intervals import backfill_health_intervals
+from app.core.health_rollups import backfill_health_rollups
+from app.core.rollups import backfill_rollups
+from app.core.sensor_status import backfill_sensor_status
 import logging
 
 # Configure logging
@@ -15,6 +20,19 @@ logger = logging.getLogger(__name__)
 
 # Initialize the database engine
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+# Ingest gets its own, fixed-size pool so write bursts never take the connections of reads
+ingest_engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.INGEST_POOL_SIZE,
+    max_overflow=0,
+)
+# The async routes run psycopg in async mode on a pool of their own; a request holds a
+# connection only while it waits on the database, not a thread
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.ASYNC_POOL_SIZE,
+    max_overflow=settings.ASYNC_POOL_MAX_OVERFLOW,
+)
 
 def init_db(session: Session) -> None:
     try:
@@ -43,10 +61,14 @@ def init_db(session: Session) -> None:
 
         # Seed SensorData from CSV file
         seed_sensor_data_from_csv('./app/core/seed_data/data_counts.csv', session)
+        backfill_rollups(session)
+        session.commit()
         # logger.info("Seeded SensorData")
 
         # # Seed SensorHealth from CSV file
         seed_sensor_health_from_csv('./app/core/seed_data/data_system.csv', session)
+        backfill_sensor_status(session)
+        session.commit()
         # logger.info("Seeded SensorHealth")
 
     except Exception as e:
@@ -56,23 +78,23 @@ def init_db(session: Session) -> None:
 def seed_sensor_data_from_csv(csv_file_path: str, session: Session) -> None:
     try:
         df = pd.read_csv(csv_file_path)
-        manufacture_id_to_sensor_id = {
-            sensor.manufacture_id: sensor.id
+        manufacture_id_to_sensor_key = {
+            sensor.manufacture_id: sensor.key
             for sensor in session.exec(select(Sensor))
         }
 
         sensor_data_entries = []
         for _, row in df.iterrows():
             manufacture_id = row['sensor_id']
-            sensor_id = manufacture_id_to_sensor_id.get(manufacture_id)
-            if sensor_id is None:
+            sensor_key = manufacture_id_to_sensor_key.get(manufacture_id)
+            if sensor_key is None:
                 logger.warning(f"Sensor with manufacture_id '{manufacture_id}' not found in the database.")
                 continue
 
             sensor_data_entries.append(
                 SensorData(
                     time=pd.to_datetime(row['time']),
-                    sensor_id=sensor_id,
+                    sensor_key=sensor_key,
                     class_type=row['class'],
                     approach=row['approach']
                 )
@@ -113,6 +135,9 @@ def seed_sensor_health_from_csv(csv_file_path: str, session: Session) -> None:
             )
 
         session.add_all(sensor_health_entries)
+        session.flush()
+        backfill_health_intervals(session)
+        backfill_health_rollups(session)
         session.commit()
         logger.info(f"Inserted {len(sensor_health_entries)} records into SensorHealth")
 
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Literal, cast
+
+import psycopg
+from psycopg.types.string import TextLoader
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.sensor_registry import sensor_registry
+from app.models.sensor_data_models import APPROACH_CODES, SENSOR_CLASS_CODES
+
+ExportFormat = Literal["csv", "ndjson"]
+
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = ("sensor_id", "sensor_name", "class_type", "approach", "time")
+
+CLASS_NAMES = {code: member.value for member, code in SENSOR_CLASS_CODES.items()}
+APPROACH_NAMES = {code: member.value for member, code in APPROACH_CODES.items()}
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    """
+    Filters of an export, already resolved to the stored codes and sensor key.
+    """
+    sensor_key: int | None = None
+    class_code: int | None = None
+    approach_code: int | None = None
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+
+    def where(self) -> tuple[str, dict[str, Any]]:
+        conditions = []
+        params: dict[str, Any] = {}
+        for condition, name, value in (
+            ("sensor_key = %(sensor_key)s", "sensor_key", self.sensor_key),
+            ("class_type = %(class_code)s", "class_code", self.class_code),
+            ("approach = %(approach_code)s", "approach_code", self.approach_code),
+            ("time >= %(start_time)s", "start_time", self.start_time),
+            ("time <= %(end_time)s", "end_time", self.end_time),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params[name] = value
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def export_query(export_filter: ExportFilter) -> tuple[str, dict[str, Any]]:
+    """
+    The SELECT of an export and its parameters, in psycopg's placeholder style.
+    """
+    where, params = export_filter.where()
+    return f"SELECT sensor_key, class_type, approach, time FROM sensordata{where} ORDER BY time, id", params
+
+
+def _csv_line(values: tuple[str, ...]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+def _encode_rows(
+    session: Session, export_filter: ExportFilter, export_format: ExportFormat
+) -> Iterator[str]:
+    """
+    Formats the export from a server-side cursor, EXPORT_CHUNK_ROWS rows per chunk.
+
+    Every row repeats the sensor, class and approach of a few combinations, so the text
+    before the time is built once per combination and the time is loaded as the text
+    Postgres sends instead of being parsed into a datetime and formatted back.
+    """
+    prefixes: dict[tuple[int, int, int], str] = {}
+    if export_format == "csv":
+        yield _csv_line(EXPORT_COLUMNS)
+        suffix = "\n"
+    else:
+        suffix = '"}\n'
+
+    def prefix(sensor_key: int, class_code: int, approach_code: int) -> str:
+        sensor = sensor_registry.by_key(session, sensor_key)
+        values = (
+            str(sensor.id) if sensor else "",
+            sensor.name if sensor else "",
+            CLASS_NAMES[class_code],
+            APPROACH_NAMES[approach_code],
+        )
+        if export_format == "csv":
+            # Quoted like the csv module would, the time never needs quoting
+            return _csv_line((*values, ""))[:-1]
+        # Every column but the time, which is appended after the prefix
+        line = json.dumps(dict(zip(EXPORT_COLUMNS[:-1], values, strict=True)), separators=(",", ":"))
+        return line[:-1] + ',"time":"'
+
+    # Named, so psycopg declares a server-side cursor and memory stays flat
+    dbapi_connection = cast(psycopg.Connection[Any], session.connection().connection.driver_connection)
+    with dbapi_connection.cursor(name="sensor_data_export") as cursor:
+        cursor.adapters.register_loader("timestamp", TextLoader)
+        cursor.execute(*export_query(export_filter))
+        while True:
+            rows = cursor.fetchmany(settings.EXPORT_CHUNK_ROWS)
+            if not rows:
+                return
+            lines = []
+            for sensor_key, class_code, approach_code, time in rows:
+                key = (sensor_key, class_code, approach_code)
+                line_prefix = prefixes.get(key)
+                if line_prefix is None:
+                    line_prefix = prefixes[key] = prefix(*key)
+                if export_format == "csv":
+                    lines.append(line_prefix + time)
+                else:
+                    # Postgres separates date and time with a space
+                    lines.append(line_prefix + time[:10] + "T" + time[11:])
+            yield suffix.join(lines) + suffix
+
+
+def export_sensor_data(
+    export_filter: ExportFilter, export_format: ExportFormat, compress: bool
+) -> Iterator[bytes]:
+    """
+    Streams the matching sensor data as CSV or NDJSON, ordered by (time, id), optionally
+    gzip-compressed on the fly.
+
+    The stream opens its own session: FastAPI closes the request's SessionDep before a
+    StreamingResponse body is sent.
+    """
+    compressor = (
+        zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        if compress else None
+    )
+    with Session(engine) as session:
+        for chunk in _encode_rows(session, export_filter, export_format):
+            data = chunk.encode()
+            if compressor is None:
+                yield data
+                continue
+            data = compressor.compress(data)
+            if data:
+                yield data
+    if compressor is not None:
+        yield compressor.flush()
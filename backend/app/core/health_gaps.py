@@ -0,0 +1,92 @@
+import uuid
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Row, Select, extract, true, union_all
+from sqlmodel import Session, col, func, select
+
+from app.models.sensor_health_models import SensorHealthInterval
+from app.models.sensor_models import Sensor
+
+
+def health_gaps(
+    session: Session,
+    *,
+    start_time: datetime,
+    end_time: datetime,
+    min_gap: timedelta,
+    sensor_id: uuid.UUID | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Sequence[Row[Any]]:
+    """
+    Finds the gaps longer than min_gap between the health reports of each sensor, for
+    the gaps that end in [start_time, end_time).
+
+    Read from the state intervals, which hold no gaps longer than
+    HEALTH_INTERVAL_MAX_GAP_SECONDS: a gap is the time between the start of an interval
+    and the latest end of the sensor's earlier intervals. Each sensor's latest end among
+    the intervals starting before start_time is looked up through its sensor_id indexes,
+    so a gap that began before the window is still found.
+    Rows come back as (sensor_id, start, end, seconds), ordered by start then sensor.
+    """
+    in_window = select(
+        SensorHealthInterval.sensor_id,
+        SensorHealthInterval.start_time,
+        SensorHealthInterval.end_time,
+    ).where(
+        SensorHealthInterval.start_time >= start_time,
+        SensorHealthInterval.start_time < end_time,
+    )
+
+    last_before = (
+        select(SensorHealthInterval.start_time, SensorHealthInterval.end_time)
+        .where(
+            SensorHealthInterval.sensor_id == Sensor.id,
+            SensorHealthInterval.start_time < start_time,
+        )
+        # Not the last one to start, which may lie inside an earlier, longer interval
+        .order_by(col(SensorHealthInterval.end_time).desc())
+        .limit(1)
+        .lateral("last_before")
+    )
+    before_window: Select[Any] = select(
+        col(Sensor.id).label("sensor_id"), last_before.c.start_time, last_before.c.end_time
+    ).join(last_before, true())
+
+    if sensor_id is not None:
+        in_window = in_window.where(SensorHealthInterval.sensor_id == sensor_id)
+        before_window = before_window.where(col(Sensor.id) == sensor_id)
+
+    intervals = union_all(in_window, before_window).subquery("intervals")
+    previous = (
+        select(
+            intervals.c.sensor_id,
+            # Late reports can leave intervals overlapping, hence the running maximum
+            func.max(intervals.c.end_time)
+            .over(
+                partition_by=intervals.c.sensor_id,
+                order_by=intervals.c.start_time,
+                rows=(None, -1),
+            )
+            .label("start"),
+            intervals.c.start_time.label("end"),
+        )
+        .subquery("previous")
+    )
+
+    duration = previous.c.end - previous.c.start
+    query = (
+        select(
+            previous.c.sensor_id,
+            previous.c.start,
+            previous.c.end,
+            extract("epoch", duration).label("seconds"),
+        )
+        .where(duration > min_gap)
+        .order_by(previous.c.start, previous.c.sensor_id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return session.connection().execute(query).all()
@@ -0,0 +1,152 @@
+import uuid
+from bisect import bisect_right
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
+from app.core.health_rollups import HealthSpan
+from app.core.rollups import to_utc_naive
+from app.models.sensor_health_models import SensorHealthInterval
+from app.schema.sensor_health_schemas import SensorHealthCreate
+
+
+def interval_lock_id(sensor_id: uuid.UUID) -> int:
+    """
+    Advisory lock key serializing interval updates of one sensor.
+    """
+    return int.from_bytes(sensor_id.bytes[:8], "big", signed=True)
+
+
+def extend_health_intervals(
+    session: Session, sensor_health: Sequence[SensorHealthCreate]
+) -> list[HealthSpan]:
+    """
+    Folds a batch of health reports into each sensor's state intervals.
+
+    A report in the state of the sensor's interval starting before it, at most
+    HEALTH_INTERVAL_MAX_GAP_SECONDS after its end and before the next interval starts,
+    extends that interval; any other report opens a new one. Reports are applied in time
+    order, so a batch may arrive out of order, but a report older than a stored interval
+    in a different state becomes an interval of its own. Updates of one sensor are
+    serialized with a transaction-level advisory lock, so concurrent batches cannot both
+    extend the same interval. The changes join the session's transaction.
+
+    Returns the spans the batch closed for the health rollups: a report at most
+    HEALTH_INTERVAL_MAX_GAP_SECONDS after the end of the interval before it ends a span
+    in that interval's state.
+    """
+    max_gap = timedelta(seconds=settings.HEALTH_INTERVAL_MAX_GAP_SECONDS)
+    spans: list[HealthSpan] = []
+    by_sensor: dict[uuid.UUID, list[SensorHealthCreate]] = {}
+    for data in sorted(sensor_health, key=lambda data: to_utc_naive(data.time)):
+        by_sensor.setdefault(data.sensor_id, []).append(data)
+
+    # Always locked in the same order, so two batches cannot deadlock
+    for sensor_id in sorted(by_sensor, key=interval_lock_id):
+        reports = by_sensor[sensor_id]
+        session.execute(select(func.pg_advisory_xact_lock(interval_lock_id(sensor_id))))
+        # The intervals a report of this batch could extend or fall between; for live
+        # ingest only the latest one
+        intervals = list(session.exec(
+            select(SensorHealthInterval)
+            .where(
+                SensorHealthInterval.sensor_id == sensor_id,
+                SensorHealthInterval.end_time >= to_utc_naive(reports[0].time) - max_gap,
+                SensorHealthInterval.start_time <= to_utc_naive(reports[-1].time),
+            )
+            .order_by(col(SensorHealthInterval.start_time))
+        ).all())
+
+        for data in reports:
+            time = to_utc_naive(data.time)
+            position = bisect_right([interval.start_time for interval in intervals], time)
+            previous = intervals[position - 1] if position else None
+            following = intervals[position] if position < len(intervals) else None
+            if previous is not None and previous.end_time < time <= previous.end_time + max_gap:
+                spans.append(HealthSpan(
+                    sensor_id, previous.end_time, time, previous.online, previous.fault
+                ))
+            if (
+                previous is not None
+                and (previous.online, previous.fault, previous.dcp) == (data.online, data.fault, data.dcp)
+                and time <= previous.end_time + max_gap
+                and (following is None or time < following.start_time)
+            ):
+                previous.end_time = max(previous.end_time, time)
+                previous.samples += 1
+                continue
+
+            interval = SensorHealthInterval(
+                sensor_id=sensor_id,
+                start_time=time,
+                end_time=time,
+                dcp=data.dcp,
+                online=data.online,
+                fault=data.fault,
+                samples=1,
+            )
+            session.add(interval)
+            intervals.insert(position, interval)
+
+    return spans
+
+
+def backfill_health_intervals(
+    session: Session, start_time: datetime | None = None, end_time: datetime | None = None
+) -> None:
+    """
+    Rebuilds the state intervals from the raw health reports in [start_time, end_time].
+
+    Bounds default to the oldest and newest stored report. Intervals starting inside the
+    bounds are replaced, so the backfill can be rerun safely.
+    """
+    bounds = session.execute(
+        text(
+            "SELECT coalesce(CAST(:start_time AS timestamp), min(time)), "
+            "coalesce(CAST(:end_time AS timestamp), max(time)) "
+            "FROM sensorhealth"
+        ),
+        {"start_time": start_time, "end_time": end_time},
+    ).one()
+    if bounds[0] is None:
+        return
+    params = {
+        "start_time": bounds[0],
+        "end_time": bounds[1],
+        "max_gap": timedelta(seconds=settings.HEALTH_INTERVAL_MAX_GAP_SECONDS),
+    }
+
+    session.execute(
+        text(
+            "DELETE FROM sensor_health_interval "
+            "WHERE start_time >= :start_time AND start_time <= :end_time"
+        ),
+        params,
+    )
+    # Gaps and islands: a report opens a run when the sensor's previous report is too
+    # far back or in another state, and each run becomes one interval
+    session.execute(
+        text(
+            "INSERT INTO sensor_health_interval "
+            "(sensor_id, start_time, end_time, dcp, online, fault, samples) "
+            "SELECT sensor_id, min(time), max(time), dcp, online, fault, count(*) "
+            "FROM ("
+            "  SELECT *, sum(opens_run) OVER (PARTITION BY sensor_id ORDER BY time) AS run "
+            "  FROM ("
+            "    SELECT sensor_id, time, dcp, online, fault, "
+            "      CASE WHEN lag(time) OVER w IS NULL "
+            "        OR time - lag(time) OVER w > :max_gap "
+            "        OR (dcp, online, fault) IS DISTINCT FROM "
+            "           (lag(dcp) OVER w, lag(online) OVER w, lag(fault) OVER w) "
+            "      THEN 1 ELSE 0 END AS opens_run "
+            "    FROM sensorhealth WHERE time >= :start_time AND time <= :end_time "
+            "    WINDOW w AS (PARTITION BY sensor_id ORDER BY time)"
+            "  ) reports"
+            ") runs "
+            "GROUP BY sensor_id, run, dcp, online, fault"
+        ),
+        params,
+    )
@@ -0,0 +1,342 @@
+import uuid
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Literal, NamedTuple
+
+from sqlalchemy import Row, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, func
+
+from app.core.aggregation import BUCKET_WIDTHS, floor_to_bucket
+from app.core.config import settings
+from app.core.rollups import UPSERT_CHUNK_SIZE, to_utc_naive
+from app.models.sensor_health_models import SensorHealthDay, SensorHealthHour
+from app.models.sensor_models import Sensor
+from app.schema.sensor_health_schemas import SensorHealthCreate
+
+SummaryWidth = Literal["1h", "1d", "all"]
+
+HealthRollupModel = type[SensorHealthHour] | type[SensorHealthDay]
+
+
+class HealthSpan(NamedTuple):
+    """
+    Time a sensor spent in the state of a report, up to its next report.
+    """
+    sensor_id: uuid.UUID
+    start: datetime
+    end: datetime
+    online: bool
+    fault: bool
+
+
+@dataclass
+class HealthBucket:
+    samples: int = 0
+    dcp_sum: int = 0
+    dcp_min: int | None = None
+    online_seconds: float = 0.0
+    fault_seconds: float = 0.0
+
+    def add(self, other: "HealthBucket") -> None:
+        self.samples += other.samples
+        self.dcp_sum += other.dcp_sum
+        if other.dcp_min is not None:
+            self.dcp_min = other.dcp_min if self.dcp_min is None else min(self.dcp_min, other.dcp_min)
+        self.online_seconds += other.online_seconds
+        self.fault_seconds += other.fault_seconds
+
+
+# (sensor_id, bucket) -> totals
+HealthRollupCounts = dict[tuple[uuid.UUID, datetime], HealthBucket]
+
+
+def hour_bucket(time: datetime) -> datetime:
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+def split_by_hour(start: datetime, end: datetime) -> Iterator[tuple[datetime, float]]:
+    """
+    Splits [start, end) at hour boundaries, yielding (hour, seconds) pieces.
+    """
+    while start < end:
+        hour = hour_bucket(start)
+        piece_end = min(end, hour + timedelta(hours=1))
+        yield hour, (piece_end - start).total_seconds()
+        start = piece_end
+
+
+def health_rollup_counts(
+    sensor_health: Sequence[SensorHealthCreate], spans: Sequence[HealthSpan]
+) -> HealthRollupCounts:
+    """
+    Hour totals of a batch: samples and dcp by the hour of each report, online and fault
+    seconds by the hours each span covers.
+    """
+    counts: HealthRollupCounts = {}
+    for data in sensor_health:
+        bucket = counts.setdefault((data.sensor_id, hour_bucket(to_utc_naive(data.time))), HealthBucket())
+        bucket.add(HealthBucket(samples=1, dcp_sum=data.dcp, dcp_min=data.dcp))
+    for span in spans:
+        if not (span.online or span.fault):
+            continue
+        for hour, seconds in split_by_hour(span.start, span.end):
+            bucket = counts.setdefault((span.sensor_id, hour), HealthBucket())
+            bucket.add(HealthBucket(
+                online_seconds=seconds if span.online else 0.0,
+                fault_seconds=seconds if span.fault else 0.0,
+            ))
+    return counts
+
+
+def day_counts(hour_counts: HealthRollupCounts) -> HealthRollupCounts:
+    """
+    Folds hour totals into day totals.
+    """
+    counts: HealthRollupCounts = {}
+    for (sensor_id, hour), totals in hour_counts.items():
+        counts.setdefault((sensor_id, hour.replace(hour=0)), HealthBucket()).add(totals)
+    return counts
+
+
+def upsert_health_totals(session: Session, rollup: HealthRollupModel, counts: HealthRollupCounts) -> None:
+    """
+    Adds totals to a health rollup table, creating the missing buckets.
+
+    Rows are written in key order so concurrent batches lock them in the same order.
+    """
+    rows = [
+        {
+            "sensor_id": sensor_id,
+            "bucket": bucket,
+            "samples": totals.samples,
+            "dcp_sum": totals.dcp_sum,
+            "dcp_min": totals.dcp_min,
+            "online_seconds": totals.online_seconds,
+            "fault_seconds": totals.fault_seconds,
+        }
+        for (sensor_id, bucket), totals in sorted(counts.items())
+    ]
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = insert(rollup).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=["sensor_id", "bucket"],
+            set_={
+                "samples": rollup.samples + statement.excluded.samples,
+                "dcp_sum": rollup.dcp_sum + statement.excluded.dcp_sum,
+                # least() skips nulls, so a bucket keeps its minimum until one is known
+                "dcp_min": func.least(rollup.dcp_min, statement.excluded.dcp_min),
+                "online_seconds": rollup.online_seconds + statement.excluded.online_seconds,
+                "fault_seconds": rollup.fault_seconds + statement.excluded.fault_seconds,
+            },
+        )
+        session.execute(statement)
+
+
+def upsert_health_rollups(
+    session: Session, sensor_health: Sequence[SensorHealthCreate], spans: Sequence[HealthSpan]
+) -> None:
+    """
+    Adds the reports of an ingested batch, and the spans extend_health_intervals found
+    for them, to the hour and day health rollups.
+    """
+    counts = health_rollup_counts(sensor_health, spans)
+    upsert_health_totals(session, SensorHealthHour, counts)
+    upsert_health_totals(session, SensorHealthDay, day_counts(counts))
+
+
+def backfill_health_rollups(
+    session: Session, start_time: datetime | None = None, end_time: datetime | None = None
+) -> None:
+    """
+    Rebuilds the hour and day health rollups from the raw reports in [start_time, end_time).
+
+    Both bounds are widened to whole days so every rebuilt bucket is complete, and the
+    reports just outside them are read for the spans crossing them. Buckets that are
+    rebuilt replace the stored totals, so the backfill can be rerun safely. Spans are
+    split at one hour boundary at most, which holds as long as
+    HEALTH_INTERVAL_MAX_GAP_SECONDS stays under an hour.
+    """
+    bounds = session.execute(
+        text(
+            "SELECT date_trunc('day', coalesce(CAST(:start_time AS timestamp), min(time))), "
+            "date_trunc('day', coalesce(CAST(:end_time AS timestamp), max(time))) + interval '1 day' "
+            "FROM sensorhealth"
+        ),
+        {"start_time": start_time, "end_time": end_time},
+    ).one()
+    if bounds[0] is None:
+        return
+    params = {
+        "start_time": bounds[0],
+        "end_time": bounds[1],
+        "max_gap": timedelta(seconds=settings.HEALTH_INTERVAL_MAX_GAP_SECONDS),
+    }
+
+    for table in ("sensor_health_hour", "sensor_health_day"):
+        session.execute(
+            text(f"DELETE FROM {table} WHERE bucket >= :start_time AND bucket < :end_time"),
+            params,
+        )
+    session.execute(
+        text(
+            "INSERT INTO sensor_health_hour "
+            "(sensor_id, bucket, samples, dcp_sum, dcp_min, online_seconds, fault_seconds) "
+            "WITH reports AS ("
+            "  SELECT sensor_id, time, dcp, online, fault, "
+            "    lead(time) OVER (PARTITION BY sensor_id ORDER BY time) AS next_time "
+            "  FROM sensorhealth "
+            "  WHERE time >= :start_time - :max_gap AND time < :end_time + :max_gap"
+            "), spans AS ("
+            "  SELECT sensor_id, online, fault, time AS span_start, next_time AS span_end "
+            "  FROM reports WHERE next_time > time AND next_time - time <= :max_gap "
+            "    AND (online OR fault)"
+            "), pieces AS ("
+            "  SELECT sensor_id, online, fault, date_trunc('hour', span_start) AS bucket, "
+            "    extract(epoch FROM least(span_end, date_trunc('hour', span_start) + interval '1 hour') "
+            "      - span_start) AS seconds "
+            "  FROM spans "
+            "  UNION ALL "
+            "  SELECT sensor_id, online, fault, date_trunc('hour', span_end), "
+            "    extract(epoch FROM span_end - date_trunc('hour', span_end)) "
+            "  FROM spans WHERE date_trunc('hour', span_end) > date_trunc('hour', span_start)"
+            ") "
+            "SELECT sensor_id, bucket, sum(samples), sum(dcp_sum), min(dcp_min), "
+            "  sum(online_seconds), sum(fault_seconds) "
+            "FROM ("
+            "  SELECT sensor_id, date_trunc('hour', time) AS bucket, 1 AS samples, dcp AS dcp_sum, "
+            "    dcp AS dcp_min, 0 AS online_seconds, 0 AS fault_seconds "
+            "  FROM reports WHERE time >= :start_time AND time < :end_time "
+            "  UNION ALL "
+            "  SELECT sensor_id, bucket, 0, 0, NULL, "
+            "    CASE WHEN online THEN seconds ELSE 0 END, CASE WHEN fault THEN seconds ELSE 0 END "
+            "  FROM pieces WHERE bucket >= :start_time AND bucket < :end_time"
+            ") totals "
+            "GROUP BY 1, 2"
+        ),
+        params,
+    )
+    session.execute(
+        text(
+            "INSERT INTO sensor_health_day "
+            "(sensor_id, bucket, samples, dcp_sum, dcp_min, online_seconds, fault_seconds) "
+            "SELECT sensor_id, date_trunc('day', bucket), sum(samples), sum(dcp_sum), min(dcp_min), "
+            "  sum(online_seconds), sum(fault_seconds) "
+            "FROM sensor_health_hour WHERE bucket >= :start_time AND bucket < :end_time "
+            "GROUP BY 1, 2"
+        ),
+        params,
+    )
+
+
+def _ceil_to_bucket(time: datetime, width: Literal["1h", "1d"]) -> datetime:
+    floor = floor_to_bucket(time, width)
+    return floor if floor == time else floor + BUCKET_WIDTHS[width]
+
+
+def health_summary(
+    session: Session,
+    *,
+    width: SummaryWidth,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: uuid.UUID | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Sequence[Row[Any]]:
+    """
+    Reads the health totals of the buckets starting in [start_time, end_time), both
+    bounds widened to whole buckets.
+
+    With width "1h" or "1d" there is one row per sensor and bucket with totals, ordered
+    by bucket then sensor. With "all" there is one row per sensor over the whole window,
+    read from the day rollup with the hour rollup filling in partial days at either end,
+    so a month costs about 30 rows per sensor; sensors without any totals are included
+    with zeros. Rows come back as (sensor_id, bucket, seconds, samples, dcp_sum, dcp_min,
+    online_seconds, fault_seconds), seconds being the length of the bucket.
+    """
+    if width != "all":
+        rollup: HealthRollupModel = SensorHealthHour if width == "1h" else SensorHealthDay
+        length = BUCKET_WIDTHS[width]
+        first_bucket = floor_to_bucket(start_time, width)
+        query = (
+            select(
+                col(rollup.sensor_id),
+                col(rollup.bucket),
+                literal(length.total_seconds()).label("seconds"),
+                col(rollup.samples),
+                col(rollup.dcp_sum),
+                col(rollup.dcp_min),
+                col(rollup.online_seconds),
+                col(rollup.fault_seconds),
+            )
+            .where(col(rollup.bucket) >= first_bucket, col(rollup.bucket) < end_time)
+            .order_by(col(rollup.bucket), col(rollup.sensor_id))
+            .offset(skip)
+            .limit(limit)
+        )
+        if sensor_id is not None:
+            query = query.where(col(rollup.sensor_id) == sensor_id)
+        return session.connection().execute(query).all()
+
+    window_start = floor_to_bucket(start_time, "1h")
+    window_end = _ceil_to_bucket(end_time, "1h")
+    first_day = _ceil_to_bucket(window_start, "1d")
+    last_day = floor_to_bucket(window_end, "1d")
+    ranges: list[tuple[HealthRollupModel, datetime, datetime]]
+    if first_day < last_day:
+        ranges = [
+            (SensorHealthHour, window_start, first_day),
+            (SensorHealthDay, first_day, last_day),
+            (SensorHealthHour, last_day, window_end),
+        ]
+    else:
+        ranges = [(SensorHealthHour, window_start, window_end)]
+
+    parts = []
+    for rollup, range_start, range_end in ranges:
+        part = select(
+            col(rollup.sensor_id),
+            col(rollup.samples),
+            col(rollup.dcp_sum),
+            col(rollup.dcp_min),
+            col(rollup.online_seconds),
+            col(rollup.fault_seconds),
+        ).where(col(rollup.bucket) >= range_start, col(rollup.bucket) < range_end)
+        if sensor_id is not None:
+            part = part.where(col(rollup.sensor_id) == sensor_id)
+        parts.append(part)
+    totals = union_all(*parts).subquery("totals")
+    per_sensor = (
+        select(
+            totals.c.sensor_id,
+            func.sum(totals.c.samples).label("samples"),
+            func.sum(totals.c.dcp_sum).label("dcp_sum"),
+            func.min(totals.c.dcp_min).label("dcp_min"),
+            func.sum(totals.c.online_seconds).label("online_seconds"),
+            func.sum(totals.c.fault_seconds).label("fault_seconds"),
+        )
+        .group_by(totals.c.sensor_id)
+        .subquery("per_sensor")
+    )
+
+    query = (
+        select(
+            col(Sensor.id).label("sensor_id"),
+            literal(window_start).label("bucket"),
+            literal((window_end - window_start).total_seconds()).label("seconds"),
+            func.coalesce(per_sensor.c.samples, 0).label("samples"),
+            func.coalesce(per_sensor.c.dcp_sum, 0).label("dcp_sum"),
+            per_sensor.c.dcp_min,
+            func.coalesce(per_sensor.c.online_seconds, 0).label("online_seconds"),
+            func.coalesce(per_sensor.c.fault_seconds, 0).label("fault_seconds"),
+        )
+        .outerjoin(per_sensor, per_sensor.c.sensor_id == Sensor.id)
+        .order_by(col(Sensor.id))
+        .offset(skip)
+        .limit(limit)
+    )
+    if sensor_id is not None:
+        query = query.where(col(Sensor.id) == sensor_id)
+    return session.connection().execute(query).all()
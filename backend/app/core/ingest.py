@@ -0,0 +1,171 @@
+import uuid
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, cast
+
+import psycopg
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.count_cache import record_ingested_hours
+from app.core.health_intervals import extend_health_intervals
+from app.core.health_rollups import upsert_health_rollups
+from app.core.live_counters import record_live_counts
+from app.core.rollups import RollupCounts, minute_bucket, to_utc_naive, upsert_rollups
+from app.core.sensor_registry import sensor_registry
+from app.core.sensor_status import (
+    SensorState,
+    record_sensor_events,
+    record_sensor_health,
+)
+from app.models.sensor_data_models import APPROACH_CODES, SENSOR_CLASS_CODES
+from app.models.sensor_health_models import SensorHealth
+from app.schema.sensor_data_schemas import SensorDataCreate, SensorDataIngestReceipt
+from app.schema.sensor_health_schemas import SensorHealthCreate
+
+# Column order must match SENSOR_DATA_COPY_TYPES below; id comes from the identity.
+SENSOR_DATA_COPY = (
+    "COPY sensordata (time, sensor_key, class_type, approach) "
+    "FROM STDIN (FORMAT BINARY)"
+)
+SENSOR_DATA_COPY_TYPES = ["timestamp", "int4", "int2", "int2"]
+
+# Resolved once at import so the per-row work is a single dict lookup.
+CLASS_CODES = {member.name: code for member, code in SENSOR_CLASS_CODES.items()}
+APPROACH_CODES_BY_NAME = {member.name: code for member, code in APPROACH_CODES.items()}
+
+
+class IngestError(ValueError):
+    """
+    Raised when a batch contains a value that cannot be stored.
+    """
+
+
+def check_sensor_data(session: Session, sensor_data: Sequence[SensorDataCreate]) -> None:
+    """
+    Raises IngestError for the first row copy_sensor_data would reject.
+    """
+    sensor_keys = sensor_registry.keys(session, {data.sensor_id for data in sensor_data})
+    for data in sensor_data:
+        if data.sensor_id not in sensor_keys:
+            raise IngestError(f"Unknown sensor_id: {data.sensor_id}")
+        if data.class_type not in CLASS_CODES or data.approach not in APPROACH_CODES_BY_NAME:
+            raise IngestError("Invalid class_type or approach value")
+
+
+def check_sensor_health(session: Session, sensor_health: Sequence[SensorHealthCreate]) -> None:
+    """
+    Raises IngestError for the first row insert_sensor_health would reject.
+    """
+    sensor_keys = sensor_registry.keys(session, {data.sensor_id for data in sensor_health})
+    for data in sensor_health:
+        if data.sensor_id not in sensor_keys:
+            raise IngestError(f"Unknown sensor_id: {data.sensor_id}")
+        if not 0 <= data.dcp <= 100:
+            raise IngestError(f"Invalid dcp value: {data.dcp}")
+
+
+def insert_sensor_health(session: Session, sensor_health: Sequence[SensorHealthCreate]) -> None:
+    """
+    Folds a batch of health reports into the state intervals and the health rollups and,
+    unless SENSOR_HEALTH_STORE_RAW is off, inserts the raw reports with a single
+    multi-row INSERT.
+
+    Like copy_sensor_data it joins the session's transaction and leaves the commit to
+    the caller.
+    """
+    if not sensor_health:
+        return
+    spans = extend_health_intervals(session, sensor_health)
+    upsert_health_rollups(session, sensor_health, spans)
+
+    latest: dict[uuid.UUID, SensorState] = {}
+    for data in sensor_health:
+        time = to_utc_naive(data.time)
+        current = latest.get(data.sensor_id)
+        if current is None or current.last_health_time is None or time >= current.last_health_time:
+            latest[data.sensor_id] = SensorState(
+                last_health_time=time, online=data.online, fault=data.fault, dcp=data.dcp
+            )
+    record_sensor_health(session, latest)
+
+    if not settings.SENSOR_HEALTH_STORE_RAW:
+        return
+    session.execute(
+        insert(SensorHealth),
+        [
+            {
+                "id": uuid.uuid4(),
+                "sensor_id": data.sensor_id,
+                "time": to_utc_naive(data.time),
+                "dcp": data.dcp,
+                "online": data.online,
+                "fault": data.fault,
+            }
+            for data in sensor_health
+        ],
+    )
+
+
+def copy_sensor_data(
+    session: Session, sensor_data: Sequence[SensorDataCreate]
+) -> SensorDataIngestReceipt:
+    """
+    Streams a validated batch into sensordata with a binary COPY and adds its counts
+    to the minute and hour rollups and the sensors' last event times. Once the
+    transaction commits, the batch is added to the live counters and cached counts
+    covering it are dropped.
+
+    Everything runs on the session's connection, so it joins the session's transaction
+    and the caller decides when to commit.
+    """
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+    minute_counts: RollupCounts = Counter()
+    last_event_times: dict[int, datetime] = {}
+
+    sensor_keys = sensor_registry.keys(session, {data.sensor_id for data in sensor_data})
+
+    dbapi_connection = cast(psycopg.Connection[Any], session.connection().connection.driver_connection)
+    with dbapi_connection.cursor() as cursor:
+        with cursor.copy(SENSOR_DATA_COPY) as copy:
+            copy.set_types(SENSOR_DATA_COPY_TYPES)
+            for data in sensor_data:
+                try:
+                    sensor_key = sensor_keys[data.sensor_id]
+                except KeyError:
+                    raise IngestError(f"Unknown sensor_id: {data.sensor_id}")
+                try:
+                    class_code = CLASS_CODES[data.class_type]
+                    approach_code = APPROACH_CODES_BY_NAME[data.approach]
+                except KeyError as e:
+                    raise IngestError(f"Invalid class_type or approach value: {e}")
+
+                time = to_utc_naive(data.time)
+                if start_time is None or time < start_time:
+                    start_time = time
+                if end_time is None or time > end_time:
+                    end_time = time
+
+                copy.write_row((time, sensor_key, class_code, approach_code))
+                if time > last_event_times.get(sensor_key, time.min):
+                    last_event_times[sensor_key] = time
+                minute_counts[(sensor_key, minute_bucket(time), approach_code, class_code)] += 1
+
+    upsert_rollups(session, minute_counts)
+    record_live_counts(session, minute_counts)
+
+    sensor_ids = {key: sensor_id for sensor_id, key in sensor_keys.items()}
+    record_sensor_events(
+        session, {sensor_ids[key]: last_event_time for key, last_event_time in last_event_times.items()}
+    )
+    record_ingested_hours(
+        session,
+        {(sensor_ids[key], minute.replace(minute=0)) for key, minute, _, _ in minute_counts},
+    )
+
+    return SensorDataIngestReceipt(
+        count=len(sensor_data), start_time=start_time, end_time=end_time
+    )
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Sequence
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import ingest_engine
+from app.core.ingest import IngestError, copy_sensor_data, insert_sensor_health
+from app.core.rollups import to_utc_naive
+from app.schema.sensor_data_schemas import (
+    IngestQueueStats,
+    SensorDataCreate,
+    SensorDataIngestReceipt,
+)
+from app.schema.sensor_health_schemas import SensorHealthCreate
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueUnavailable(Exception):
+    """
+    Raised when a batch cannot be queued, because the queue is full or not running.
+    """
+
+
+class IngestQueueFull(IngestQueueUnavailable):
+    """
+    Raised when queueing a batch would take the queue past INGEST_QUEUE_MAX_ROWS.
+    """
+
+
+class IngestBatch:
+    """
+    One accepted request, kept whole so a batch that fails on its own can be dropped
+    without losing the rows of the batches flushed with it.
+    """
+
+    def __init__(
+        self,
+        sensor_data: Sequence[SensorDataCreate] = (),
+        sensor_health: Sequence[SensorHealthCreate] = (),
+    ) -> None:
+        self.sensor_data = sensor_data
+        self.sensor_health = sensor_health
+
+    def __len__(self) -> int:
+        return len(self.sensor_data) + len(self.sensor_health)
+
+
+def write_batches(batches: Sequence[IngestBatch]) -> None:
+    """
+    Writes the batches in one transaction, each table in a single time-ordered insert.
+    """
+    sensor_data = sorted(
+        (data for batch in batches for data in batch.sensor_data),
+        key=lambda data: to_utc_naive(data.time),
+    )
+    sensor_health = sorted(
+        (data for batch in batches for data in batch.sensor_health),
+        key=lambda data: to_utc_naive(data.time),
+    )
+    with Session(ingest_engine) as session:
+        if sensor_data:
+            copy_sensor_data(session, sensor_data)
+        insert_sensor_health(session, sensor_health)
+        session.commit()
+
+
+class IngestQueue:
+    """
+    Bounded in-process queue behind the write_behind ingest mode.
+
+    Routes validate a batch, queue it and answer 202 without waiting for Postgres. A
+    single task coalesces everything queued, from all sensors, into one transaction per
+    flush once INGEST_FLUSH_ROWS rows are pending or the oldest has waited
+    INGEST_FLUSH_INTERVAL_MS. Failed flushes are retried with exponential backoff, and
+    the queue is drained before the process exits.
+
+    Queued rows live in the memory of one worker process, so a crash loses them; callers
+    that need the rows stored before they get an answer keep using the synchronous mode.
+    """
+
+    def __init__(self, max_rows: int) -> None:
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._batches: list[IngestBatch] = []
+        self._rows = 0
+        self._oldest: float | None = None
+        self._running = False
+        self._closing = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failures = 0
+        self.dropped_rows = 0
+        self._last_flush: float | None = None
+        self._total_flush = 0.0
+        self._max_flush: float | None = None
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def submit(self, batch: IngestBatch) -> None:
+        """
+        Queues a validated batch. Safe to call from any thread.
+        """
+        with self._lock:
+            if not self._running or self._closing:
+                raise IngestQueueUnavailable("Write-behind ingest is not running")
+            if self._rows + len(batch) > self.max_rows:
+                raise IngestQueueFull("Write-behind ingest queue is full")
+            # The flusher sleeps until woken while the queue is empty, and then again
+            # once enough rows are pending not to wait for the age trigger
+            wake = self._oldest is None or (
+                self._rows < settings.INGEST_FLUSH_ROWS <= self._rows + len(batch)
+            )
+            self._batches.append(batch)
+            self._rows += len(batch)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        if wake:
+            self._wake()
+
+    def submit_sensor_data(self, sensor_data: Sequence[SensorDataCreate]) -> SensorDataIngestReceipt:
+        times = [to_utc_naive(data.time) for data in sensor_data]
+        self.submit(IngestBatch(sensor_data=sensor_data))
+        return SensorDataIngestReceipt(
+            count=len(sensor_data),
+            start_time=min(times, default=None),
+            end_time=max(times, default=None),
+        )
+
+    def submit_sensor_health(self, sensor_health: Sequence[SensorHealthCreate]) -> None:
+        self.submit(IngestBatch(sensor_health=sensor_health))
+
+    def _flush_due_in(self) -> float | None:
+        """
+        Seconds until the age trigger fires, 0 if a flush is due and None if nothing is queued.
+        """
+        with self._lock:
+            # _oldest is set whenever a batch is queued
+            if not self._batches or self._oldest is None:
+                return None
+            if self._closing or self._rows >= settings.INGEST_FLUSH_ROWS:
+                return 0
+            age = time.monotonic() - self._oldest
+        return max(settings.INGEST_FLUSH_INTERVAL_MS / 1000 - age, 0)
+
+    def _take(self) -> list[IngestBatch]:
+        with self._lock:
+            batches = self._batches
+            self._batches = []
+            self._rows = 0
+            self._oldest = None
+        return batches
+
+    def _requeue(self, batches: list[IngestBatch]) -> None:
+        with self._lock:
+            self._batches = batches + self._batches
+            self._rows += sum(len(batch) for batch in batches)
+            self._oldest = time.monotonic()
+
+    def _write(self, batches: list[IngestBatch]) -> None:
+        try:
+            write_batches(batches)
+        except IngestError:
+            if len(batches) == 1:
+                raise
+            # A sensor went away after its batch was accepted; write the batches one by
+            # one so only the offending ones are lost
+            for batch in batches:
+                try:
+                    write_batches([batch])
+                except IngestError as e:
+                    logger.error(f"Dropped {len(batch)} queued ingest rows: {e}")
+                    with self._lock:
+                        self.dropped_rows += len(batch)
+
+    async def _flush(self) -> bool:
+        batches = self._take()
+        if not batches:
+            return True
+        rows = sum(len(batch) for batch in batches)
+        started = time.monotonic()
+        try:
+            await run_in_threadpool(self._write, batches)
+        except IngestError as e:
+            logger.error(f"Dropped {rows} queued ingest rows: {e}")
+            with self._lock:
+                self.dropped_rows += rows
+            return True
+        except Exception as e:
+            logger.error(f"An error occurred while flushing the ingest queue: {e}")
+            self._requeue(batches)
+            with self._lock:
+                self.failures += 1
+            return False
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.flushes += 1
+            self.rows_flushed += rows
+            self._last_flush = elapsed
+            self._total_flush += elapsed
+            self._max_flush = elapsed if self._max_flush is None else max(self._max_flush, elapsed)
+        return True
+
+    async def run(self) -> None:
+        """
+        Flushes the queue until close() is called, then drains it and returns.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        with self._lock:
+            self._running = True
+            self._closing = False
+        backoff = settings.INGEST_FLUSH_INTERVAL_MS / 1000
+        try:
+            while True:
+                due_in = self._flush_due_in()
+                if due_in is None and self._closing:
+                    return
+                if due_in != 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), due_in)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+                if await self._flush():
+                    backoff = settings.INGEST_FLUSH_INTERVAL_MS / 1000
+                    continue
+                if self._closing and backoff >= settings.INGEST_FLUSH_MAX_BACKOFF_SECONDS:
+                    lost = self._take()
+                    logger.error(
+                        f"Dropped {sum(len(batch) for batch in lost)} queued ingest rows on shutdown"
+                    )
+                    return
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, settings.INGEST_FLUSH_MAX_BACKOFF_SECONDS)
+        finally:
+            with self._lock:
+                self._running = False
+
+    def close(self) -> None:
+        """
+        Stops accepting batches and makes run() drain the queue and return.
+        """
+        with self._lock:
+            self._closing = True
+        self._wake()
+
+    def stats(self) -> IngestQueueStats:
+        with self._lock:
+            oldest = self._oldest
+            return IngestQueueStats(
+                running=self._running and not self._closing,
+                pending_rows=self._rows,
+                pending_batches=len(self._batches),
+                max_rows=self.max_rows,
+                oldest_pending_ms=None if oldest is None else (time.monotonic() - oldest) * 1000,
+                flushes=self.flushes,
+                rows_flushed=self.rows_flushed,
+                failures=self.failures,
+                dropped_rows=self.dropped_rows,
+                last_flush_ms=None if self._last_flush is None else self._last_flush * 1000,
+                avg_flush_ms=self._total_flush / self.flushes * 1000 if self.flushes else None,
+                max_flush_ms=None if self._max_flush is None else self._max_flush * 1000,
+            )
+
+
+ingest_queue = IngestQueue(settings.INGEST_QUEUE_MAX_ROWS)
@@ -0,0 +1,27 @@
+from typing import Any
+
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Encodes plain lists, dicts and scalars with pydantic-core's native serializer.
+
+    Datetimes, UUIDs and enums come out exactly as in responses built from the Pydantic
+    models, so routes can assemble responses from query tuples instead of model
+    instances.
+    """
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content that is already in the shape of the route's response model.
+
+    Returning a Response skips FastAPI's response_model validation and its
+    jsonable_encoder pass, so the content is encoded once, by dump_json.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
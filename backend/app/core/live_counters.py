@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import threading
+from collections import Counter
+from collections.abc import Callable, Collection, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Text, cast, event
+from sqlmodel import Session, func, select
+
+from app.core.aggregation import (
+    BUCKET_WIDTHS,
+    GROUP_COLUMNS,
+    BucketWidth,
+    CountSeries,
+    bucket_starts,
+    floor_to_bucket,
+    group_order,
+)
+from app.core.config import settings
+from app.core.db import engine
+from app.core.rollups import RollupCounts
+from app.models.sensor_data_models import (
+    APPROACH_CODES,
+    SENSOR_CLASS_CODES,
+    Approach,
+    SensorClass,
+    SensorDataMinute,
+)
+
+logger = logging.getLogger(__name__)
+
+APPROACHES_BY_CODE = {code: member for member, code in APPROACH_CODES.items()}
+SENSOR_CLASSES_BY_CODE = {code: member for member, code in SENSOR_CLASS_CODES.items()}
+
+# (sensor_key, approach, class_type) -> number of events in one minute
+MinuteCounts = Counter[tuple[int, Approach, SensorClass]]
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def visible_in_snapshot(xid: int, snapshot: str) -> bool:
+    """
+    Whether the transaction xid had committed for a pg_current_snapshot() in its text
+    form, "xmin:xmax:xip,...". Only called for committed transactions, so anything
+    below xmax and not in progress is visible.
+    """
+    xmin, xmax, in_progress = snapshot.split(":")
+    if xid < int(xmin):
+        return True
+    return xid < int(xmax) and str(xid) not in in_progress.split(",")
+
+
+class LiveCounters:
+    """
+    Ring buffer of per-minute event counts for the last LIVE_WINDOW_MINUTES, per sensor,
+    approach and class.
+
+    Ingests committed by this process are added as they happen. Every worker process keeps
+    its own buffer, so the buffer is also rebuilt from sensordata_minute on first use and
+    every LIVE_COUNTERS_RESYNC_SECONDS, which brings in the ingests of other workers.
+
+    Adds made while a rebuild reads the rollup are kept with the id of their transaction
+    and applied again on the rebuilt buffer unless the rollup already held them, so
+    they are neither lost nor counted twice.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._lock = threading.Lock()
+        self._minutes: list[datetime | None] = [None] * size
+        self._counts: list[MinuteCounts] = [Counter() for _ in range(size)]
+        # One list per running reload of the (xid, counts by minute) added since it began
+        self._reload_adds: list[list[tuple[int, dict[datetime, MinuteCounts]]]] = []
+        self.loaded = False
+        # Called without arguments after every change, from whichever thread made it
+        self.listeners: list[Callable[[], None]] = []
+
+    def _changed(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+    def _slot(self, minute: datetime) -> int:
+        return ((minute - EPOCH) // timedelta(minutes=1)) % self.size
+
+    def _add(self, minute: datetime, counts: MinuteCounts, oldest: datetime) -> None:
+        if minute < oldest:
+            return
+        slot = self._slot(minute)
+        current = self._minutes[slot]
+        if current is None or current < minute:
+            # The slot held a minute that has left the window
+            self._minutes[slot] = minute
+            self._counts[slot] = Counter()
+        elif current > minute:
+            return
+        self._counts[slot].update(counts)
+
+    def add(self, minute_counts: RollupCounts, xid: int) -> None:
+        """
+        Adds the minute counts of a committed ingest, keyed by stored codes, written by
+        transaction xid.
+        """
+        by_minute: dict[datetime, MinuteCounts] = {}
+        for (sensor_key, minute, approach, class_type), count in minute_counts.items():
+            key = (sensor_key, APPROACHES_BY_CODE[approach], SENSOR_CLASSES_BY_CODE[class_type])
+            by_minute.setdefault(minute, Counter())[key] += count
+
+        oldest = self.oldest_minute()
+        with self._lock:
+            for minute, counts in by_minute.items():
+                self._add(minute, counts, oldest)
+            for adds in self._reload_adds:
+                adds.append((xid, by_minute))
+        self._changed()
+
+    def reload(self, session: Session) -> None:
+        """
+        Rebuilds the buffer from the minute rollup, then applies again the adds made in
+        the meantime that the rollup was read without.
+        """
+        adds: list[tuple[int, dict[datetime, MinuteCounts]]] = []
+        with self._lock:
+            # Registered before the read, so every ingest committed after its snapshot is kept
+            self._reload_adds.append(adds)
+        try:
+            oldest = self.oldest_minute()
+            rows = session.exec(
+                select(SensorDataMinute, cast(func.pg_current_snapshot(), Text))
+                .where(SensorDataMinute.bucket >= oldest)
+            ).all()
+        except BaseException:
+            with self._lock:
+                self._reload_adds.remove(adds)
+            raise
+
+        minutes: list[datetime | None] = [None] * self.size
+        counts: list[MinuteCounts] = [Counter() for _ in range(self.size)]
+        for row, _ in rows:
+            slot = self._slot(row.bucket)
+            current = minutes[slot]
+            if current is None or current < row.bucket:
+                minutes[slot] = current = row.bucket
+                counts[slot] = Counter()
+            if current == row.bucket:
+                counts[slot][(row.sensor_key, row.approach, row.class_type)] += row.count
+        # Without rows no ingest in the window was visible to the read
+        snapshot = rows[0][1] if rows else None
+
+        with self._lock:
+            self._reload_adds.remove(adds)
+            self._minutes = minutes
+            self._counts = counts
+            for xid, by_minute in adds:
+                if snapshot is not None and visible_in_snapshot(xid, snapshot):
+                    continue
+                for minute, minute_counts in by_minute.items():
+                    self._add(minute, minute_counts, oldest)
+            self.loaded = True
+        self._changed()
+
+    def oldest_minute(self) -> datetime:
+        return floor_to_bucket(datetime.utcnow(), "1m") - timedelta(minutes=self.size - 1)
+
+    def covers(self, width: BucketWidth, start_time: datetime) -> bool:
+        """
+        Whether buckets of width starting at the one containing start_time are all in the buffer.
+        """
+        if BUCKET_WIDTHS[width] > timedelta(minutes=self.size):
+            return False
+        return floor_to_bucket(start_time, width) >= self.oldest_minute()
+
+    def _totals(
+        self,
+        width: BucketWidth,
+        first_bucket: datetime,
+        last_bucket: datetime,
+        group_by: Sequence[str],
+        sensor_keys: Collection[int] | None,
+        approaches: Collection[Approach] | None,
+        class_types: Collection[SensorClass] | None,
+    ) -> dict[datetime, Counter[tuple[Any, ...]]]:
+        step = BUCKET_WIDTHS[width]
+        sensor_keys = set(sensor_keys) if sensor_keys is not None else None
+        approaches = set(approaches) if approaches is not None else None
+        class_types = set(class_types) if class_types is not None else None
+        filtered = sensor_keys is not None or approaches is not None or class_types is not None
+        positions = [GROUP_COLUMNS.index(name) for name in group_by]
+
+        totals: dict[datetime, Counter[tuple[Any, ...]]] = {}
+        with self._lock:
+            for minute, counts in zip(self._minutes, self._counts, strict=True):
+                if minute is None or not first_bucket <= minute < last_bucket + step:
+                    continue
+                bucket = minute if width == "1m" else floor_to_bucket(minute, width)
+                bucket_totals = totals.setdefault(bucket, Counter())
+                for values, count in counts.items():
+                    key, row_approach, row_class = values
+                    if filtered and (
+                        (sensor_keys is not None and key not in sensor_keys)
+                        or (approaches is not None and row_approach not in approaches)
+                        or (class_types is not None and row_class not in class_types)
+                    ):
+                        continue
+                    bucket_totals[tuple(values[i] for i in positions)] += count
+        return totals
+
+    def bucketed_counts(
+        self,
+        *,
+        width: BucketWidth,
+        start_time: datetime,
+        end_time: datetime,
+        group_by: Sequence[str] = (),
+        sensor_keys: Collection[int] | None = None,
+        approaches: Collection[Approach] | None = None,
+        class_types: Collection[SensorClass] | None = None,
+    ) -> list[tuple[Any, ...]]:
+        """
+        Same rows as app.core.aggregation.bucketed_counts, computed from the buffer.
+        """
+        first_bucket = floor_to_bucket(start_time, width)
+        last_bucket = floor_to_bucket(end_time, width)
+        totals = self._totals(
+            width, first_bucket, last_bucket, group_by, sensor_keys, approaches, class_types
+        )
+
+        order = group_order(group_by)
+        empty = (None,) * len(group_by)
+        rows = []
+        for bucket in bucket_starts(width, first_bucket, last_bucket):
+            bucket_totals = totals.get(bucket)
+            if not bucket_totals:
+                rows.append((bucket, *empty, 0))
+                continue
+            for group in sorted(bucket_totals, key=order):
+                rows.append((bucket, *group, bucket_totals[group]))
+        return rows
+
+    def bucketed_series(
+        self,
+        *,
+        width: BucketWidth,
+        start_time: datetime,
+        end_time: datetime,
+        group_by: Sequence[str],
+        sensor_keys: Collection[int] | None = None,
+        approaches: Collection[Approach] | None = None,
+        class_types: Collection[SensorClass] | None = None,
+    ) -> CountSeries:
+        """
+        Same series as app.core.aggregation.bucketed_series, computed from the buffer.
+        """
+        first_bucket = floor_to_bucket(start_time, width)
+        last_bucket = floor_to_bucket(end_time, width)
+        totals = self._totals(
+            width, first_bucket, last_bucket, group_by, sensor_keys, approaches, class_types
+        )
+
+        buckets = bucket_starts(width, first_bucket, last_bucket)
+        groups = sorted(
+            {group for bucket_totals in totals.values() for group in bucket_totals},
+            key=group_order(group_by),
+        )
+        no_totals: Counter[tuple[Any, ...]] = Counter()
+        return [
+            (group, [totals.get(bucket, no_totals)[group] for bucket in buckets])
+            for group in groups
+        ]
+
+
+live_counters = LiveCounters(settings.LIVE_WINDOW_MINUTES)
+
+
+def record_live_counts(session: Session, minute_counts: RollupCounts) -> None:
+    """
+    Remembers the minute counts written in the session's transaction, so they are added to
+    the live counters once it commits.
+    """
+    if "live_xid" not in session.info:
+        session.info["live_xid"] = int(
+            session.exec(select(cast(func.pg_current_xact_id(), Text))).one()
+        )
+    session.info.setdefault("live_counts", []).append(minute_counts)
+
+
+@event.listens_for(Session, "after_commit")
+def _add_live_counts(session: Session) -> None:
+    xid = session.info.pop("live_xid", None)
+    for minute_counts in session.info.pop("live_counts", []):
+        live_counters.add(minute_counts, xid)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_live_counts(session: Session) -> None:
+    session.info.pop("live_xid", None)
+    session.info.pop("live_counts", None)
+
+
+async def live_counters_loop() -> None:
+    """
+    Rebuilds the live counters on startup and then every LIVE_COUNTERS_RESYNC_SECONDS.
+    """
+
+    def run() -> None:
+        with Session(engine) as session:
+            live_counters.reload(session)
+
+    while True:
+        try:
+            await run_in_threadpool(run)
+        except Exception as e:
+            logger.error(f"An error occurred while rebuilding the live counters: {e}")
+        await asyncio.sleep(settings.LIVE_COUNTERS_RESYNC_SECONDS)
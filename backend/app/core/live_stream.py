@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+from app.core.aggregation import detailed_rows
+from app.core.config import settings
+from app.core.json_response import dump_json
+from app.core.live_counters import live_counters
+from app.models.sensor_data_models import Approach, SensorClass
+
+logger = logging.getLogger(__name__)
+
+
+class StreamFilter(NamedTuple):
+    sensor_keys: frozenset[int] | None
+    approaches: frozenset[Approach] | None
+    class_types: frozenset[SensorClass] | None
+
+
+class StreamGroup:
+    """
+    Subscribers sharing a filter, and the minute rows they were last sent.
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: set[asyncio.Queue[bytes | None]] = set()
+        self.minutes: dict[datetime, dict[str, Any]] = {}
+
+
+def sse_event(event: str, rows: list[dict[str, Any]]) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dump_json(rows) + b"\n\n"
+
+
+class LiveStream:
+    """
+    Pushes live minute counts to Server-Sent Events subscribers.
+
+    Changes to the live counters wake a single task that, for each distinct filter with
+    subscribers, computes and serializes the changed minutes once and queues the same
+    bytes to every subscriber of that filter. The work per change therefore grows with
+    the number of distinct filters, not with the number of open dashboards.
+    """
+
+    def __init__(self) -> None:
+        self._groups: dict[StreamFilter, StreamGroup] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def notify(self) -> None:
+        """
+        Thread-safe wakeup, registered as a live counters listener.
+        """
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _rows(self, stream_filter: StreamFilter) -> dict[datetime, dict[str, Any]]:
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(minutes=live_counters.size - 1)
+        results = live_counters.bucketed_counts(
+            width="1m",
+            start_time=start_time,
+            end_time=end_time,
+            group_by=["approach", "class_type"],
+            **stream_filter._asdict(),
+        )
+        return {row["minute"]: row for row in detailed_rows(results, "minute")}
+
+    def _publish(self) -> None:
+        for stream_filter, group in list(self._groups.items()):
+            minutes = self._rows(stream_filter)
+            changed = [row for minute, row in minutes.items() if group.minutes.get(minute) != row]
+            group.minutes = minutes
+            if not changed:
+                continue
+            message = sse_event("counts", changed)
+            for queue in list(group.subscribers):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    # Too far behind, close it so the client reconnects from a snapshot
+                    group.subscribers.discard(queue)
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(None)
+
+    async def run(self) -> None:
+        """
+        Publishes changes until cancelled, at most once per LIVE_STREAM_INTERVAL_SECONDS.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        live_counters.listeners.append(self.notify)
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                try:
+                    self._publish()
+                except Exception as e:
+                    logger.error(f"An error occurred while publishing live counts: {e}")
+                await asyncio.sleep(settings.LIVE_STREAM_INTERVAL_SECONDS)
+        finally:
+            live_counters.listeners.remove(self.notify)
+
+    async def subscribe(self, stream_filter: StreamFilter) -> AsyncIterator[bytes]:
+        """
+        Yields a snapshot of the live window, then the changed minutes as they happen, with
+        a keepalive comment whenever nothing was sent for LIVE_STREAM_KEEPALIVE_SECONDS.
+        """
+        group = self._groups.setdefault(stream_filter, StreamGroup())
+        if not group.subscribers:
+            group.minutes = self._rows(stream_filter)
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue(settings.LIVE_STREAM_QUEUE_SIZE)
+        group.subscribers.add(queue)
+        try:
+            yield sse_event("snapshot", list(group.minutes.values()))
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=settings.LIVE_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            group.subscribers.discard(queue)
+            if not group.subscribers and self._groups.get(stream_filter) is group:
+                del self._groups[stream_filter]
+
+
+live_stream = LiveStream()
@@ -0,0 +1,68 @@
+import base64
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlmodel import Session, func, select
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor was not produced by encode_cursor.
+    """
+
+
+class explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of a statement, keeping its bound parameters.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement: Select[Any]) -> None:
+        self.statement = statement
+
+
+@compiles(explain, "postgresql")  # type: ignore[no-untyped-call, misc]
+def _compile_explain(element: explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(time: datetime, id: int) -> str:
+    """
+    Encodes the (time, id) of the last row of a page as an opaque cursor.
+    """
+    raw = f"{time.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time, id = raw.split("|")
+        return datetime.fromisoformat(time), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def exact_count(session: Session, query: Select[Any]) -> int:
+    count_statement = select(func.count()).select_from(query.subquery())
+    return int(session.execute(count_statement).scalar_one())
+
+
+def estimated_count(session: Session, query: Select[Any]) -> int:
+    """
+    Returns the planner's row estimate for a query without running it.
+    """
+    plan = session.execute(explain(query)).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(session: Session, query: Select[Any], mode: str) -> int | None:
+    if mode == "exact":
+        return exact_count(session, query)
+    if mode == "estimate":
+        return estimated_count(session, query)
+    return None
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_try_advisory_xact_lock, so only one worker runs maintenance at a time
+MAINTENANCE_LOCK_KEY = 7_301_204
+
+
+def retention_days() -> dict[str, int | None]:
+    """
+    Returns the daily-partitioned tables and how many days of partitions each keeps.
+    """
+    return {
+        "sensordata": settings.SENSOR_DATA_RETENTION_DAYS,
+        "sensorhealth": settings.SENSOR_HEALTH_RETENTION_DAYS,
+    }
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def list_partitions(session: Session, table: str) -> dict[date, str]:
+    """
+    Returns the attached daily partitions of a table keyed by their day.
+    """
+    rows = session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    ).scalars()
+
+    prefix = f"{table}_p"
+    partitions = {}
+    for name in rows:
+        if name.startswith(prefix):
+            partitions[datetime.strptime(name[len(prefix):], "%Y%m%d").date()] = name
+    return partitions
+
+
+def create_partition(session: Session, table: str, day: date) -> None:
+    """
+    Creates and attaches the partition holding one day of a table.
+
+    Rows that already landed in the default partition for that day are moved into the
+    new partition first, otherwise attaching it would fail.
+    """
+    name = partition_name(table, day)
+    lower = day.isoformat()
+    upper = (day + timedelta(days=1)).isoformat()
+
+    session.execute(
+        text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    )
+    session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {table}_default "
+            f"WHERE time >= '{lower}' AND time < '{upper}' RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+    )
+    session.execute(
+        text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    )
+    logger.info(f"Created partition {name}")
+
+
+def retire_partition(session: Session, table: str, name: str) -> None:
+    """
+    Detaches or drops a partition that fell out of the retention window.
+    """
+    session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if settings.PARTITION_RETENTION_ACTION == "drop":
+        session.execute(text(f"DROP TABLE {name}"))
+        logger.info(f"Dropped partition {name}")
+    else:
+        logger.info(f"Detached partition {name}")
+
+
+def maintain_partitions(session: Session, today: date | None = None) -> None:
+    """
+    Pre-creates upcoming daily partitions, splits stray days out of the default
+    partition and retires partitions past the configured retention.
+    """
+    if not session.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+    ).scalar():
+        logger.info("Partition maintenance already running elsewhere, skipping")
+        return
+
+    if today is None:
+        today = datetime.now(timezone.utc).date()
+
+    for table, retention in retention_days().items():
+        existing = list_partitions(session, table)
+
+        wanted = {today + timedelta(days=i) for i in range(settings.PARTITION_PREMAKE_DAYS + 1)}
+        # Late or backfilled events for days without a partition end up in the default one
+        wanted.update(
+            session.execute(text(f"SELECT DISTINCT time::date FROM {table}_default")).scalars()
+        )
+
+        for day in sorted(wanted - existing.keys()):
+            create_partition(session, table, day)
+            existing[day] = partition_name(table, day)
+
+        if retention is not None:
+            cutoff = today - timedelta(days=retention)
+            for day, name in sorted(existing.items()):
+                if day < cutoff:
+                    retire_partition(session, table, name)
+
+    session.commit()
+
+
+async def partition_maintenance_loop() -> None:
+    """
+    Runs partition maintenance on startup and then every PARTITION_MAINTENANCE_INTERVAL_MINUTES.
+    """
+
+    def run() -> None:
+        with Session(engine) as session:
+            maintain_partitions(session)
+
+    while True:
+        try:
+            await run_in_threadpool(run)
+        except Exception as e:
+            logger.error(f"An error occurred during partition maintenance: {e}")
+        await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_MINUTES * 60)
@@ -0,0 +1,115 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import TableClause, column, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+# (sensor_key, bucket, approach_code, class_code) -> number of events
+RollupCounts = Counter[tuple[int, datetime, int, int]]
+
+ROLLUP_KEY = ("sensor_key", "bucket", "approach", "class_type")
+
+# Rows per INSERT, keeping each statement well below the bind parameter limit
+UPSERT_CHUNK_SIZE = 5000
+
+# Untyped views of the rollup tables, so the ingest path can write the smallint codes
+# directly instead of going through the enum mapping of the model columns
+minute_rollup = table("sensordata_minute", *(column(name) for name in (*ROLLUP_KEY, "count")))
+hour_rollup = table("sensordata_hour", *(column(name) for name in (*ROLLUP_KEY, "count")))
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """
+    Normalizes a timestamp to naive UTC, the representation used by the time columns.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def minute_bucket(time: datetime) -> datetime:
+    return time.replace(second=0, microsecond=0)
+
+
+def hour_counts(minute_counts: RollupCounts) -> RollupCounts:
+    """
+    Folds minute counts into hour counts.
+    """
+    counts: RollupCounts = Counter()
+    for (sensor_key, minute, approach, class_type), count in minute_counts.items():
+        counts[(sensor_key, minute.replace(minute=0), approach, class_type)] += count
+    return counts
+
+
+def upsert_counts(session: Session, rollup: TableClause, counts: RollupCounts) -> None:
+    """
+    Adds counts to a rollup table, creating the missing buckets.
+
+    Rows are written in key order so concurrent batches lock them in the same order.
+    """
+    rows = [
+        {"sensor_key": key[0], "bucket": key[1], "approach": key[2], "class_type": key[3], "count": count}
+        for key, count in sorted(counts.items())
+    ]
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = insert(rollup).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={"count": rollup.c.count + statement.excluded.count},
+        )
+        session.execute(statement)
+
+
+def upsert_rollups(session: Session, minute_counts: RollupCounts) -> None:
+    """
+    Adds the counts of an ingested batch to the minute and hour rollups.
+    """
+    upsert_counts(session, minute_rollup, minute_counts)
+    upsert_counts(session, hour_rollup, hour_counts(minute_counts))
+
+
+def backfill_rollups(
+    session: Session, start_time: datetime | None = None, end_time: datetime | None = None
+) -> None:
+    """
+    Rebuilds the minute and hour rollups from the raw events in [start_time, end_time).
+
+    Both bounds are widened to whole hours so every rebuilt bucket is complete. Buckets
+    that are rebuilt replace the stored counts, so the backfill can be rerun safely.
+    """
+    bounds = session.execute(
+        text(
+            "SELECT date_trunc('hour', coalesce(CAST(:start_time AS timestamp), min(time))), "
+            "date_trunc('hour', coalesce(CAST(:end_time AS timestamp), max(time))) + interval '1 hour' "
+            "FROM sensordata"
+        ),
+        {"start_time": start_time, "end_time": end_time},
+    ).one()
+    if bounds[0] is None:
+        return
+    params = {"start_time": bounds[0], "end_time": bounds[1]}
+
+    for rollup_table in ("sensordata_minute", "sensordata_hour"):
+        session.execute(
+            text(f"DELETE FROM {rollup_table} WHERE bucket >= :start_time AND bucket < :end_time"),
+            params,
+        )
+    session.execute(
+        text(
+            "INSERT INTO sensordata_minute (sensor_key, bucket, approach, class_type, count) "
+            "SELECT sensor_key, date_trunc('minute', time), approach, class_type, count(*) "
+            "FROM sensordata WHERE time >= :start_time AND time < :end_time "
+            "GROUP BY 1, 2, 3, 4"
+        ),
+        params,
+    )
+    session.execute(
+        text(
+            "INSERT INTO sensordata_hour (sensor_key, bucket, approach, class_type, count) "
+            "SELECT sensor_key, date_trunc('hour', bucket), approach, class_type, sum(count) "
+            "FROM sensordata_minute WHERE bucket >= :start_time AND bucket < :end_time "
+            "GROUP BY 1, 2, 3, 4"
+        ),
+        params,
+    )
@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models.sensor_models import Sensor, SensorPublic
+
+
+@dataclass(frozen=True)
+class SensorRegistrySnapshot:
+    sensors: list[SensorPublic]
+    by_id: dict[uuid.UUID, SensorPublic]
+    by_key: dict[int, SensorPublic]
+    keys: dict[uuid.UUID, int]
+
+
+class SensorRegistry:
+    """
+    In-process copy of the sensor table.
+
+    Sensors change rarely while every data and health row refers to one, so routes read
+    sensor metadata from here instead of joining or lazy-loading Sensor per row. The copy
+    is dropped whenever a session commits a change to Sensor, and reloaded after
+    SENSOR_REGISTRY_TTL_SECONDS to pick up changes made by other processes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: SensorRegistrySnapshot | None = None
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self, session: Session) -> SensorRegistrySnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._loaded_at < settings.SENSOR_REGISTRY_TTL_SECONDS:
+            return snapshot
+        return self.reload(session)
+
+    def reload(self, session: Session) -> SensorRegistrySnapshot:
+        sensors = session.exec(select(Sensor).order_by(col(Sensor.key))).all()
+        public = [SensorPublic.model_validate(sensor) for sensor in sensors]
+        # Stored sensors always have their key, the check narrows the Optional
+        snapshot = SensorRegistrySnapshot(
+            sensors=public,
+            by_id={sensor.id: sensor for sensor in public},
+            by_key={
+                sensor.key: item
+                for sensor, item in zip(sensors, public, strict=True)
+                if sensor.key is not None
+            },
+            keys={sensor.id: sensor.key for sensor in sensors if sensor.key is not None},
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        return snapshot
+
+    def all(self, session: Session) -> list[SensorPublic]:
+        return self.snapshot(session).sensors
+
+    def get(self, session: Session, sensor_id: uuid.UUID) -> SensorPublic | None:
+        return self.snapshot(session).by_id.get(sensor_id)
+
+    def by_key(self, session: Session, sensor_key: int) -> SensorPublic | None:
+        snapshot = self.snapshot(session)
+        if sensor_key not in snapshot.by_key:
+            snapshot = self.reload(session)
+        return snapshot.by_key.get(sensor_key)
+
+    def keys(self, session: Session, sensor_ids: set[uuid.UUID]) -> dict[uuid.UUID, int]:
+        """
+        Maps sensor UUIDs to their internal keys, reloading once if any of them is unknown.
+        """
+        snapshot = self.snapshot(session)
+        if not sensor_ids <= snapshot.keys.keys():
+            snapshot = self.reload(session)
+        return {sensor_id: snapshot.keys[sensor_id] for sensor_id in sensor_ids if sensor_id in snapshot.keys}
+
+    def ids(self, session: Session, sensor_keys: set[int]) -> dict[int, uuid.UUID]:
+        """
+        Maps internal keys back to sensor UUIDs, reloading once if any of them is unknown.
+        """
+        snapshot = self.snapshot(session)
+        if not sensor_keys <= snapshot.by_key.keys():
+            snapshot = self.reload(session)
+        return {key: snapshot.by_key[key].id for key in sensor_keys if key in snapshot.by_key}
+
+
+sensor_registry = SensorRegistry()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_sensor_changes(session: Session, _flush_context: object) -> None:
+    if any(isinstance(obj, Sensor) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["sensors_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_sensor_registry(session: Session) -> None:
+    if session.info.pop("sensors_changed", False):
+        sensor_registry.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_sensor_changes(session: Session) -> None:
+    session.info.pop("sensors_changed", None)
@@ -0,0 +1,203 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, or_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models.sensor_models import SensorStatus
+
+
+@dataclass(frozen=True)
+class SensorState:
+    last_event_time: datetime | None = None
+    last_health_time: datetime | None = None
+    online: bool | None = None
+    fault: bool | None = None
+    dcp: int | None = None
+
+    def merge(self, other: "SensorState") -> "SensorState":
+        """
+        Combines two states the way the sensor_status upserts do: latest times win, and
+        the health fields come from the latest health report.
+        """
+        state = self
+        if other.last_event_time is not None and (
+            state.last_event_time is None or other.last_event_time > state.last_event_time
+        ):
+            state = replace(state, last_event_time=other.last_event_time)
+        if other.last_health_time is not None and (
+            state.last_health_time is None or other.last_health_time >= state.last_health_time
+        ):
+            state = replace(
+                state,
+                last_health_time=other.last_health_time,
+                online=other.online,
+                fault=other.fault,
+                dcp=other.dcp,
+            )
+        return state
+
+    def is_up(self, now: datetime) -> bool:
+        """
+        Up while the sensor sent events or health reports in the last
+        SENSOR_DOWN_AFTER_SECONDS and its latest health report, if any, says online.
+        """
+        last_seen = max(
+            (t for t in (self.last_event_time, self.last_health_time) if t is not None),
+            default=None,
+        )
+        if last_seen is None or now - last_seen > timedelta(seconds=settings.SENSOR_DOWN_AFTER_SECONDS):
+            return False
+        return self.online is not False
+
+
+class SensorStatusMirror:
+    """
+    In-process copy of the sensor_status table, one entry per sensor.
+
+    Commits of this process are applied as they happen; the copy is reloaded after
+    SENSOR_STATUS_TTL_SECONDS to pick up the ingests of other workers.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._states: dict[uuid.UUID, SensorState] | None = None
+        self._loaded_at = 0.0
+
+    def reload(self, session: Session) -> dict[uuid.UUID, SensorState]:
+        rows = session.exec(select(SensorStatus)).all()
+        states = {
+            row.sensor_id: SensorState(
+                last_event_time=row.last_event_time,
+                last_health_time=row.last_health_time,
+                online=row.online,
+                fault=row.fault,
+                dcp=row.dcp,
+            )
+            for row in rows
+        }
+        with self._lock:
+            self._states = states
+            self._loaded_at = time.monotonic()
+        return states
+
+    def states(self, session: Session) -> dict[uuid.UUID, SensorState]:
+        states = self._states
+        if states is not None and time.monotonic() - self._loaded_at < settings.SENSOR_STATUS_TTL_SECONDS:
+            return states
+        return self.reload(session)
+
+    def get(self, session: Session, sensor_id: uuid.UUID) -> SensorState:
+        return self.states(session).get(sensor_id, SensorState())
+
+    def apply(self, updates: dict[uuid.UUID, SensorState]) -> None:
+        with self._lock:
+            if self._states is None:
+                return
+            states = dict(self._states)
+            for sensor_id, update in updates.items():
+                states[sensor_id] = states.get(sensor_id, SensorState()).merge(update)
+            self._states = states
+
+
+sensor_status = SensorStatusMirror()
+
+
+def _remember(session: Session, updates: dict[uuid.UUID, SensorState]) -> None:
+    pending: dict[uuid.UUID, SensorState] = session.info.setdefault("sensor_status", {})
+    for sensor_id, update in updates.items():
+        pending[sensor_id] = pending.get(sensor_id, SensorState()).merge(update)
+
+
+def record_sensor_events(session: Session, last_event_times: dict[uuid.UUID, datetime]) -> None:
+    """
+    Moves each sensor's last event time forward to the newest event of an ingested batch.
+    """
+    if not last_event_times:
+        return
+    statement = insert(SensorStatus).values([
+        {"sensor_id": sensor_id, "last_event_time": last_event_times[sensor_id]}
+        # Sorted so concurrent batches lock the rows in the same order
+        for sensor_id in sorted(last_event_times)
+    ])
+    session.execute(statement.on_conflict_do_update(
+        index_elements=["sensor_id"],
+        set_={"last_event_time": func.greatest(
+            SensorStatus.last_event_time, statement.excluded.last_event_time
+        )},
+    ))
+    _remember(session, {
+        sensor_id: SensorState(last_event_time=last_event_time)
+        for sensor_id, last_event_time in last_event_times.items()
+    })
+
+
+def record_sensor_health(session: Session, latest: dict[uuid.UUID, SensorState]) -> None:
+    """
+    Stores the state of each sensor's newest health report of an ingested batch, unless
+    a newer report is already stored.
+    """
+    if not latest:
+        return
+    statement = insert(SensorStatus).values([
+        {
+            "sensor_id": sensor_id,
+            "last_health_time": latest[sensor_id].last_health_time,
+            "online": latest[sensor_id].online,
+            "fault": latest[sensor_id].fault,
+            "dcp": latest[sensor_id].dcp,
+        }
+        for sensor_id in sorted(latest)
+    ])
+    session.execute(statement.on_conflict_do_update(
+        index_elements=["sensor_id"],
+        set_={
+            "last_health_time": statement.excluded.last_health_time,
+            "online": statement.excluded.online,
+            "fault": statement.excluded.fault,
+            "dcp": statement.excluded.dcp,
+        },
+        where=or_(
+            col(SensorStatus.last_health_time).is_(None),
+            col(SensorStatus.last_health_time) <= statement.excluded.last_health_time,
+        ),
+    ))
+    _remember(session, latest)
+
+
+def backfill_sensor_status(session: Session) -> None:
+    """
+    Rebuilds sensor_status from the stored events and health reports, one index lookup
+    per sensor and partition.
+    """
+    session.execute(text(
+        "INSERT INTO sensor_status (sensor_id, last_event_time, last_health_time, online, fault, dcp) "
+        "SELECT sensor.id, "
+        "  (SELECT max(time) FROM sensordata WHERE sensordata.sensor_key = sensor.key), "
+        "  health.time, health.online, health.fault, health.dcp "
+        "FROM sensor "
+        "LEFT JOIN LATERAL ("
+        "  SELECT time, online, fault, dcp FROM sensorhealth "
+        "  WHERE sensorhealth.sensor_id = sensor.id ORDER BY time DESC LIMIT 1"
+        ") health ON true "
+        "ON CONFLICT (sensor_id) DO UPDATE SET "
+        "  last_event_time = excluded.last_event_time, last_health_time = excluded.last_health_time, "
+        "  online = excluded.online, fault = excluded.fault, dcp = excluded.dcp"
+    ))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_sensor_status(session: Session) -> None:
+    updates = session.info.pop("sensor_status", None)
+    if updates:
+        sensor_status.apply(updates)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_sensor_status(session: Session) -> None:
+    session.info.pop("sensor_status", None)
@@ -1,9 +1,11 @@
 import uuid
 from typing import Any
 
+from sqlalchemy import ScalarSelect
 from sqlmodel import Session, select
 
 from app.core.security import get_password_hash, verify_password
+from app.models.sensor_models import Sensor
 from app.models.user_models import  User, UserCreate, UserUpdate
 
 
@@ -44,3 +46,10 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     if not verify_password(password, db_user.hashed_password):
         return None
     return db_user
+
+
+def sensor_key_subquery(sensor_id: uuid.UUID) -> ScalarSelect[Any]:
+    """
+    Resolves a sensor UUID to its internal key inside the query that uses it.
+    """
+    return select(Sensor.key).where(Sensor.id == sensor_id).scalar_subquery()
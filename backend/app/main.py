@@ -1,3 +1,7 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
@@ -5,6 +9,11 @@ from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.count_cache import count_cache_listen_loop
+from app.core.ingest_queue import ingest_queue
+from app.core.live_counters import live_counters_loop
+from app.core.live_stream import live_stream
+from app.core.partitions import partition_maintenance_loop
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +23,28 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
+    partition_maintenance = asyncio.create_task(partition_maintenance_loop())
+    live_counters_resync = asyncio.create_task(live_counters_loop())
+    live_counts_push = asyncio.create_task(live_stream.run())
+    ingest_flush = asyncio.create_task(ingest_queue.run())
+    count_cache_listen = asyncio.create_task(count_cache_listen_loop())
+    yield
+    # Store everything accepted with write_behind before the process exits
+    ingest_queue.close()
+    await ingest_flush
+    count_cache_listen.cancel()
+    live_counts_push.cancel()
+    live_counters_resync.cancel()
+    partition_maintenance.cancel()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -0,0 +1,31 @@
+from enum import Enum
+from typing import Any
+
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+
+class CodedEnum(TypeDecorator):  # type: ignore[type-arg]
+    """
+    Stores a Python Enum as the smallint code assigned to each member.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class: type[Enum], codes: dict[Any, int]) -> None:
+        super().__init__()
+        # Only enum_class takes part in the statement cache key, the codes follow from it
+        self.enum_class = enum_class
+        self._codes = codes
+        self._members = {code: member for member, code in codes.items()}
+
+    def process_bind_param(self, value: Any, dialect: Any) -> int | None:
+        if value is None:
+            return None
+        return self._codes[self.enum_class(value)]
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        if value is None:
+            return None
+        return self._members[value]
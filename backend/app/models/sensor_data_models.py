@@ -2,7 +2,9 @@ from datetime import datetime
 from enum import Enum
 import uuid
 
+from app.models.common_models import CodedEnum
 from app.models.sensor_models import Sensor
+from sqlalchemy import BigInteger, Column, Identity, Index
 from sqlmodel import Field, Relationship, SQLModel # type: ignore
 
 
@@ -22,17 +24,87 @@ class Approach(str, Enum):
     EB = "EB"  # Eastbound
 
 
+# Stored smallint codes, mirrored by the sensorclass_lookup and approach_lookup tables.
+# Codes are never reused; new members get the next free code.
+SENSOR_CLASS_CODES = {
+    SensorClass.car: 1,
+    SensorClass.motorcycle: 2,
+    SensorClass.pedestrian: 3,
+    SensorClass.bicycle: 4,
+    SensorClass.mobility_aid: 5,
+}
+
+APPROACH_CODES = {
+    Approach.NB: 1,
+    Approach.SB: 2,
+    Approach.WB: 3,
+    Approach.EB: 4,
+}
+
+
 class SensorData(SQLModel, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    sensor_id: uuid.UUID = Field(foreign_key="sensor.id", nullable=False)
+    __table_args__ = (
+        Index("ix_sensordata_sensor_key_time", "sensor_key", "time", postgresql_include=["approach", "class_type"]),
+        Index("ix_sensordata_time_brin", "time", postgresql_using="brin"),
+        # Keyset pagination order
+        Index("ix_sensordata_time_id", "time", "id"),
+        {"postgresql_partition_by": "RANGE (time)"},
+    )
+
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, Identity(), primary_key=True)
+    )
+    # Partition key, so it is part of the primary key
+    time: datetime = Field(primary_key=True)
+    sensor_key: int = Field(foreign_key="sensor.key", nullable=False)
     sensor: "Sensor" = Relationship()
-    class_type: SensorClass = Field(sa_column_kwargs={"nullable": False})
-    approach: Approach = Field(sa_column_kwargs={"nullable": False})
-    time: datetime = Field()
+    class_type: SensorClass = Field(
+        sa_column=Column(CodedEnum(SensorClass, SENSOR_CLASS_CODES), nullable=False)
+    )
+    approach: Approach = Field(
+        sa_column=Column(CodedEnum(Approach, APPROACH_CODES), nullable=False)
+    )
+
+
+class SensorDataMinute(SQLModel, table=True):
+    """
+    Event counts per sensor, minute, approach and class, maintained on ingest.
+    """
+    __tablename__ = "sensordata_minute"
+    __table_args__ = (Index("ix_sensordata_minute_bucket", "bucket"),)
+
+    sensor_key: int = Field(foreign_key="sensor.key", primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    approach: Approach = Field(
+        sa_column=Column(CodedEnum(Approach, APPROACH_CODES), primary_key=True)
+    )
+    class_type: SensorClass = Field(
+        sa_column=Column(CodedEnum(SensorClass, SENSOR_CLASS_CODES), primary_key=True)
+    )
+    count: int
+
+
+class SensorDataHour(SQLModel, table=True):
+    """
+    Event counts per sensor, hour, approach and class, maintained on ingest.
+    """
+    __tablename__ = "sensordata_hour"
+    __table_args__ = (Index("ix_sensordata_hour_bucket", "bucket"),)
+
+    sensor_key: int = Field(foreign_key="sensor.key", primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    approach: Approach = Field(
+        sa_column=Column(CodedEnum(Approach, APPROACH_CODES), primary_key=True)
+    )
+    class_type: SensorClass = Field(
+        sa_column=Column(CodedEnum(SensorClass, SENSOR_CLASS_CODES), primary_key=True)
+    )
+    count: int
 
 
 class SensorDataPublic(SQLModel):
     sensor_id: uuid.UUID
+    sensor_name: str | None = None
     class_type: SensorClass
     approach: Approach
     time: datetime
\ No newline at end of file
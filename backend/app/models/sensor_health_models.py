@@ -2,17 +2,87 @@ from datetime import datetime
 import uuid
 
 from app.models.sensor_models import Sensor
+from sqlalchemy import BigInteger, Column, Identity, Index
 from sqlmodel import Field, Relationship, SQLModel # type: ignore
 
 
 class SensorHealth(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_sensorhealth_sensor_id_time", "sensor_id", "time"),
+        Index("ix_sensorhealth_time_brin", "time", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (time)"},
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     sensor_id: uuid.UUID = Field(foreign_key="sensor.id", nullable=False)
     sensor: "Sensor" = Relationship()
-    time: datetime = Field()
+    # Partition key, so it is part of the primary key
+    time: datetime = Field(primary_key=True)
+    dcp: int = Field(ge=0, le=100)
+    online: bool
+    fault: bool
+
+
+class SensorHealthInterval(SQLModel, table=True):
+    """
+    Run of consecutive health reports of one sensor in the same (online, fault, dcp)
+    state, extended on ingest while the state does not change.
+    """
+    __tablename__ = "sensor_health_interval"
+    __table_args__ = (
+        Index("ix_sensor_health_interval_sensor_id_start_time", "sensor_id", "start_time"),
+        Index("ix_sensor_health_interval_sensor_id_end_time", "sensor_id", "end_time"),
+        Index("ix_sensor_health_interval_start_time", "start_time"),
+    )
+
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, Identity(), primary_key=True)
+    )
+    sensor_id: uuid.UUID = Field(foreign_key="sensor.id", nullable=False)
+    # Times of the first and last report in the run
+    start_time: datetime
+    end_time: datetime
     dcp: int = Field(ge=0, le=100)
     online: bool
     fault: bool
+    samples: int
+
+
+class SensorHealthHour(SQLModel, table=True):
+    """
+    Health totals per sensor and hour, maintained on ingest.
+
+    The time between two reports of a sensor at most HEALTH_INTERVAL_MAX_GAP_SECONDS
+    apart counts towards the state of the earlier one; dcp is summed so the average can
+    be taken over any number of buckets.
+    """
+    __tablename__ = "sensor_health_hour"
+    __table_args__ = (Index("ix_sensor_health_hour_bucket", "bucket"),)
+
+    sensor_id: uuid.UUID = Field(foreign_key="sensor.id", primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    samples: int
+    dcp_sum: int = Field(sa_column=Column(BigInteger, nullable=False))
+    # None for a bucket only reached by the time after a report of the previous hour
+    dcp_min: int | None = None
+    online_seconds: float
+    fault_seconds: float
+
+
+class SensorHealthDay(SQLModel, table=True):
+    """
+    Health totals per sensor and day, maintained on ingest like SensorHealthHour.
+    """
+    __tablename__ = "sensor_health_day"
+    __table_args__ = (Index("ix_sensor_health_day_bucket", "bucket"),)
+
+    sensor_id: uuid.UUID = Field(foreign_key="sensor.id", primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    samples: int
+    dcp_sum: int = Field(sa_column=Column(BigInteger, nullable=False))
+    dcp_min: int | None = None
+    online_seconds: float
+    fault_seconds: float
 
 
 class SensorHealthPublic(SQLModel):
@@ -1,6 +1,8 @@
 import uuid
+from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Column, Identity, Integer
 from sqlmodel import Field, SQLModel
 
 
@@ -10,6 +12,25 @@ class Sensor(SQLModel, table=True):
     location: str = Field(max_length=255)
     manufacture_id: Optional[str] = Field(default=None, max_length=255)
     note: Optional[str] = Field(default=None, max_length=255)
+    # Compact internal key used instead of the UUID on the event tables
+    key: int | None = Field(
+        default=None, sa_column=Column(Integer, Identity(), unique=True, nullable=False)
+    )
+
+
+class SensorStatus(SQLModel, table=True):
+    """
+    Latest known state of a sensor, maintained on every data and health ingest.
+    """
+    __tablename__ = "sensor_status"
+
+    sensor_id: uuid.UUID = Field(foreign_key="sensor.id", primary_key=True)
+    last_event_time: datetime | None = None
+    last_health_time: datetime | None = None
+    # State of the latest health report
+    online: bool | None = None
+    fault: bool | None = None
+    dcp: int | None = None
 
 
 class SensorPublic(SQLModel):
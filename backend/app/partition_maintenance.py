@@ -0,0 +1,20 @@
+import logging
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.partitions import maintain_partitions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("Maintaining sensordata and sensorhealth partitions")
+    with Session(engine) as session:
+        maintain_partitions(session)
+    logger.info("Partition maintenance finished")
+
+
+if __name__ == "__main__":
+    main()
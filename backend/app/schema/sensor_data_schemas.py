@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Literal
 import uuid
 
 from pydantic import BaseModel
@@ -9,7 +9,8 @@ from app.models.sensor_data_models import SensorDataPublic, SensorClass, Approac
 
 class SensorDataPublicList(BaseModel):
     data: List[SensorDataPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 
 class ApproachCount(BaseModel):
@@ -23,10 +24,16 @@ class HourlyData(BaseModel):
 
 
 class ApproachData(BaseModel):
+    # Only set with group_by=sensor
+    sensor_id: uuid.UUID | None = None
     approach: str
     hours: List[HourlyData]
 
 
+# Counts per approach, or [-1] when the sensor is down and sent nothing in the range
+ApproachDataList = list[ApproachData | Literal[-1]]
+
+
 class DetailedHourlyCount(BaseModel):
     hour: datetime
     totalCount: int
@@ -41,18 +48,80 @@ class DetailedApproachCount(BaseModel):
 
 class HourlyApproachCount(BaseModel):
     hour: datetime
+    # Only set with group_by=sensor
+    sensor_id: uuid.UUID | None = None
     totalCount: int
     results: Dict[str, int]
 
 class MinuteApproachCount(BaseModel):
     minute: datetime
+    # Only set with group_by=sensor
+    sensor_id: uuid.UUID | None = None
     totalCount: int
     results: Dict[str, int]
 
 
+class ColumnarCounts(BaseModel):
+    """
+    Count series as parallel arrays: bucket i starts at start + i * bucketSeconds.
+    Series are keyed by approach, or "<approach>_<class>" for detailed counts, prefixed
+    with "<sensor_id>_" for group_by=sensor, and only groups with data in the range have one.
+    """
+    start: datetime
+    bucket: str
+    bucketSeconds: int
+    length: int
+    total: list[int]
+    series: dict[str, list[int]]
+    # Set when the sensor is down and sent nothing in the range
+    sensorDown: bool = False
+
+
 
 class SensorDataCreate(BaseModel):
     sensor_id: uuid.UUID
     class_type: str
     approach: str
-    time: datetime
\ No newline at end of file
+    time: datetime
+
+
+class SensorDataIngestReceipt(BaseModel):
+    count: int
+    start_time: datetime | None
+    end_time: datetime | None
+
+
+class CountCacheStats(BaseModel):
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+class IngestQueueStats(BaseModel):
+    running: bool
+    pending_rows: int
+    pending_batches: int
+    max_rows: int
+    oldest_pending_ms: float | None
+    flushes: int
+    rows_flushed: int
+    failures: int
+    dropped_rows: int
+    last_flush_ms: float | None
+    avg_flush_ms: float | None
+    max_flush_ms: float | None
+
+
+class IngestAdmissionStats(BaseModel):
+    requests_in_flight: int
+    rows_in_flight: int
+    max_requests: int
+    max_rows: int
+    pool_checked_out: int
+    admitted: int
+    rejected: int
@@ -1,22 +1,35 @@
-from datetime import datetime
-from typing import List
 import uuid
+from datetime import datetime
 
 from pydantic import BaseModel
+from sqlmodel import SQLModel
 
 from app.models.sensor_health_models import SensorHealthPublic
-from sqlmodel import  SQLModel # type: ignore
 
 
 class SensorHealthPublicList(SQLModel):
-    data: List[SensorHealthPublic]
+    data: list[SensorHealthPublic]
     count: int
 
 
 class GapDetails(BaseModel):
+    sensor_id: uuid.UUID
     startTime: datetime
     endTime: datetime
     duration: str
+    durationSeconds: float
+
+
+class HealthSummary(BaseModel):
+    sensor_id: uuid.UUID
+    bucket: datetime
+    samples: int
+    online_seconds: float
+    fault_seconds: float
+    # Share of the bucket the sensor reported being online, None for an empty window
+    availability: float | None
+    dcp_min: int | None
+    dcp_avg: float | None
 
 
 class SensorHealthCreate(BaseModel):
@@ -24,4 +37,4 @@ class SensorHealthCreate(BaseModel):
     time: datetime
     dcp: int
     online: bool
-    fault: bool
\ No newline at end of file
+    fault: bool
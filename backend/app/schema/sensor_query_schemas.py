@@ -0,0 +1,89 @@
+import uuid
+from datetime import datetime
+from typing import Annotated, Any, Literal
+
+from pydantic import BaseModel, Field
+
+from app.core.aggregation import BucketWidth
+from app.core.config import settings
+
+
+class CountsQuery(BaseModel):
+    """
+    GET /sensors/data/counts or /detailed_counts, with the same parameters.
+    """
+    op: Literal["counts", "detailed_counts"]
+    # Echoed back on the result, to tell queries apart
+    id: str | None = None
+    start_date: datetime
+    end_date: datetime
+    sensor_id: list[uuid.UUID] | None = None
+    approach: list[str] | None = None
+    sensorclass: list[str] | None = None
+    bucket: BucketWidth = "1h"
+    format: Literal["json", "columnar"] = "json"
+    # Only used by detailed_counts
+    render: Literal["app", "postgres"] = "app"
+    group_by: Literal["sensor"] | None = None
+
+
+class LiveQuery(BaseModel):
+    """
+    GET /sensors/data/live or /live/detailed_counts, with the same parameters.
+    """
+    op: Literal["live", "live_detailed_counts"]
+    id: str | None = None
+    sensor_id: list[uuid.UUID] | None = None
+    approach: list[str] | None = None
+    sensorclass: list[str] | None = None
+    bucket: BucketWidth = "1m"
+    format: Literal["json", "columnar"] = "json"
+    # Only used by live_detailed_counts
+    render: Literal["app", "postgres"] = "app"
+    group_by: Literal["sensor"] | None = None
+
+
+class GapsQuery(BaseModel):
+    """
+    GET /sensors/health/gaps, with the same parameters.
+    """
+    op: Literal["gaps"]
+    id: str | None = None
+    sensor_id: uuid.UUID | None = None
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+    min_gap_seconds: int = Field(default=300, ge=settings.HEALTH_INTERVAL_MAX_GAP_SECONDS)
+    skip: int = Field(default=0, ge=0)
+    limit: int = Field(default=100, ge=1, le=1000)
+
+
+class InfoQuery(BaseModel):
+    """
+    GET /sensors/info/ ("sensors") or /sensors/info/status ("status").
+    """
+    op: Literal["sensors", "status"]
+    id: str | None = None
+
+
+SensorQuery = Annotated[
+    CountsQuery | LiveQuery | GapsQuery | InfoQuery, Field(discriminator="op")
+]
+
+
+class BatchQuery(BaseModel):
+    queries: list[SensorQuery] = Field(min_length=1, max_length=settings.BATCH_QUERY_MAX_QUERIES)
+
+
+class QueryResult(BaseModel):
+    id: str | None
+    op: str
+    # The status the query's own endpoint would have answered with
+    status: int
+    # The body the query's own endpoint would have returned, when status is 200
+    data: Any = None
+    detail: str | None = None
+
+
+class BatchQueryResults(BaseModel):
+    # In the order of the queries
+    results: list[QueryResult]
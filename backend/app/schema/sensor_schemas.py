@@ -1,11 +1,23 @@
-from typing import List
+import uuid
+from datetime import datetime
 
 from pydantic import BaseModel
+from sqlmodel import SQLModel
 
 from app.models.sensor_models import SensorPublic
-from sqlmodel import  SQLModel # type: ignore
 
 
 class SensorsPublic(SQLModel):
-    data: List[SensorPublic]
-    count: int
\ No newline at end of file
+    data: list[SensorPublic]
+    count: int
+
+
+class SensorStatusPublic(BaseModel):
+    sensor_id: uuid.UUID
+    name: str
+    up: bool
+    last_event_time: datetime | None
+    last_health_time: datetime | None
+    online: bool | None
+    fault: bool | None
+    dcp: int | None
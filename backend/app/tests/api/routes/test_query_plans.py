@@ -0,0 +1,214 @@
+"""
+EXPLAIN the queries the count, live and health gap endpoints send and check that they
+read the rollups and state intervals through their indexes, never scanning sensordata
+or sensorhealth. The queries that still read the raw tables, such as the data pages,
+the export and the backfills, are checked against the raw table indexes.
+
+Sequential scans are disabled for the EXPLAIN, so the plans show whether an index can
+serve the query whatever the size of the test database.
+"""
+import re
+from collections.abc import Generator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, event, text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.count_cache import count_cache
+from app.core.db import async_engine, engine
+from app.core.export import ExportFilter, export_query
+from app.core.health_intervals import backfill_health_intervals
+from app.core.health_rollups import backfill_health_rollups
+from app.core.live_counters import LiveCounters
+from app.core.rollups import backfill_rollups
+from app.core.sensor_registry import sensor_registry
+from app.core.sensor_status import backfill_sensor_status
+
+Statement = tuple[str, Any]
+
+
+@contextmanager
+def captured(db_engine: Engine) -> Generator[list[Statement], None, None]:
+    statements: list[Statement] = []
+
+    def capture(
+        _conn: Any, _cursor: Any, statement: str, parameters: Any, _context: Any, _executemany: bool
+    ) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(db_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db_engine, "before_cursor_execute", capture)
+
+
+def query_plans(db: Session, statements: list[Statement], table: str) -> list[str]:
+    """
+    The plans of the captured statements that read table.
+    """
+    connection = db.connection()
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plans = [
+        "\n".join(row[0] for row in connection.exec_driver_sql("EXPLAIN " + statement, parameters))
+        for statement, parameters in statements
+        if f" {table} " in statement or statement.rstrip().endswith(f" {table}")
+    ]
+    db.rollback()
+    return plans
+
+
+def index_names(db: Session, index: str) -> set[str]:
+    """
+    The index and, on a partitioned table, the indexes of its partitions.
+    """
+    partitions = db.execute(
+        text(
+            "SELECT partition.relname FROM pg_inherits "
+            "JOIN pg_class partition ON partition.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:index AS regclass)"
+        ),
+        {"index": index},
+    ).scalars()
+    names = {index, *partitions}
+    db.rollback()
+    return names
+
+
+def assert_uses_index(db: Session, plans: list[str], index: str) -> None:
+    assert plans, "no query read the table"
+    names = index_names(db, index)
+    for plan in plans:
+        assert any(f" on {name} " in plan or f"using {name} " in plan for name in names), plan
+        assert not re.search(r"Seq Scan on (sensordata|sensorhealth)(_p\d+)? ", plan), plan
+
+
+@pytest.fixture(autouse=True)
+def no_count_cache() -> Generator[None, None, None]:
+    # Every request queries the database rather than the cache
+    max_entries = count_cache.max_entries
+    count_cache.max_entries = 0
+    count_cache.clear()
+    yield
+    count_cache.max_entries = max_entries
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/sensors/data/counts", {"start_date": "2024-07-17", "end_date": "2024-07-20"}),
+        (
+            "/sensors/data/counts",
+            {"start_date": "2024-07-17", "end_date": "2024-07-20", "group_by": "sensor"},
+        ),
+        ("/sensors/data/detailed_counts", {"start_date": "2024-07-17", "end_date": "2024-07-18"}),
+        (
+            "/sensors/data/detailed_counts",
+            {"start_date": "2024-07-17", "end_date": "2024-07-18", "render": "postgres"},
+        ),
+    ],
+)
+def test_counts_use_hour_rollup_index(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    path: str,
+    params: dict[str, str],
+) -> None:
+    with captured(async_engine.sync_engine) as statements:
+        r = client.get(f"{settings.API_V1_STR}{path}", params=params, headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert_uses_index(db, query_plans(db, statements, "sensordata_hour"), "ix_sensordata_hour_bucket")
+
+
+def test_live_reload_uses_minute_rollup_index(db: Session) -> None:
+    # /live is served from the live counters, which are rebuilt with this query
+    with captured(engine) as statements, Session(engine) as session:
+        LiveCounters(settings.LIVE_WINDOW_MINUTES).reload(session)
+    assert_uses_index(
+        db, query_plans(db, statements, "sensordata_minute"), "ix_sensordata_minute_bucket"
+    )
+
+
+def test_health_gaps_use_interval_index(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    params = {"start_time": "2024-07-01T00:00:00", "end_time": "2024-07-30T00:00:00"}
+    with captured(async_engine.sync_engine) as statements:
+        r = client.get(
+            f"{settings.API_V1_STR}/sensors/health/gaps", params=params, headers=superuser_token_headers
+        )
+    assert r.status_code == 200
+    assert_uses_index(
+        db,
+        query_plans(db, statements, "sensor_health_interval"),
+        "ix_sensor_health_interval_start_time",
+    )
+
+
+def test_data_pages_use_time_id_index(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    sensor = sensor_registry.all(db)[0]
+    params = {
+        "limit": "50",
+        "count": "none",
+        "sensor_id": str(sensor.id),
+        "start_time": "2024-07-17T00:00:00",
+    }
+    first = client.get(f"{settings.API_V1_STR}/sensors/data/", params=params, headers=superuser_token_headers)
+    assert first.status_code == 200
+    # The keyset page after the first, which seeks past the cursor's (time, id)
+    with captured(async_engine.sync_engine) as statements:
+        r = client.get(
+            f"{settings.API_V1_STR}/sensors/data/",
+            params={**params, "cursor": first.json()["next_cursor"]},
+            headers=superuser_token_headers,
+        )
+    assert r.status_code == 200
+    assert_uses_index(db, query_plans(db, statements, "sensordata"), "ix_sensordata_time_id")
+
+
+@pytest.mark.parametrize(
+    "export_filter",
+    [
+        ExportFilter(),
+        ExportFilter(start_time=datetime(2024, 7, 18), end_time=datetime(2024, 7, 18, 1)),
+        ExportFilter(sensor_key=1, start_time=datetime(2024, 7, 18)),
+    ],
+)
+def test_export_uses_time_id_index(db: Session, export_filter: ExportFilter) -> None:
+    # Planned as the server-side cursor the export reads, for the first rows
+    statement, parameters = export_query(export_filter)
+    assert_uses_index(
+        db,
+        query_plans(db, [("DECLARE sensor_data_export CURSOR FOR " + statement, parameters)], "sensordata"),
+        "ix_sensordata_time_id",
+    )
+
+
+def test_sensor_status_backfill_uses_sensor_time_indexes(db: Session) -> None:
+    # The latest event and health report of every sensor
+    with captured(engine) as statements, Session(engine) as session:
+        backfill_sensor_status(session)
+        session.rollback()
+    assert_uses_index(db, query_plans(db, statements, "sensordata"), "ix_sensordata_sensor_key_time")
+    assert_uses_index(db, query_plans(db, statements, "sensorhealth"), "ix_sensorhealth_sensor_id_time")
+
+
+def test_backfills_use_time_brin_indexes(db: Session) -> None:
+    bounds = {"start_time": datetime(2024, 7, 17), "end_time": datetime(2024, 7, 18)}
+    with captured(engine) as statements, Session(engine) as session:
+        backfill_rollups(session, **bounds)
+        backfill_health_intervals(session, **bounds)
+        backfill_health_rollups(session, **bounds)
+        session.rollback()
+    # The bounds are given, so only the rebuilding INSERTs read the raw reports by time
+    inserts = [(statement, parameters) for statement, parameters in statements if statement.startswith("INSERT")]
+    assert_uses_index(db, query_plans(db, inserts, "sensordata"), "ix_sensordata_time_brin")
+    assert_uses_index(db, query_plans(db, inserts, "sensorhealth"), "ix_sensorhealth_time_brin")
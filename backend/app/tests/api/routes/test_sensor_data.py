@@ -0,0 +1,92 @@
+import io
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes.sensorUtils import sensor_data
+from app.core.arrow import ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+from app.core.config import settings
+
+COUNTS_WINDOW = {"start_date": "2024-07-17", "end_date": "2024-07-18", "bucket": "1h"}
+
+
+def test_cursor_pages_cover_the_rows_once(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    params: dict[str, Any] = {
+        "count": "exact",
+        "start_time": "2024-07-17T00:00:00",
+        "end_time": "2024-07-17T00:10:00",
+    }
+    r = client.get(
+        f"{settings.API_V1_STR}/sensors/data/",
+        params={**params, "limit": 1000},
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    everything = r.json()
+    assert 20 < everything["count"] < 1000
+    assert everything["next_cursor"] is None
+
+    rows: list[dict[str, Any]] = []
+    cursor = None
+    while True:
+        page = client.get(
+            f"{settings.API_V1_STR}/sensors/data/",
+            params={**params, "limit": 7, **({"cursor": cursor} if cursor else {})},
+            headers=superuser_token_headers,
+        ).json()
+        assert page["count"] == everything["count"]
+        rows.extend(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert rows == everything["data"]
+
+
+def test_invalid_cursor_is_rejected(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/sensors/data/",
+        params={"cursor": "not a cursor"},
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        (f"application/json;q=0.9, {PARQUET_MEDIA_TYPE}", PARQUET_MEDIA_TYPE),
+        (f"{ARROW_STREAM_MEDIA_TYPE};q=0.5, application/json", "application/json"),
+    ],
+)
+def test_counts_follow_accept_quality(
+    client: TestClient, superuser_token_headers: dict[str, str], accept: str, media_type: str
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/sensors/data/counts",
+        params=COUNTS_WINDOW,
+        headers={**superuser_token_headers, "Accept": accept},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == media_type
+    if media_type == PARQUET_MEDIA_TYPE:
+        import pyarrow.parquet  # type: ignore[import-untyped]
+
+        table = pyarrow.parquet.read_table(io.BytesIO(r.content))
+        assert table.column_names == ["time", "approach", "count"]
+
+
+def test_tabular_output_without_pyarrow_is_not_acceptable(
+    client: TestClient, superuser_token_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(sensor_data, "arrow_available", lambda: False)
+    r = client.get(
+        f"{settings.API_V1_STR}/sensors/data/counts",
+        params=COUNTS_WINDOW,
+        headers={**superuser_token_headers, "Accept": ARROW_STREAM_MEDIA_TYPE},
+    )
+    assert r.status_code == 406
@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_summary_of_empty_window_has_no_availability(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    # On an hour boundary the window covers no bucket, but every sensor still gets an entry
+    params = {"start_time": "2024-07-17T00:00:00", "end_time": "2024-07-17T00:00:00", "bucket": "all"}
+    r = client.get(
+        f"{settings.API_V1_STR}/sensors/health/summary", params=params, headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    summaries = r.json()
+    assert summaries
+    for summary in summaries:
+        assert summary["samples"] == 0
+        assert summary["availability"] is None
+
+
+def test_summary_rejects_reversed_window(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    params = {"start_time": "2024-07-18T00:00:00", "end_time": "2024-07-17T00:00:00", "bucket": "all"}
+    r = client.get(
+        f"{settings.API_V1_STR}/sensors/health/summary", params=params, headers=superuser_token_headers
+    )
+    assert r.status_code == 400
@@ -0,0 +1,66 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes.sensorUtils import sensor_query
+from app.core.config import settings
+
+
+def failing_fleet_status(*_args: object) -> None:
+    raise RuntimeError("status unavailable")
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_batch_isolates_failing_queries(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+    workers: int,
+) -> None:
+    monkeypatch.setattr(settings, "BATCH_QUERY_WORKERS", workers)
+    monkeypatch.setattr(sensor_query, "fleet_status", failing_fleet_status)
+    window = {"start_date": "2024-07-17", "end_date": "2024-07-18"}
+    queries = [
+        {"id": "chart", "op": "counts", **window},
+        {"id": "bad approach", "op": "counts", **window, "approach": ["XX"]},
+        {"id": "status", "op": "status"},
+        {"id": "reversed", "op": "gaps", "start_time": "2024-07-20", "end_time": "2024-07-10"},
+        {"id": "sensors", "op": "sensors"},
+        {"id": "detailed", "op": "detailed_counts", **window},
+    ]
+    r = client.post(
+        f"{settings.API_V1_STR}/sensors/query/batch",
+        json={"queries": queries},
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [(result["id"], result["status"]) for result in results] == [
+        ("chart", 200),
+        ("bad approach", 400),
+        ("status", 500),
+        ("reversed", 400),
+        ("sensors", 200),
+        ("detailed", 200),
+    ]
+    # Each successful query answers with the body of its own endpoint
+    for result, path, params in [
+        (results[0], "/sensors/data/counts", window),
+        (results[4], "/sensors/info/", {}),
+        (results[5], "/sensors/data/detailed_counts", window),
+    ]:
+        own = client.get(f"{settings.API_V1_STR}{path}", params=params, headers=superuser_token_headers)
+        assert result["data"] == own.json()
+    assert results[2]["detail"] == "Internal Server Error"
+
+
+def test_batch_with_invalid_query_is_rejected(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    # The body is validated as a whole
+    queries = [{"op": "sensors"}, {"op": "counts"}]
+    r = client.post(
+        f"{settings.API_V1_STR}/sensors/query/batch",
+        json={"queries": queries},
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 422
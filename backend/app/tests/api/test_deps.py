@@ -0,0 +1,50 @@
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.deps import off_loop, run_read
+from app.core.db import async_engine
+
+
+def threads(_session: Session) -> tuple[int, int, int]:
+    """
+    The thread fn runs on, the thread off_loop runs work on, and the thread that work's
+    own off_loop calls run on.
+    """
+    def nested() -> tuple[int, int]:
+        return threading.get_ident(), off_loop(threading.get_ident)
+
+    worker, nested_worker = off_loop(nested)
+    return threading.get_ident(), worker, nested_worker
+
+
+def test_off_loop_in_run_read_uses_a_worker_thread(client: TestClient) -> None:
+    async def read() -> tuple[int, tuple[int, int, int]]:
+        async with AsyncSession(async_engine) as session:
+            return threading.get_ident(), await run_read(session, threads)
+
+    assert client.portal is not None
+    loop_thread, (fn_thread, worker, nested_worker) = client.portal.call(read)
+    # fn runs on the event loop, the work it hands to off_loop does not
+    assert fn_thread == loop_thread
+    assert worker != loop_thread
+    # and off_loop calls made by that work run where they are
+    assert nested_worker == worker
+
+
+def test_off_loop_elsewhere_calls_fn() -> None:
+    # A sync route or a batch query worker, already off the event loop
+    assert off_loop(threading.get_ident) == threading.get_ident()
+
+
+def test_off_loop_in_threadpool_calls_fn(client: TestClient) -> None:
+    # Batch query workers run in the threadpool of an async route, outside run_read
+    async def work() -> tuple[int, int]:
+        return await run_in_threadpool(lambda: (threading.get_ident(), off_loop(threading.get_ident)))
+
+    assert client.portal is not None
+    worker, called = client.portal.call(work)
+    assert called == worker
@@ -0,0 +1,33 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def db() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(scope="module")
+def client() -> Generator[TestClient, None, None]:
+    # Entered, so the async engine and the lifespan tasks run on the client's event loop
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def superuser_token_headers(client: TestClient) -> dict[str, str]:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    tokens = r.json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
@@ -0,0 +1,42 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import IngestOverloaded, IngestRoute, ingest_admission
+from app.core.config import settings
+
+router = APIRouter(route_class=IngestRoute)
+
+
+@router.post("/queued")
+def queued() -> None:
+    # Like a write-behind request finding the queue full
+    raise IngestOverloaded("Ingest queue is full")
+
+
+@router.post("/rows")
+def rows() -> None:
+    with ingest_admission.rows(ingest_admission.max_rows):
+        pass
+
+
+@pytest.fixture(scope="module")
+def ingest_client() -> Generator[TestClient, None, None]:
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.mark.parametrize("path", ["/queued", "/rows"])
+def test_every_429_is_counted_once(ingest_client: TestClient, path: str) -> None:
+    rejected = ingest_admission.rejected
+    # Rows already in flight, so a full batch more is turned away
+    with ingest_admission.rows(1):
+        r = ingest_client.post(path)
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == str(settings.INGEST_RETRY_AFTER_SECONDS)
+    assert ingest_admission.rejected == rejected + 1
+    assert ingest_admission.stats().rejected == rejected + 1
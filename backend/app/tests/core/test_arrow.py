@@ -0,0 +1,41 @@
+import pytest
+
+from app.core.arrow import (
+    ARROW_STREAM_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    negotiate_tabular,
+)
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        (None, None),
+        ("", None),
+        ("application/json", None),
+        ("*/*", None),
+        (ARROW_STREAM_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE),
+        ("application/vnd.apache.parquet", PARQUET_MEDIA_TYPE),
+        ("Application/X-Parquet", PARQUET_MEDIA_TYPE),
+        # Equal quality goes to the first listed
+        (f"application/json, {ARROW_STREAM_MEDIA_TYPE}", None),
+        (f"{ARROW_STREAM_MEDIA_TYPE}, application/json", ARROW_STREAM_MEDIA_TYPE),
+        (f"{PARQUET_MEDIA_TYPE}, {ARROW_STREAM_MEDIA_TYPE}", PARQUET_MEDIA_TYPE),
+        # Otherwise to the higher quality
+        (f"application/json;q=0.9, {ARROW_STREAM_MEDIA_TYPE}", ARROW_STREAM_MEDIA_TYPE),
+        (f"{ARROW_STREAM_MEDIA_TYPE};q=0.5, application/json", None),
+        (f"{ARROW_STREAM_MEDIA_TYPE} ; q=0.8, {PARQUET_MEDIA_TYPE};q=0.9, */*;q=0.1", PARQUET_MEDIA_TYPE),
+        (f"{ARROW_STREAM_MEDIA_TYPE};Q=0.5, application/json", None),
+        # Refused, or a quality that cannot be read
+        (f"{ARROW_STREAM_MEDIA_TYPE};q=0", None),
+        (f"{ARROW_STREAM_MEDIA_TYPE};q=0, application/json;q=0.1", None),
+        (f"{ARROW_STREAM_MEDIA_TYPE};q=high", None),
+        # Only types the API does not serve
+        ("text/csv", None),
+        (f"text/csv, {PARQUET_MEDIA_TYPE};q=0.2", PARQUET_MEDIA_TYPE),
+        # Other parameters are ignored
+        (f"{ARROW_STREAM_MEDIA_TYPE};charset=utf-8;q=0.7, application/json;q=0.6", ARROW_STREAM_MEDIA_TYPE),
+    ],
+)
+def test_negotiate_tabular(accept: str | None, media_type: str | None) -> None:
+    assert negotiate_tabular(accept) == media_type
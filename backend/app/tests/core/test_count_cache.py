@@ -0,0 +1,161 @@
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.count_cache import (
+    NOTIFY_MAX_PAYLOAD,
+    CountCache,
+    apply_notify,
+    count_cache,
+    notify_payload,
+    record_ingested_hours,
+)
+from app.core.db import engine
+
+SENSOR = uuid.UUID("00000000-0000-0000-0000-000000000001")
+OTHER_SENSOR = uuid.UUID("00000000-0000-0000-0000-000000000002")
+# A closed window, [10:30, 12:00)
+START = datetime(2024, 7, 17, 10, 30)
+END = datetime(2024, 7, 17, 12)
+
+
+def new_cache() -> CountCache:
+    return CountCache(max_entries=10, max_bytes=1000, ttl_seconds=300)
+
+
+def store(cache: CountCache, key: str, sensor_ids: frozenset[uuid.UUID] | None = None) -> None:
+    cache.get_or_compute(key, sensor_ids, START, END, lambda: key.encode())
+
+
+def cached(cache: CountCache, key: str) -> bool:
+    hits = cache.hits
+    cache.get_or_compute(key, None, START, END, lambda: b"recomputed")
+    return cache.hits == hits + 1
+
+
+def test_closed_window_is_stored() -> None:
+    cache = new_cache()
+    calls = []
+
+    def compute() -> bytes:
+        calls.append(1)
+        return b"body"
+
+    assert cache.get_or_compute("key", None, START, END, compute) == b"body"
+    assert cache.get_or_compute("key", None, START, END, compute) == b"body"
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_open_window_is_not_stored() -> None:
+    cache = new_cache()
+    end = datetime.utcnow() + timedelta(hours=1)
+    cache.get_or_compute("key", None, START, end, lambda: b"body")
+    assert cache.stats().entries == 0
+
+
+def test_expired_entry_is_recomputed() -> None:
+    cache = CountCache(max_entries=10, max_bytes=1000, ttl_seconds=0)
+    store(cache, "key")
+    assert not cached(cache, "key")
+
+
+def test_lru_eviction() -> None:
+    cache = CountCache(max_entries=2, max_bytes=1000, ttl_seconds=300)
+    store(cache, "a")
+    store(cache, "b")
+    assert cached(cache, "a")
+    store(cache, "c")
+    # b was used least recently
+    assert cache.stats().entries == 2
+    assert cached(cache, "a")
+    assert cached(cache, "c")
+    assert not cached(cache, "b")
+
+
+@pytest.mark.parametrize(
+    "touched, stale",
+    [
+        # The hour the window starts in, though the window starts at half past
+        ({(SENSOR, datetime(2024, 7, 17, 10))}, True),
+        ({(SENSOR, datetime(2024, 7, 17, 11))}, True),
+        # end is exclusive
+        ({(SENSOR, datetime(2024, 7, 17, 12))}, False),
+        ({(SENSOR, datetime(2024, 7, 17, 9))}, False),
+        ({(OTHER_SENSOR, datetime(2024, 7, 17, 11))}, False),
+        ({(OTHER_SENSOR, datetime(2024, 7, 17, 11)), (SENSOR, datetime(2024, 7, 17, 9))}, False),
+        ({(OTHER_SENSOR, datetime(2024, 7, 17, 9)), (SENSOR, datetime(2024, 7, 17, 13))}, False),
+        (set(), False),
+    ],
+)
+def test_invalidate_drops_affected_entries(touched: set[tuple[uuid.UUID, datetime]], stale: bool) -> None:
+    cache = new_cache()
+    store(cache, "sensor", frozenset({SENSOR}))
+    store(cache, "all")
+    cache.invalidate(touched)
+    assert cached(cache, "sensor") is not stale
+    # Entries for all sensors are affected by an ingest of any sensor in their window
+    assert cached(cache, "all") is not any(
+        START.replace(minute=0) <= hour < END for _, hour in touched
+    )
+
+
+def test_result_computed_across_an_invalidation_is_not_stored() -> None:
+    cache = new_cache()
+
+    def compute() -> bytes:
+        # An ingest commits while the counts are being read
+        cache.invalidate({(OTHER_SENSOR, datetime(2020, 1, 1))})
+        return b"maybe stale"
+
+    assert cache.get_or_compute("key", None, START, END, compute) == b"maybe stale"
+    assert cache.stats().entries == 0
+
+
+def test_notify_payload_round_trip() -> None:
+    touched = {(SENSOR, datetime(2024, 7, 17, 11))}
+    store(count_cache, "notify sensor", frozenset({SENSOR}))
+    store(count_cache, "notify other", frozenset({OTHER_SENSOR}))
+    apply_notify(notify_payload(touched))
+    assert not cached(count_cache, "notify sensor")
+    assert cached(count_cache, "notify other")
+
+
+def test_oversized_notify_clears_the_cache() -> None:
+    touched = {(uuid.uuid4(), datetime(2024, 7, 17, 11)) for _ in range(NOTIFY_MAX_PAYLOAD // 40)}
+    assert notify_payload(touched) == ""
+    store(count_cache, "notify other", frozenset({OTHER_SENSOR}))
+    apply_notify("")
+    assert not cached(count_cache, "notify other")
+
+
+@pytest.fixture
+def cache_entry() -> Generator[str, None, None]:
+    store(count_cache, "ingest", frozenset({SENSOR}))
+    yield "ingest"
+    count_cache.invalidate({(SENSOR, START)})
+
+
+def test_commit_invalidates(cache_entry: str) -> None:
+    with Session(engine) as session:
+        # Recorded by an ingest, inside its transaction
+        session.execute(text("SELECT 1"))
+        record_ingested_hours(session, {(SENSOR, datetime(2024, 7, 17, 11))})
+        assert cached(count_cache, cache_entry)
+        session.commit()
+    assert not cached(count_cache, cache_entry)
+
+
+def test_rollback_keeps_entries(cache_entry: str) -> None:
+    with Session(engine) as session:
+        # Recorded by an ingest, inside its transaction
+        session.execute(text("SELECT 1"))
+        record_ingested_hours(session, {(SENSOR, datetime(2024, 7, 17, 11))})
+        session.rollback()
+        # Nothing is left to invalidate on the next commit
+        session.commit()
+    assert cached(count_cache, cache_entry)
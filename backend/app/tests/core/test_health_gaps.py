@@ -0,0 +1,95 @@
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.health_gaps import health_gaps
+from app.models.sensor_health_models import SensorHealthInterval
+from app.models.sensor_models import Sensor
+
+T0 = datetime(2024, 7, 17, 10)
+
+
+def at(minutes: int) -> datetime:
+    return T0 + timedelta(minutes=minutes)
+
+
+@pytest.fixture
+def session() -> Generator[Session, None, None]:
+    # Everything written here is rolled back
+    with Session(engine) as session:
+        yield session
+        session.rollback()
+
+
+@pytest.fixture
+def sensor_id(session: Session) -> uuid.UUID:
+    sensor = Sensor(name="gap test", location="test")
+    session.add(sensor)
+    session.flush()
+    # (start, end) in minutes after T0; the second one came from late reports in
+    # another state, inside the first
+    for start, end in [(0, 10), (2, 3), (12, 13), (20, 21), (22, 30), (25, 26), (35, 36)]:
+        session.add(SensorHealthInterval(
+            sensor_id=sensor.id,
+            start_time=at(start),
+            end_time=at(end),
+            dcp=90,
+            online=True,
+            fault=False,
+            samples=1,
+        ))
+    session.flush()
+    return sensor.id
+
+
+def gaps(
+    session: Session, sensor_id: uuid.UUID, start: int, end: int, **kwargs: int
+) -> list[tuple[datetime, datetime, float]]:
+    rows = health_gaps(
+        session,
+        start_time=at(start),
+        end_time=at(end),
+        min_gap=timedelta(minutes=1),
+        sensor_id=sensor_id,
+        **kwargs,
+    )
+    assert all(row.sensor_id == sensor_id for row in rows)
+    return [(row.start, row.end, float(row.seconds)) for row in rows]
+
+
+def test_gaps_run_from_the_latest_earlier_end(session: Session, sensor_id: uuid.UUID) -> None:
+    assert gaps(session, sensor_id, 0, 60) == [
+        (at(10), at(12), 120.0),
+        (at(13), at(20), 420.0),
+        (at(30), at(35), 300.0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        # The gap began before the window, after intervals nested in each other
+        (5, 15, [(at(10), at(12), 120.0)]),
+        (26, 40, [(at(30), at(35), 300.0)]),
+        # Gaps are in the window of their end, which is exclusive
+        (12, 20, [(at(10), at(12), 120.0)]),
+        (13, 21, [(at(13), at(20), 420.0)]),
+        (36, 60, []),
+    ],
+)
+def test_gap_ending_in_the_window(
+    session: Session,
+    sensor_id: uuid.UUID,
+    start: int,
+    end: int,
+    expected: list[tuple[datetime, datetime, float]],
+) -> None:
+    assert gaps(session, sensor_id, start, end) == expected
+
+
+def test_gaps_are_paged(session: Session, sensor_id: uuid.UUID) -> None:
+    assert gaps(session, sensor_id, 0, 60, skip=1, limit=1) == [(at(13), at(20), 420.0)]
@@ -0,0 +1,104 @@
+import random
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, col, select
+
+from app.core.db import engine
+from app.core.health_intervals import backfill_health_intervals, extend_health_intervals
+from app.core.health_rollups import HealthSpan
+from app.models.sensor_health_models import SensorHealth, SensorHealthInterval
+from app.models.sensor_models import Sensor
+from app.schema.sensor_health_schemas import SensorHealthCreate
+
+T0 = datetime(2024, 7, 17, 12)
+# (seconds after T0, online, fault); at most HEALTH_INTERVAL_MAX_GAP_SECONDS apart
+# within a run, then a fault and a report after a longer gap
+REPORTS = [(0, True, False), (60, True, False), (120, True, False), (180, True, True), (400, True, False)]
+INTERVALS = [
+    (T0, T0 + timedelta(seconds=120), True, False, 3),
+    (T0 + timedelta(seconds=180), T0 + timedelta(seconds=180), True, True, 1),
+    (T0 + timedelta(seconds=400), T0 + timedelta(seconds=400), True, False, 1),
+]
+
+
+@pytest.fixture
+def session() -> Generator[Session, None, None]:
+    # Everything written here is rolled back
+    with Session(engine) as session:
+        yield session
+        session.rollback()
+
+
+@pytest.fixture
+def sensor_id(session: Session) -> uuid.UUID:
+    sensor = Sensor(name="interval test", location="test")
+    session.add(sensor)
+    session.flush()
+    return sensor.id
+
+
+def reports(sensor_id: uuid.UUID, *rows: tuple[int, bool, bool]) -> list[SensorHealthCreate]:
+    return [
+        SensorHealthCreate(
+            sensor_id=sensor_id, time=T0 + timedelta(seconds=offset), dcp=90, online=online, fault=fault
+        )
+        for offset, online, fault in rows
+    ]
+
+
+def intervals(session: Session, sensor_id: uuid.UUID) -> list[tuple[datetime, datetime, bool, bool, int]]:
+    session.flush()
+    rows = session.exec(
+        select(SensorHealthInterval)
+        .where(SensorHealthInterval.sensor_id == sensor_id)
+        .order_by(col(SensorHealthInterval.start_time))
+    ).all()
+    return [(row.start_time, row.end_time, row.online, row.fault, row.samples) for row in rows]
+
+
+def test_batch_is_folded_into_intervals(session: Session, sensor_id: uuid.UUID) -> None:
+    batch = reports(sensor_id, *REPORTS)
+    # Applied in time order whatever the order of the batch
+    random.Random(1).shuffle(batch)
+    spans = extend_health_intervals(session, batch)
+    assert intervals(session, sensor_id) == INTERVALS
+    # Each report ends a span in the state before it, unless the gap is too long
+    assert sorted(spans) == [
+        HealthSpan(sensor_id, T0, T0 + timedelta(seconds=60), True, False),
+        HealthSpan(sensor_id, T0 + timedelta(seconds=60), T0 + timedelta(seconds=120), True, False),
+        HealthSpan(sensor_id, T0 + timedelta(seconds=120), T0 + timedelta(seconds=180), True, False),
+    ]
+
+
+def test_later_batch_extends_the_stored_interval(session: Session, sensor_id: uuid.UUID) -> None:
+    extend_health_intervals(session, reports(sensor_id, *REPORTS[:2]))
+    session.flush()
+    spans = extend_health_intervals(session, reports(sensor_id, REPORTS[2]))
+    assert intervals(session, sensor_id) == INTERVALS[:1]
+    assert spans == [
+        HealthSpan(sensor_id, T0 + timedelta(seconds=60), T0 + timedelta(seconds=120), True, False)
+    ]
+
+
+def test_late_report_in_another_state_is_its_own_interval(
+    session: Session, sensor_id: uuid.UUID
+) -> None:
+    extend_health_intervals(session, reports(sensor_id, *REPORTS[:3]))
+    session.flush()
+    spans = extend_health_intervals(session, reports(sensor_id, (30, False, False)))
+    assert intervals(session, sensor_id) == [
+        INTERVALS[0],
+        (T0 + timedelta(seconds=30), T0 + timedelta(seconds=30), False, False, 1),
+    ]
+    assert spans == []
+
+
+def test_backfill_matches_ingest(session: Session, sensor_id: uuid.UUID) -> None:
+    for data in reports(sensor_id, *REPORTS):
+        session.add(SensorHealth.model_validate(data))
+    session.flush()
+    backfill_health_intervals(session, T0, T0 + timedelta(seconds=400))
+    assert intervals(session, sensor_id) == INTERVALS
@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.core.health_rollups import (
+    HealthBucket,
+    HealthSpan,
+    day_counts,
+    health_rollup_counts,
+    split_by_hour,
+)
+from app.schema.sensor_health_schemas import SensorHealthCreate
+
+SENSOR = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+@pytest.mark.parametrize(
+    "start, end, pieces",
+    [
+        (datetime(2024, 7, 17, 10, 15), datetime(2024, 7, 17, 10, 45), [(datetime(2024, 7, 17, 10), 1800.0)]),
+        # Ends on the hour, which belongs to the next one
+        (datetime(2024, 7, 17, 10, 15), datetime(2024, 7, 17, 11), [(datetime(2024, 7, 17, 10), 2700.0)]),
+        (
+            datetime(2024, 7, 17, 10, 59, 59, 500000),
+            datetime(2024, 7, 17, 11, 0, 0, 250000),
+            [(datetime(2024, 7, 17, 10), 0.5), (datetime(2024, 7, 17, 11), 0.25)],
+        ),
+        (
+            datetime(2024, 7, 17, 22, 30),
+            datetime(2024, 7, 18, 1, 10),
+            [
+                (datetime(2024, 7, 17, 22), 1800.0),
+                (datetime(2024, 7, 17, 23), 3600.0),
+                (datetime(2024, 7, 18, 0), 3600.0),
+                (datetime(2024, 7, 18, 1), 600.0),
+            ],
+        ),
+        (datetime(2024, 7, 17, 10), datetime(2024, 7, 17, 10), []),
+    ],
+)
+def test_split_by_hour(start: datetime, end: datetime, pieces: list[tuple[datetime, float]]) -> None:
+    assert list(split_by_hour(start, end)) == pieces
+
+
+def test_span_across_midnight_is_split_into_days() -> None:
+    reports = [
+        SensorHealthCreate(sensor_id=SENSOR, time=time, dcp=dcp, online=True, fault=False)
+        for time, dcp in [(datetime(2024, 7, 17, 23, 59), 80), (datetime(2024, 7, 18, 0, 1), 60)]
+    ]
+    spans = [
+        HealthSpan(SENSOR, datetime(2024, 7, 17, 23, 59), datetime(2024, 7, 18, 0, 1), True, True),
+        # Neither online nor faulted, so no seconds to count
+        HealthSpan(SENSOR, datetime(2024, 7, 18, 0, 1), datetime(2024, 7, 18, 0, 3), False, False),
+    ]
+    hours = health_rollup_counts(reports, spans)
+    assert hours == {
+        (SENSOR, datetime(2024, 7, 17, 23)): HealthBucket(1, 80, 80, 60.0, 60.0),
+        (SENSOR, datetime(2024, 7, 18, 0)): HealthBucket(1, 60, 60, 60.0, 60.0),
+    }
+    assert day_counts(hours) == {
+        (SENSOR, datetime(2024, 7, 17)): HealthBucket(1, 80, 80, 60.0, 60.0),
+        (SENSOR, datetime(2024, 7, 18)): HealthBucket(1, 60, 60, 60.0, 60.0),
+    }
+
+
+def test_day_counts_fold_the_hours_of_a_day() -> None:
+    hours = {
+        (SENSOR, datetime(2024, 7, 17, 0)): HealthBucket(2, 150, 70, 3600.0, 0.0),
+        (SENSOR, datetime(2024, 7, 17, 23)): HealthBucket(1, 50, 50, 1800.0, 600.0),
+    }
+    assert day_counts(hours) == {
+        (SENSOR, datetime(2024, 7, 17)): HealthBucket(3, 200, 50, 5400.0, 600.0),
+    }
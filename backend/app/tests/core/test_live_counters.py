@@ -0,0 +1,112 @@
+from collections import Counter
+from collections.abc import Generator
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.core.aggregation import floor_to_bucket
+from app.core.db import engine
+from app.core.live_counters import LiveCounters, visible_in_snapshot
+from app.models.sensor_data_models import (
+    APPROACH_CODES,
+    SENSOR_CLASS_CODES,
+    Approach,
+    SensorClass,
+    SensorDataMinute,
+)
+from app.models.sensor_models import Sensor
+
+# Committed long before any snapshot, and not yet started for any snapshot
+OLD_XID = 3
+FUTURE_XID = 2**62
+
+
+@pytest.mark.parametrize(
+    "xid, snapshot, visible",
+    [
+        (99, "100:105:101,103", True),
+        (100, "100:105:101,103", True),
+        (101, "100:105:101,103", False),
+        (102, "100:105:101,103", True),
+        (103, "100:105:101,103", False),
+        (104, "100:105:101,103", True),
+        (105, "100:105:101,103", False),
+        (1000, "100:105:101,103", False),
+        # Matches whole ids only
+        (10, "10:200:100", True),
+        (99, "100:100:", True),
+        (100, "100:100:", False),
+    ],
+)
+def test_visible_in_snapshot(xid: int, snapshot: str, visible: bool) -> None:
+    assert visible_in_snapshot(xid, snapshot) is visible
+
+
+@pytest.fixture
+def session() -> Generator[Session, None, None]:
+    # Rows written here are read back by the reload, then rolled back
+    with Session(engine) as session:
+        yield session
+        session.rollback()
+
+
+def live_total(counters: LiveCounters, sensor_key: int, start: datetime, end: datetime) -> int:
+    rows = counters.bucketed_counts(
+        width="1m", start_time=start, end_time=end, sensor_keys={sensor_key}
+    )
+    return sum(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize(
+    "xid, total",
+    [
+        # Already in the rollup read by the reload
+        (OLD_XID, 5),
+        # Committed after the snapshot of the read, so the rollup missed it
+        (FUTURE_XID, 5 + 2),
+    ],
+)
+def test_reload_reconciles_adds_made_during_the_read(
+    session: Session, xid: int, total: int
+) -> None:
+    counters = LiveCounters(60)
+    sensor_key = session.exec(select(Sensor.key).limit(1)).one()
+    assert sensor_key is not None
+    minute = floor_to_bucket(datetime.utcnow(), "1m") - timedelta(minutes=1)
+    session.add(
+        SensorDataMinute(
+            sensor_key=sensor_key,
+            bucket=minute,
+            approach=Approach.NB,
+            class_type=SensorClass.car,
+            count=5,
+        )
+    )
+    session.flush()
+
+    def ingest_commits(*_args: Any) -> None:
+        # An ingest of this process commits while the rollup is being read
+        code = (APPROACH_CODES[Approach.NB], SENSOR_CLASS_CODES[SensorClass.car])
+        counters.add(Counter({(sensor_key, minute, *code): 2}), xid)
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", ingest_commits, once=True)
+    counters.reload(session)
+    assert counters.loaded
+    assert live_total(counters, sensor_key, minute, minute) == total
+
+
+def test_adds_after_a_reload_are_counted(session: Session) -> None:
+    counters = LiveCounters(60)
+    counters.reload(session)
+    minute = floor_to_bucket(datetime.utcnow(), "1m")
+    oldest = counters.oldest_minute()
+    before = live_total(counters, 1, oldest, minute)
+    code = (APPROACH_CODES[Approach.SB], SENSOR_CLASS_CODES[SensorClass.pedestrian])
+    counters.add(Counter({(1, minute, *code): 3}), OLD_XID)
+    # Minutes that have left the window are dropped
+    counters.add(Counter({(1, oldest - timedelta(minutes=1), *code): 4}), OLD_XID)
+    assert live_total(counters, 1, oldest, minute) == before + 3
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize(
+    "time, id",
+    [
+        (datetime(2024, 7, 17, 0, 29, 27, 267000), 309),
+        (datetime(2024, 7, 17), 1),
+        (datetime(2024, 12, 31, 23, 59, 59, 999999), 2**62),
+    ],
+)
+def test_cursor_round_trip(time: datetime, id: int) -> None:
+    cursor = encode_cursor(time, id)
+    # Safe to pass as a query parameter as is
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == (time, id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        encode_cursor(datetime(2024, 7, 17), 1)[:-3],
+        # Valid base64 of text that is no (time, id)
+        "MjAyNC0wNy0xNw",
+        "MjAyNC0wNy0xN1QwMDowMDowMHx4",
+        "MjAyNC0wNy0xN1QwMDowMDowMHwxfDI",
+        "__8",
+    ],
+)
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
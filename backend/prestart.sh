@@ -8,3 +8,6 @@ alembic upgrade head
 
 # Create initial data in DB
 python /app/app/initial_data.py
+
+# Create upcoming partitions and move seeded rows out of the default partitions
+python /app/app/partition_maintenance.py
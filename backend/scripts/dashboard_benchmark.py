@@ -0,0 +1,152 @@
+"""
+Concurrency benchmark: many dashboard clients polling the sensor read endpoints.
+
+Every client loops over the requests a dashboard page makes (the hourly chart, the live
+table, the health gaps and the fleet status) for the given duration, and the run reports
+throughput and latency percentiles. Run it against a started server, e.g.
+
+    uvicorn app.main:app --port 8000
+    python scripts/dashboard_benchmark.py --url http://localhost:8000 --clients 1000
+
+The chart window is a closed range, so it is mostly served from the count cache; pass
+--chart-start and --chart-end to aim it at data the database actually holds.
+"""
+import argparse
+import asyncio
+import os
+import time
+from statistics import quantiles
+
+import httpx
+
+API_PREFIX = "/api/v1"
+
+
+def dashboard_requests(args: argparse.Namespace) -> list[tuple[str, dict[str, str]]]:
+    return [
+        ("/sensors/data/counts", {"start_date": args.chart_start, "end_date": args.chart_end}),
+        ("/sensors/data/live", {}),
+        ("/sensors/health/gaps", {}),
+        ("/sensors/info/status", {}),
+    ]
+
+
+async def get(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes
+) -> int:
+    """
+    Sends one keep-alive GET and reads the response, returning its status. The server
+    answers these endpoints with a Content-Length.
+    """
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(lines[0].split(" ", 2)[1])
+
+
+async def client(
+    args: argparse.Namespace,
+    token: str,
+    deadline: float,
+    latencies: list[tuple[str, float]],
+    errors: list[str],
+) -> None:
+    # A keep-alive connection per client, like a browser tab. The requests are written by
+    # hand: with a thousand clients on the same machine as the server, a full HTTP client
+    # library costs more CPU than the endpoints being measured.
+    url = httpx.URL(args.url)
+    requests = [
+        (
+            path,
+            (
+                f"GET {API_PREFIX}{path}?{httpx.QueryParams(params)} HTTP/1.1\r\n"
+                f"Host: {url.host}\r\nAuthorization: Bearer {token}\r\n\r\n"
+            ).encode(),
+        )
+        for path, params in dashboard_requests(args)
+    ]
+    reader, writer = await asyncio.open_connection(url.host, url.port or 80)
+    try:
+        while time.perf_counter() < deadline:
+            for path, request in requests:
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(get(reader, writer, request), args.timeout)
+                except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                    errors.append(f"{path}: {type(e).__name__}")
+                    # The connection is in an unknown state, start a new one
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(url.host, url.port or 80)
+                    continue
+                if status != 200:
+                    errors.append(f"{path}: {status}")
+                    continue
+                latencies.append((path, time.perf_counter() - started))
+    finally:
+        writer.close()
+
+
+def percentiles(label: str, latencies: list[float]) -> str:
+    if len(latencies) < 2:
+        return f"{label:<26} -"
+    cuts = quantiles(latencies, n=100)
+    return (
+        f"{label:<26} p50 {cuts[49] * 1000:.0f} ms, p95 {cuts[94] * 1000:.0f} ms, "
+        f"p99 {cuts[98] * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.url, timeout=httpx.Timeout(args.timeout)) as http:
+        token = (await http.post(
+            API_PREFIX + "/login/access-token",
+            data={"username": args.username, "password": args.password},
+        )).json()["access_token"]
+        # One warm-up pass loads the in-process caches the dashboard reads
+        for path, params in dashboard_requests(args):
+            response = await http.get(
+                API_PREFIX + path, params=params, headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+
+    latencies: list[tuple[str, float]] = []
+    errors: list[str] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(args, token, started + args.duration, latencies, errors)
+        for _ in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    print(f"{'clients':<26} {args.clients}")
+    print(f"{'duration':<26} {elapsed:.1f} s")
+    print(f"{'requests':<26} {len(latencies)} ok, {len(errors)} failed")
+    print(f"{'throughput':<26} {len(latencies) / elapsed:.0f} req/s")
+    print(percentiles("latency", [seconds for _, seconds in latencies]))
+    for path, _ in dashboard_requests(args):
+        print(percentiles(f"  {path}", [seconds for name, seconds in latencies if name == path]))
+    if errors:
+        print(f"{'first errors':<26}", ", ".join(sorted(set(errors))[:5]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per request")
+    parser.add_argument("--username", default=os.environ.get("FIRST_SUPERUSER", "admin@example.com"))
+    parser.add_argument("--password", default=os.environ.get("FIRST_SUPERUSER_PASSWORD", "changethis"))
+    parser.add_argument("--chart-start", default="2024-07-17")
+    parser.add_argument("--chart-end", default="2024-07-17T23:59")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Load test: read latency while generators flood the ingest endpoint.
+
+Readers page GET /sensors/data/ for --duration seconds on their own, which gives the
+baseline, and then again while writers post --batch-rows rows at a time to
+POST /sensors/data/ as fast as they are let, honouring the Retry-After of 429
+answers. With admission control the storm read p99 stays close to the baseline. Run
+it against a started server, e.g.
+
+    uvicorn app.main:app --port 8000
+    python scripts/ingest_storm.py --url http://localhost:8000 --writers 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from statistics import quantiles
+
+import httpx
+
+API_PREFIX = "/api/v1"
+
+
+async def reads(http: httpx.AsyncClient, headers: dict[str, str], deadline: float) -> list[float]:
+    latencies = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await http.get(
+            API_PREFIX + "/sensors/data/", params={"limit": 100, "count": "none"}, headers=headers
+        )
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def read_percentiles(
+    http: httpx.AsyncClient, headers: dict[str, str], args: argparse.Namespace
+) -> str:
+    deadline = time.perf_counter() + args.duration
+    results = await asyncio.gather(*(reads(http, headers, deadline) for _ in range(args.readers)))
+    latencies = [seconds for result in results for seconds in result]
+    cuts = quantiles(latencies, n=100, method="inclusive")
+    return (
+        f"{len(latencies)} reads, p50 {cuts[49] * 1000:.0f} ms, "
+        f"p99 {cuts[98] * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms"
+    )
+
+
+async def write(http: httpx.AsyncClient, body: bytes, statuses: Counter[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        response = await http.post(
+            API_PREFIX + "/sensors/data/", content=body, headers={"Content-Type": "application/json"}
+        )
+        statuses[response.status_code] += 1
+        if response.status_code in (429, 503):
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.readers + args.writers)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as http:
+        token = (await http.post(
+            API_PREFIX + "/login/access-token",
+            data={"username": args.username, "password": args.password},
+        )).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        sensor_id = (await http.get(API_PREFIX + "/sensors/info/", headers=headers)).json()[0]["id"]
+        now = datetime.now(timezone.utc)
+        body = json.dumps([
+            {
+                "sensor_id": sensor_id,
+                "time": (now - timedelta(milliseconds=i * 7)).isoformat(),
+                "class_type": "car",
+                "approach": "NB",
+            }
+            for i in range(args.batch_rows)
+        ]).encode()
+
+        print(f"{'baseline':<10} {await read_percentiles(http, headers, args)}")
+        statuses: Counter[int] = Counter()
+        stop = asyncio.Event()
+        writers = [asyncio.create_task(write(http, body, statuses, stop)) for _ in range(args.writers)]
+        # Let the storm build up before measuring
+        await asyncio.sleep(2)
+        print(f"{'storm':<10} {await read_percentiles(http, headers, args)}")
+        stop.set()
+        await asyncio.gather(*writers)
+        print(f"{'ingest':<10} " + ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=40)
+    parser.add_argument("--batch-rows", type=int, default=5000)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of reads per phase")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per request")
+    parser.add_argument("--username", default=os.environ.get("FIRST_SUPERUSER", "admin@example.com"))
+    parser.add_argument("--password", default=os.environ.get("FIRST_SUPERUSER_PASSWORD", "changethis"))
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Response-building benchmark for single large sensor responses.
+
+The cases are requested in-process through the ASGI app with the count cache switched
+off, so every request queries the database and encodes its body. Run it from the
+backend directory against a populated database, e.g.
+
+    python -m scripts.response_benchmark --start 2024-07-17
+
+Sections, all run unless some are named with --section:
+
+    cpu      median CPU and wall time per request of a 10k-row data page and a 1-year
+             /counts; the CPU is the process time of the request, client included
+    formats  payload size and client decode time into a DataFrame of JSON, Arrow and
+             Parquet responses
+    render   median latency and app CPU, and peak Python memory, of a 90-day
+             /detailed_counts built by the app (render=app) and by Postgres
+             (render=postgres)
+
+To compare two revisions, run it on a checkout of each; the cases only use the HTTP
+API, so the same script measures the code before and after a change.
+"""
+import argparse
+import io
+import json
+import os
+import time
+import tracemalloc
+from datetime import date, timedelta
+from statistics import median
+
+import pandas
+from fastapi.testclient import TestClient
+
+# The data page case asks for more rows than the default page size limit allows
+os.environ.setdefault("SENSOR_DATA_MAX_PAGE_SIZE", "10000")
+
+from app.core.config import settings  # noqa: E402
+from app.core.count_cache import count_cache  # noqa: E402
+from app.main import app  # noqa: E402
+
+API_PREFIX = settings.API_V1_STR
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/x-parquet"
+
+
+def day_window(start: date, days: int) -> dict[str, str]:
+    return {"start_date": start.isoformat(), "end_date": (start + timedelta(days=days)).isoformat()}
+
+
+def cpu_cases(start: date) -> list[tuple[str, str, dict[str, str]]]:
+    return [
+        (
+            "getSensorData, 10k rows",
+            "/sensors/data/",
+            {"limit": "10000", "count": "none", "start_time": f"{start.isoformat()}T00:00:00"},
+        ),
+        ("/counts, 1 year hourly", "/sensors/data/counts", day_window(start, 365)),
+    ]
+
+
+def format_cases(start: date) -> list[tuple[str, str, dict[str, str]]]:
+    return [
+        (
+            "data page, 1000 rows",
+            "/sensors/data/",
+            {"limit": "1000", "count": "none", "start_time": f"{start.isoformat()}T00:00:00"},
+        ),
+        ("/counts, 1 year hourly", "/sensors/data/counts", day_window(start, 365)),
+        ("/detailed_counts, 90 days", "/sensors/data/detailed_counts", day_window(start, 90)),
+    ]
+
+
+def render_cases(start: date) -> list[tuple[str, str, dict[str, str]]]:
+    return [("/detailed_counts, 90 days", "/sensors/data/detailed_counts", day_window(start, 90))]
+
+
+def to_dataframe(media_type: str, body: bytes) -> pandas.DataFrame:
+    """
+    Loads a response body the way a notebook would, one row per record or count.
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    if media_type == ARROW:
+        return pyarrow.ipc.open_stream(body).read_all().to_pandas()
+    if media_type == PARQUET:
+        return pyarrow.parquet.read_table(io.BytesIO(body)).to_pandas()
+    data = json.loads(body)
+    if isinstance(data, dict):
+        return pandas.DataFrame(data["data"])
+    if data and "hours" in data[0]:
+        return pandas.DataFrame([
+            {"approach": series["approach"], **hour} for series in data for hour in series["hours"]
+        ])
+    return pandas.json_normalize(data)
+
+
+def measure(client: TestClient, path: str, params: dict[str, str], headers: dict[str, str], repeat: int) -> str:
+    cpu: list[float] = []
+    wall: list[float] = []
+    response = client.get(API_PREFIX + path, params=params, headers=headers)
+    for _ in range(repeat):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        response = client.get(API_PREFIX + path, params=params, headers=headers)
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - cpu_started)
+    response.raise_for_status()
+    return (
+        f"{len(response.content) / 1024:9.0f} KiB  cpu {median(cpu) * 1000:7.1f} ms  "
+        f"wall {median(wall) * 1000:7.1f} ms"
+    )
+
+
+def measure_formats(
+    client: TestClient, path: str, params: dict[str, str], headers: dict[str, str], repeat: int
+) -> str:
+    results = []
+    for media_type in ("application/json", ARROW, PARQUET):
+        response = client.get(API_PREFIX + path, params=params, headers={**headers, "Accept": media_type})
+        response.raise_for_status()
+        decode = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            to_dataframe(media_type, response.content)
+            decode.append(time.perf_counter() - started)
+        results.append(f"{len(response.content) / 1024:7.0f} KiB {median(decode) * 1000:6.1f} ms")
+    return " | ".join(results)
+
+
+def measure_render(
+    client: TestClient, path: str, params: dict[str, str], headers: dict[str, str], repeat: int
+) -> str:
+    results = []
+    for render in ("app", "postgres"):
+        render_params = {**params, "render": render}
+        client.get(API_PREFIX + path, params=render_params, headers=headers).raise_for_status()
+        wall = []
+        cpu = []
+        for _ in range(repeat):
+            started, cpu_started = time.perf_counter(), time.process_time()
+            client.get(API_PREFIX + path, params=render_params, headers=headers)
+            wall.append(time.perf_counter() - started)
+            cpu.append(time.process_time() - cpu_started)
+        # Memory is traced on a separate request, tracing slows everything down
+        tracemalloc.start()
+        client.get(API_PREFIX + path, params=render_params, headers=headers)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append(
+            f"wall {median(wall) * 1000:5.1f} ms cpu {median(cpu) * 1000:5.1f} ms {peak / 2**20:4.1f} MiB"
+        )
+    return " | ".join(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2024-07-17", help="first day of the data windows")
+    parser.add_argument("--repeat", type=int, default=8)
+    parser.add_argument("--section", action="append", choices=["cpu", "formats", "render"])
+    args = parser.parse_args()
+    start = date.fromisoformat(args.start)
+    sections = args.section or ["cpu", "formats", "render"]
+
+    # Nothing is stored, so closed windows are computed on every request
+    count_cache.max_entries = 0
+    with TestClient(app) as client:
+        token = client.post(
+            API_PREFIX + "/login/access-token",
+            data={"username": settings.FIRST_SUPERUSER, "password": settings.FIRST_SUPERUSER_PASSWORD},
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        if "cpu" in sections:
+            for name, path, params in cpu_cases(start):
+                print(f"{name:<34} {measure(client, path, params, headers, args.repeat)}")
+        if "formats" in sections:
+            print(f"{'size and decode time':<34} {'JSON':<21} | {'Arrow':<21} | Parquet")
+            for name, path, params in format_cases(start):
+                print(f"{name:<34} {measure_formats(client, path, params, headers, args.repeat)}")
+        if "render" in sections:
+            print(f"{'latency, CPU and peak memory':<34} {'render=app':<34} | render=postgres")
+            for name, path, params in render_cases(start):
+                print(f"{name:<34} {measure_render(client, path, params, headers, args.repeat)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import { useState, useCallback } from "react";
+import { useMemo, useState } from "react";
 
 const CHART_OPTIONS = {
     chart: {
@@ -59,50 +59,45 @@ const CHART_OPTIONS = {
     }
 };
 
-const useChartData = () => {
-    const [chartData, setChartData] = useState<any[]>([]);
+const useChartData = (liveCounts: any[]) => {
     const [chartOptions] = useState<any>(CHART_OPTIONS);
 
-    const fetchChartData = useCallback(async () => {
-        try {
-            const response = await fetch('http://localhost/api/v1/sensors/data/live');
-            const data = await response.json();
+    const chartData = useMemo(() => {
+        const formattedData = formatLiveData(liveCounts);
+        return mapSeriesData(formattedData);
+    }, [liveCounts]);
 
-            const formattedData = formatLiveData(data);
-
-            const series = mapSeriesData(formattedData);
-
-            setChartData(series);
-        } catch (error) {
-            console.error("Error fetching sensor data:", error);
-        }
-    }, []);
-
-    const formatLiveData = (data: any) => {
-        return data.flatMap((approach: any) =>
-            approach.hours.map((hour: any) => ({
-                time: new Date(hour.time).getTime(),
-                count: hour.count,
-                approach: approach.approach
-            }))
-        ).filter((d: any) => d.count !== 0); // Filter out zero count values
-    };
+    return { chartData, chartOptions };
+};
 
-    const mapSeriesData = (formattedData: any) => {
-        const series: any = {};
-        formattedData.forEach((d: any) => {
-            if (!series[d.approach]) {
-                series[d.approach] = [];
-            }
-            series[d.approach].push([d.time, d.count]);
+// Sums the "<approach>_<class>" counts of each minute per approach
+const formatLiveData = (data: any[]) => {
+    return data.flatMap((entry: any) => {
+        const approaches: Record<string, number> = {};
+        Object.entries(entry.results).forEach(([key, count]) => {
+            const approach = key.split("_")[0];
+            approaches[approach] = (approaches[approach] ?? 0) + (count as number);
         });
-        return Object.keys(series).map((approach: string) => ({
-            name: approach,
-            data: series[approach]
+        return Object.entries(approaches).map(([approach, count]) => ({
+            time: new Date(entry.minute).getTime(),
+            count: count,
+            approach: approach
         }));
-    };
+    }).filter((d: any) => d.count !== 0); // Filter out zero count values
+};
 
-    return { chartData, chartOptions, fetchChartData };
+const mapSeriesData = (formattedData: any) => {
+    const series: any = {};
+    formattedData.forEach((d: any) => {
+        if (!series[d.approach]) {
+            series[d.approach] = [];
+        }
+        series[d.approach].push([d.time, d.count]);
+    });
+    return Object.keys(series).map((approach: string) => ({
+        name: approach,
+        data: series[approach]
+    }));
 };
 
 export default useChartData;
\ No newline at end of file
@@ -0,0 +1,38 @@
+import { useEffect, useState } from "react";
+
+const LIVE_STREAM_URL = 'http://localhost/api/v1/sensors/data/live/stream';
+// Minutes kept on the client, matching the server's live window
+const LIVE_WINDOW_MINUTES = 60;
+
+const useLiveCounts = () => {
+    const [liveCounts, setLiveCounts] = useState<any[]>([]);
+
+    useEffect(() => {
+        const source = new EventSource(LIVE_STREAM_URL);
+
+        // The snapshot replaces everything, later events only carry the changed minutes
+        source.addEventListener("snapshot", (event: MessageEvent) => {
+            setLiveCounts(JSON.parse(event.data));
+        });
+        source.addEventListener("counts", (event: MessageEvent) => {
+            const changed = JSON.parse(event.data);
+            setLiveCounts((current) => {
+                const minutes = new Map(current.map((entry: any) => [entry.minute, entry]));
+                changed.forEach((entry: any) => minutes.set(entry.minute, entry));
+                return Array.from(minutes.values())
+                    .sort((a: any, b: any) => a.minute.localeCompare(b.minute))
+                    .slice(-LIVE_WINDOW_MINUTES);
+            });
+        });
+        source.onerror = (error) => {
+            // EventSource reconnects on its own and receives a fresh snapshot
+            console.error("Error in live counts stream:", error);
+        };
+
+        return () => source.close();
+    }, []);
+
+    return liveCounts;
+};
+
+export default useLiveCounts;
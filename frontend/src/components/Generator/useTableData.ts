@@ -1,19 +1,13 @@
-import { useState, useCallback } from "react";
+import { useMemo } from "react";
 
-const useTableData = () => {
-    const [tableData, setTableData] = useState<any[]>([]);
+// The stream carries the whole 60-minute live window, which the chart plots. The table
+// keeps showing the last 30 minutes, the window of /live/detailed_counts it used to poll.
+const TABLE_MINUTES = 30;
 
-    const fetchTableData = useCallback(async () => {
-        try {
-            const response = await fetch('http://localhost/api/v1/sensors/data/live/detailed_counts');
-            const data = await response.json();
-            setTableData(data);
-        } catch (error) {
-            console.error("Error fetching detailed counts data:", error);
-        }
-    }, []);
+const useTableData = (liveCounts: any[]) => {
+    const tableData = useMemo(() => liveCounts.slice(-TABLE_MINUTES), [liveCounts]);
 
-    return { tableData, fetchTableData };
+    return { tableData };
 };
 
-export default useTableData;
\ No newline at end of file
+export default useTableData;
@@ -10,6 +10,7 @@ import DataTable from "../../components/Generator/DataTable";
 import useGeneratorForms from "../../components/Generator/useGeneratorForms";
 import useChartData from "../../components/Generator/useChartData";
 import useTableData from "../../components/Generator/useTableData";
+import useLiveCounts from "../../components/Generator/useLiveCounts";
 
 export const Route = createFileRoute("/_layout/configuration")({
     component: Configuration,
@@ -17,8 +18,9 @@ export const Route = createFileRoute("/_layout/configuration")({
 function Configuration() {
     const { carForm, attributeForm, failureForm, handleSubmit, handleStop, errorMessage } = useGeneratorForms();
     const { data: generatorStatus, refetch } = useQuery(getStatus());
-    const { chartData, chartOptions, fetchChartData } = useChartData();
-    const { tableData, fetchTableData } = useTableData();
+    const liveCounts = useLiveCounts();
+    const { chartData, chartOptions } = useChartData(liveCounts);
+    const { tableData } = useTableData(liveCounts);
 
     const [isRunning, setIsRunning] = useState<boolean | null>(null);
 
@@ -62,18 +64,6 @@ function Configuration() {
         }
     }, [generatorStatus, carForm, attributeForm, failureForm]);
 
-    useEffect(() => {
-        fetchChartData();
-        const chartInterval = setInterval(fetchChartData, 30000);
-        return () => clearInterval(chartInterval);
-    }, [fetchChartData]);
-
-    useEffect(() => {
-        fetchTableData();
-        const tableInterval = setInterval(fetchTableData, 30000);
-        return () => clearInterval(tableInterval);
-    }, [fetchTableData]);
-
     return (
         <Container maxW="full">
             <Heading size="lg" textAlign={{ base: "center", md: "left" }} py={12}>